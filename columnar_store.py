@@ -0,0 +1,455 @@
+"""
+Колоночное хранение точек, отрезков и рамок фигур сцены
+Координаты лежат в непрерывных numpy-массивах (структура массивов), которые
+растут удвоением, поэтому добавление в среднем O(1), а массовое - один вызов.
+Удаление помечает строку мёртвой, место освобождается при уплотнении.
+У каждой записи стабильный id; id растут вместе с номером строки, поэтому
+строку по id находим бинарным поиском без словаря. Поиск по расстоянию,
+ближайшая точка и перевод в экранные координаты - векторные операции.
+Запросы по радиусу сначала берут из сетки (CellGrid) только строки рядом
+с курсором, и точная проверка идёт по ним, а не по всему хранилищу
+"""
+
+import math
+
+import numpy as np
+
+
+def _cell_codes(level, i, j):
+    """Хэш ячейки (уровень, i, j) в int64; переполнение при умножении - часть хэша"""
+    with np.errstate(over='ignore'):
+        return (np.asarray(i, dtype=np.int64) * 73856093) ^ (np.asarray(j, dtype=np.int64) * 19349663) ^ (level * 83492791)
+
+
+class CellGrid:
+    """
+    Сетка по рамкам строк: ячейка → id строк, чьи рамки её задевают
+    Уровни - как у SpatialHash (spatial_index.py): строка ложится на самый
+    мелкий уровень, где задевает не больше max_cells_per_item ячеек. Только
+    пары (код ячейки, id) лежат не в словаре множеств, а в массивах numpy,
+    отсортированных по коду, поэтому и построение, и запрос векторные.
+    Совпадение хэшей ячеек даёт лишних кандидатов, но не теряет строк: точную
+    проверку всё равно делает хранилище. Новые строки копятся в хвосте без
+    сортировки и вливаются в основной массив, когда хвост разрастается
+    """
+
+    def __init__(self, cell_size=1.0, max_cells_per_item=4, level_factor=4, max_level=12,
+                 max_cells_per_query=256):
+        self.cell_size = cell_size
+        self.max_cells_per_item = max_cells_per_item
+        self.level_factor = level_factor
+        self.max_level = max_level
+        # Запрос крупнее стольких ячеек уровня отдаёт None: проще проверить всё
+        self.max_cells_per_query = max_cells_per_query
+        self.clear()
+
+    def clear(self):
+        self._keys = np.empty(0, dtype=np.int64)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._tail_keys = []
+        self._tail_ids = []
+        self._tail_size = 0
+        # Нечисловые рамки и то, что не влезло даже в верхний уровень
+        self._large = np.empty(0, dtype=np.int64)
+        self._levels = set()
+        # Сколько строк добавлено (мёртвые тоже): по нему хранилище решает, когда перестроить
+        self.entries = 0
+
+    def add(self, ids, boxes):
+        """ids - новые строки, boxes - их рамки (n, 4): x0, y0, x1, y1 при x0 <= x1, y0 <= y1"""
+        ids = np.asarray(ids, dtype=np.int64)
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        self.entries += len(ids)
+        pending = np.arange(len(ids))
+        with np.errstate(invalid='ignore', over='ignore'):
+            # Нечисловые и бесконечные рамки - сразу в _large
+            finite = np.isfinite(boxes).all(axis=1)
+            self._large = np.concatenate((self._large, ids[~finite]))
+            pending = pending[finite]
+            for level in range(self.max_level + 1):
+                if not len(pending):
+                    break
+                size = self.cell_size * self.level_factor ** level
+                first = np.floor(boxes[pending, :2] / size)
+                last = np.floor(boxes[pending, 2:] / size)
+                spans = last - first + 1
+                fits = spans[:, 0] * spans[:, 1] <= self.max_cells_per_item
+                placed = pending[fits]
+                pending = pending[~fits]
+                if not len(placed):
+                    continue
+                self._levels.add(level)
+                first = first[fits].astype(np.int64)
+                rows = spans[fits, 0].astype(np.int64)
+                cols = spans[fits, 1].astype(np.int64)
+                # Все пары (ячейка, строка) уровня
+                per_item = rows * cols
+                item = np.repeat(np.arange(len(placed)), per_item)
+                step = np.arange(len(item)) - np.repeat(np.cumsum(per_item) - per_item, per_item)
+                cell_i = first[item, 0] + step // cols[item]
+                cell_j = first[item, 1] + step % cols[item]
+                self._tail_keys.append(_cell_codes(level, cell_i, cell_j))
+                self._tail_ids.append(ids[placed[item]])
+                self._tail_size += len(item)
+        self._large = np.concatenate((self._large, ids[pending]))
+        if self._tail_size > max(4096, len(self._keys) // 32):
+            self._merge()
+
+    def _merge(self):
+        """Вливает хвост в отсортированные массивы: сортируется только хвост"""
+        if not self._tail_size:
+            return
+        keys = np.concatenate(self._tail_keys)
+        ids = np.concatenate(self._tail_ids)
+        # Порядок внутри одной ячейки не важен - устойчивая сортировка не нужна
+        order = np.argsort(keys)
+        keys, ids = keys[order], ids[order]
+        if len(self._keys):
+            positions = np.searchsorted(self._keys, keys)
+            keys = np.insert(self._keys, positions, keys)
+            ids = np.insert(self._ids, positions, ids)
+        self._keys, self._ids = keys, ids
+        self._tail_keys, self._tail_ids, self._tail_size = [], [], 0
+
+    def candidates(self, x0, y0, x1, y1):
+        """
+        id строк, чьи рамки могут задевать прямоугольник (с повторами и без точной
+        проверки); None - прямоугольник слишком велик для сетки, проверять всё
+        """
+        codes = []
+        for level in self._levels:
+            size = self.cell_size * self.level_factor ** level
+            i0, i1 = math.floor(x0 / size), math.floor(x1 / size)
+            j0, j1 = math.floor(y0 / size), math.floor(y1 / size)
+            if (i1 - i0 + 1) * (j1 - j0 + 1) > self.max_cells_per_query:
+                return None
+            cell_i, cell_j = np.meshgrid(np.arange(i0, i1 + 1), np.arange(j0, j1 + 1))
+            codes.append(_cell_codes(level, cell_i.ravel(), cell_j.ravel()))
+
+        found = [self._large]
+        if codes:
+            codes = np.concatenate(codes)
+            starts = np.searchsorted(self._keys, codes, side='left')
+            ends = np.searchsorted(self._keys, codes, side='right')
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                if end > start:
+                    found.append(self._ids[start:end])
+            if len(self._tail_keys) > 1:
+                # Хвост из многих мелких добавлений - одним массивом
+                self._tail_keys = [np.concatenate(self._tail_keys)]
+                self._tail_ids = [np.concatenate(self._tail_ids)]
+            for keys, ids in zip(self._tail_keys, self._tail_ids):
+                found.append(ids[np.isin(keys, codes)])
+        return np.concatenate(found)
+
+
+class _ColumnStore:
+    """Общая часть: рост массивов, id, надгробия и уплотнение"""
+
+    # Имена колонок с координатами (float64)
+    columns = ()
+    # Прочие колонки: (имя, dtype)
+    extra_columns = ()
+
+    def __init__(self, capacity=64):
+        self.size = 0
+        self.count = 0
+        self._next_id = 1
+        self.capacity = capacity
+        for name, dtype in self._fields():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        # Сетка строится лениво, при первом запросе: массовое добавление её не ждёт
+        self.grid = CellGrid()
+        # Строки с id от этого ещё не разложены по сетке
+        self._grid_next_id = 1
+
+    def _fields(self):
+        return ([(name, np.float64) for name in self.columns] + list(self.extra_columns)
+                + [('ids', np.int64), ('alive', bool)])
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.size = 0
+        self.count = 0
+        self.alive[:] = False
+        self._reset_grid()
+
+    def _reserve(self, extra):
+        """Место ещё под extra строк; массивы растут удвоением"""
+        needed = self.size + extra
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, self.capacity * 2)
+        for name, dtype in self._fields():
+            new = np.zeros(capacity, dtype=dtype)
+            new[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    def _append_rows(self, values):
+        """values - колонки одинаковой длины в порядке self.columns; возвращает новые id"""
+        n = len(values[0])
+        self._reserve(n)
+        start, end = self.size, self.size + n
+        for name, column in zip(self.columns, values):
+            getattr(self, name)[start:end] = column
+        ids = np.arange(self._next_id, self._next_id + n, dtype=np.int64)
+        self.ids[start:end] = ids
+        self.alive[start:end] = True
+        self._next_id += n
+        self.size = end
+        self.count += n
+        return ids
+
+    def row_of(self, item_id):
+        """Номер живой строки с данным id или None"""
+        row = int(np.searchsorted(self.ids[:self.size], item_id))
+        if row < self.size and self.ids[row] == item_id and self.alive[row]:
+            return row
+        return None
+
+    def _kill(self, rows):
+        rows = rows[self.alive[rows]]
+        self.alive[rows] = False
+        self.count -= len(rows)
+        # Мёртвых строк больше половины - уплотняем
+        if self.size > 64 and self.count < self.size // 2:
+            self.compact()
+        return len(rows)
+
+    def compact(self):
+        """Убирает мёртвые строки; порядок (и значит сортировка по id) сохраняется"""
+        live = np.flatnonzero(self.alive[:self.size])
+        for name, _ in self._fields():
+            column = getattr(self, name)
+            column[:len(live)] = column[live]
+        self.alive[:len(live)] = True
+        self.alive[len(live):self.size] = False
+        self.size = len(live)
+
+    def _live(self):
+        """Срез живых строк: без копирования, если надгробий нет"""
+        if self.count == self.size:
+            return slice(0, self.size)
+        return np.flatnonzero(self.alive[:self.size])
+
+    # ========== СЕТКА ДЛЯ ЗАПРОСОВ ПО РАДИУСУ ==========
+
+    def _bounds(self, rows):
+        """Рамки строк (n, 4): x0, y0, x1, y1"""
+        raise NotImplementedError
+
+    def fit_cell_size(self, size, max_ratio=4.0):
+        """Подгоняет ячейку сетки под радиус запросов; перестройка - только при сильной смене"""
+        if not size > 0 or not math.isfinite(size):
+            return
+        ratio = size / self.grid.cell_size
+        if 1 / max_ratio <= ratio <= max_ratio:
+            return
+        self.grid.cell_size = size
+        self._reset_grid()
+
+    def _reset_grid(self):
+        """Сетка будет построена заново при следующем запросе"""
+        self.grid.clear()
+        self._grid_next_id = 0
+
+    def _rows_near(self, x0, y0, x1, y1):
+        """Живые строки, чьи рамки могут задевать прямоугольник, в порядке добавления"""
+        # Мёртвых записей в сетке больше, чем живых строк, - проще разложить заново
+        if self.grid.entries > 2 * self.count + 4096:
+            self._reset_grid()
+        if self._grid_next_id < self._next_id:
+            start = int(np.searchsorted(self.ids[:self.size], self._grid_next_id))
+            rows = start + np.flatnonzero(self.alive[start:self.size])
+            self.grid.add(self.ids[rows], self._bounds(rows))
+            self._grid_next_id = self._next_id
+
+        ids = self.grid.candidates(x0, y0, x1, y1)
+        if ids is None:
+            return self._live()
+        ids = np.unique(ids)
+        rows = np.searchsorted(self.ids[:self.size], ids)
+        inside = rows < self.size
+        rows, ids = rows[inside], ids[inside]
+        return rows[(self.ids[rows] == ids) & self.alive[rows]]
+
+
+class PointStore(_ColumnStore):
+    """Точки: колонки x, y"""
+
+    columns = ('x', 'y')
+
+    def append(self, x, y):
+        return int(self._append_rows(([x], [y]))[0])
+
+    def extend(self, xs, ys):
+        """Массовое добавление; возвращает массив id"""
+        xs = np.asarray(xs, dtype=float).ravel()
+        ys = np.asarray(ys, dtype=float).ravel()
+        return self._append_rows((xs, ys))
+
+    def remove(self, point_id):
+        row = self.row_of(point_id)
+        if row is None:
+            return False
+        self._kill(np.array([row]))
+        return True
+
+    def _bounds(self, rows):
+        return np.column_stack((self.x[rows], self.y[rows], self.x[rows], self.y[rows]))
+
+    def position(self, point_id):
+        row = self.row_of(point_id)
+        if row is None:
+            return None
+        return float(self.x[row]), float(self.y[row])
+
+    def positions(self):
+        """(xs, ys, ids) живых точек в порядке добавления"""
+        live = self._live()
+        return self.x[live], self.y[live], self.ids[live]
+
+    def within(self, x, y, radius):
+        """Точки ближе radius к (x, y): (ids, xs, ys, расстояния) в порядке добавления"""
+        rows = self._rows_near(x - radius, y - radius, x + radius, y + radius)
+        xs, ys, ids = self.x[rows], self.y[rows], self.ids[rows]
+        # Квадраты расстояний: hypot по всему массиву в разы медленнее
+        mask = (xs - x) ** 2 + (ys - y) ** 2 < radius * radius
+        xs, ys = xs[mask], ys[mask]
+        return ids[mask], xs, ys, np.hypot(xs - x, ys - y)
+
+    def any_within(self, x, y, radius):
+        rows = self._rows_near(x - radius, y - radius, x + radius, y + radius)
+        return bool(np.any((self.x[rows] - x) ** 2 + (self.y[rows] - y) ** 2 < radius * radius))
+
+    def nearest(self, x, y):
+        """(id, расстояние) ближайшей точки или None"""
+        if not self.count:
+            return None
+        xs, ys, ids = self.positions()
+        best = int(np.argmin((xs - x) ** 2 + (ys - y) ** 2))
+        return int(ids[best]), float(np.hypot(xs[best] - x, ys[best] - y))
+
+
+class BoxStore(_ColumnStore):
+    """Рамки фигур: x0, y0, x1, y1 (x0 <= x1, y0 <= y1) и запас вокруг рамки в пикселях"""
+
+    columns = ('x0', 'y0', 'x1', 'y1')
+    extra_columns = (('margin', np.float64),)
+
+    def __init__(self, capacity=64):
+        super().__init__(capacity)
+        # Самый большой запас: на столько расширяем запрос к сетке
+        self.max_margin = 0.0
+
+    def clear(self):
+        super().clear()
+        self.max_margin = 0.0
+
+    def extend(self, boxes, margins):
+        """Массовое добавление; возвращает массив id"""
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        margins = np.asarray(margins, dtype=float).ravel()
+        start = self.size
+        ids = self._append_rows(tuple(boxes.T))
+        self.margin[start:self.size] = margins
+        if len(margins):
+            self.max_margin = max(self.max_margin, float(margins.max()))
+        return ids
+
+    def remove(self, box_id):
+        row = self.row_of(box_id)
+        if row is None:
+            return False
+        self._kill(np.array([row]))
+        return True
+
+    def _bounds(self, rows):
+        return np.column_stack((self.x0[rows], self.y0[rows], self.x1[rows], self.y1[rows]))
+
+    def touching(self, x0, y0, x1, y1, pixel, pad=0.0):
+        """
+        id рамок, которые с запасом margin + pad пикселей задевают прямоугольник,
+        в порядке добавления; pixel - размер пикселя в единицах мира
+        """
+        reach = (self.max_margin + pad) * pixel
+        rows = self._rows_near(x0 - reach, y0 - reach, x1 + reach, y1 + reach)
+        grow = (self.margin[rows] + pad) * pixel
+        # Бесконечные рамки (прямые) проходят проверку сами: -inf <= x1
+        mask = ((self.x0[rows] - grow <= x1) & (self.x1[rows] + grow >= x0)
+                & (self.y0[rows] - grow <= y1) & (self.y1[rows] + grow >= y0))
+        return self.ids[rows][mask]
+
+
+class SegmentStore(_ColumnStore):
+    """
+    Отрезки: концы x1, y1, x2, y2, id владельца (фигуры сцены) и вид точки
+    прилипания (номер в kinds)
+    """
+
+    columns = ('x1', 'y1', 'x2', 'y2')
+    extra_columns = (('owner', np.int64), ('kind', np.int16))
+
+    def __init__(self, capacity=64):
+        super().__init__(capacity)
+        self.kinds = []
+
+    def _kind_code(self, kind):
+        if kind not in self.kinds:
+            self.kinds.append(kind)
+        return self.kinds.index(kind)
+
+    def extend(self, segments, owner, kind):
+        """Отрезки [(x1, y1, x2, y2), ...] одной фигуры owner"""
+        segments = np.asarray(segments, dtype=float).reshape(-1, 4)
+        start = self.size
+        ids = self._append_rows(tuple(segments.T))
+        self.owner[start:self.size] = owner
+        self.kind[start:self.size] = self._kind_code(kind)
+        return ids
+
+    def extend_many(self, segments, owners, kinds, counts):
+        """
+        Отрезки нескольких фигур одним добавлением: у фигуры owners[i] вида
+        kinds[i] - counts[i] отрезков подряд в segments
+        """
+        segments = np.asarray(segments, dtype=float).reshape(-1, 4)
+        start = self.size
+        ids = self._append_rows(tuple(segments.T))
+        self.owner[start:self.size] = np.repeat(np.asarray(owners, dtype=np.int64), counts)
+        # Видов - единицы, фигур - сотни тысяч: код каждого вида ищем один раз
+        code_of = {kind: self._kind_code(kind) for kind in set(kinds)}
+        codes = np.array([code_of[kind] for kind in kinds], dtype=np.int16)
+        self.kind[start:self.size] = np.repeat(codes, counts)
+        return ids
+
+    def _bounds(self, rows):
+        x1, y1, x2, y2 = self.x1[rows], self.y1[rows], self.x2[rows], self.y2[rows]
+        return np.column_stack((np.minimum(x1, x2), np.minimum(y1, y2), np.maximum(x1, x2), np.maximum(y1, y2)))
+
+    def remove_owner(self, owner):
+        """Удаляет все отрезки фигуры; возвращает их число"""
+        rows = np.flatnonzero(self.alive[:self.size] & (self.owner[:self.size] == owner))
+        return self._kill(rows)
+
+    def closest(self, x, y, radius):
+        """
+        Ближайшие точки отрезков, до которых меньше radius:
+        (xs, ys, расстояния, виды) в порядке добавления
+        """
+        # Точная проверка - только по отрезкам из ячеек рядом с курсором
+        live = self._rows_near(x - radius, y - radius, x + radius, y + radius)
+        x1, y1, x2, y2 = self.x1[live], self.y1[live], self.x2[live], self.y2[live]
+        dx, dy = x2 - x1, y2 - y1
+        length2 = dx * dx + dy * dy
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = np.where(length2 > 0, ((x - x1) * dx + (y - y1) * dy) / length2, 0.0)
+        t = np.clip(t, 0.0, 1.0)
+        cx, cy = x1 + t * dx, y1 + t * dy
+        mask = (cx - x) ** 2 + (cy - y) ** 2 < radius * radius
+        cx, cy = cx[mask], cy[mask]
+        kinds = [self.kinds[code] for code in self.kind[live][mask]]
+        return cx, cy, np.hypot(cx - x, cy - y), kinds
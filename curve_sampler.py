@@ -0,0 +1,261 @@
+"""
+Адаптивная выборка точек для графиков функций
+Начинаем с грубой равномерной сетки и делим пополам только те интервалы,
+где кривая на экране заметно отходит от хорды. Для выражений из
+expression_compiler дополнительно используем интервальную арифметику:
+доказанно плоские интервалы не трогаем, а на полюсах рвём кривую
+"""
+
+import numpy as np
+
+from interval_arithmetic import interval_function
+
+
+def evaluate_function(func, x_values):
+    """Вычисляет функцию на массиве x и всегда возвращает float-массив той же формы"""
+    x_values = np.asarray(x_values, dtype=float)
+    with np.errstate(all='ignore'):
+        try:
+            y_values = func(x_values)
+        except (ValueError, ZeroDivisionError, TypeError, OverflowError):
+            return np.full(x_values.shape, np.nan)
+
+        y_values = np.asarray(y_values)
+        if np.iscomplexobj(y_values):
+            # Комплексные значения (например sqrt от отрицательного) не рисуем
+            y_values = np.where(np.imag(y_values) == 0, np.real(y_values), np.nan)
+
+        y_values = np.broadcast_to(y_values.astype(float, copy=False), x_values.shape)
+    return np.array(y_values, dtype=float)
+
+
+class AdaptiveSampler:
+    """Адаптивный семплер: уточняет кривую там, где ошибка в пикселях велика"""
+
+    def __init__(self, pixel_tolerance=0.5, samples_per_pixel=4.0,
+                 initial_pixel_step=4.0, min_pixel_step=0.25, max_levels=16,
+                 use_intervals=True, interval_pixel_step=16.0, hidden_feature_pixels=4.0,
+                 suspect_pixel_step=4.0):
+        # Допустимое отклонение середины интервала от хорды (в физических пикселях)
+        self.pixel_tolerance = pixel_tolerance
+        # Бюджет точек на один физический пиксель ширины
+        self.samples_per_pixel = samples_per_pixel
+        # Шаг начальной грубой сетки (в физических пикселях)
+        self.initial_pixel_step = initial_pixel_step
+        # Интервалы уже этого шага больше не делим
+        self.min_pixel_step = min_pixel_step
+        self.max_levels = max_levels
+        # Режим интервальной арифметики (для функций, которые её поддерживают)
+        self.use_intervals = use_intervals
+        # С интервалами начальная сетка реже: пропущенный между точками
+        # выброс виден по границам интервала
+        self.interval_pixel_step = interval_pixel_step
+        # Насколько (в пикселях) границы интервала могут выходить за хорду,
+        # прежде чем мы решим, что между точками что-то спрятано
+        self.hidden_feature_pixels = hidden_feature_pixels
+        # Интервалы уже этого шага (как у сетки без интервалов) подозрительные
+        # границы сами по себе делить не заставляют: интервальная арифметика
+        # переоценивает размах (x*x - x*x), и без предела такие выражения
+        # съедали бы весь бюджет
+        self.suspect_pixel_step = suspect_pixel_step
+
+    def sample_budget(self, pixel_width, device_pixel_ratio=1.0):
+        """Сколько точек можно потратить на кривую шириной pixel_width"""
+        device_width = max(1.0, pixel_width * device_pixel_ratio)
+        return int(device_width * self.samples_per_pixel) + 2
+
+    def sample(self, func, left, right, scale, pixel_width, device_pixel_ratio=1.0):
+        """
+        Возвращает (xs, ys) на отрезке [left, right]
+        scale - сколько логических пикселей в одной мировой единице (get_grid_size)
+        """
+        if not right > left:
+            return np.empty(0), np.empty(0)
+
+        device_scale = scale * device_pixel_ratio
+        device_width = max(1.0, pixel_width * device_pixel_ratio)
+        budget = self.sample_budget(pixel_width, device_pixel_ratio)
+
+        enclose = interval_function(func) if self.use_intervals else None
+        initial_step = self.initial_pixel_step if enclose is None else self.interval_pixel_step
+
+        initial_count = max(16, int(device_width / initial_step)) + 1
+        xs = np.linspace(left, right, min(initial_count, budget))
+        ys = evaluate_function(func, xs)
+
+        min_dx = self.min_pixel_step / device_scale
+        tolerance = self.pixel_tolerance / device_scale
+        hidden_tolerance = self.hidden_feature_pixels / device_scale
+        suspect_dx = self.suspect_pixel_step / device_scale
+
+        # Индексы левых концов интервалов, которые надо проверить
+        active = np.arange(len(xs) - 1)
+
+        for _ in range(self.max_levels):
+            remaining = budget - len(xs)
+            if len(active) == 0 or remaining <= 0:
+                break
+
+            x0, x1 = xs[active], xs[active + 1]
+            wide = (x1 - x0) > min_dx
+            active = active[wide]
+            if len(active) == 0:
+                break
+
+            suspect = np.zeros(len(active), dtype=bool)
+            if enclose is not None:
+                # Если размах значений на интервале меньше допуска, кривая там
+                # неотличима от хорды - середину даже не вычисляем
+                bounds = enclose(xs[active], xs[active + 1])
+                height = bounds.hi - bounds.lo
+                flat = bounds.continuous & (height <= tolerance)
+                keep = ~flat
+                active, height = active[keep], height[keep]
+                suspect = ~bounds.continuous[keep]
+                # Границы сильно шире хорды - между точками может прятаться пик
+                with np.errstate(invalid='ignore'):
+                    suspect |= height - np.abs(ys[active + 1] - ys[active]) > hidden_tolerance
+                # На узких интервалах решает только сама середина
+                suspect &= (xs[active + 1] - xs[active]) > suspect_dx
+                if len(active) == 0:
+                    break
+
+            x0, x1 = xs[active], xs[active + 1]
+            y0, y1 = ys[active], ys[active + 1]
+            x_mid = (x0 + x1) * 0.5
+            y_mid = evaluate_function(func, x_mid)
+
+            finite0, finite1, finite_mid = np.isfinite(y0), np.isfinite(y1), np.isfinite(y_mid)
+            with np.errstate(invalid='ignore'):
+                error = np.abs(y_mid - (y0 + y1) * 0.5)
+
+            # Всюду конечно - сравниваем середину с хордой
+            # Конечность меняется внутри - там край области определения или полюс
+            all_finite = finite0 & finite1 & finite_mid
+            error = np.where(all_finite, error, np.inf)
+            # Непрерывность не доказана (возможно полюс) или границы подозрительно
+            # широки - уточняем в первую очередь
+            error[suspect] = np.inf
+            error[~(finite0 | finite1 | finite_mid)] = 0.0
+            refine = error > tolerance
+
+            if not np.any(refine):
+                break
+
+            active, x_mid, y_mid, error = active[refine], x_mid[refine], y_mid[refine], error[refine]
+
+            if len(active) > remaining:
+                # Бюджета не хватает - уточняем только самые плохие интервалы
+                worst = np.sort(np.argsort(error)[-remaining:])
+                active, x_mid, y_mid = active[worst], x_mid[worst], y_mid[worst]
+
+            xs = np.insert(xs, active + 1, x_mid)
+            ys = np.insert(ys, active + 1, y_mid)
+
+            # После вставки середина k-го интервала стоит на позиции active[k] + 1 + k,
+            # обе половинки проверяем на следующем уровне
+            mid_positions = active + 1 + np.arange(len(active))
+            active = np.empty(len(mid_positions) * 2, dtype=int)
+            active[0::2] = mid_positions - 1
+            active[1::2] = mid_positions
+
+        if enclose is not None:
+            xs, ys = self._cut_poles(enclose, xs, ys)
+        return xs, ys
+
+    def _cut_poles(self, enclose, xs, ys):
+        """
+        Интервалы, где и после уточнения не доказана непрерывность, а оба конца
+        конечны, перекрывают полюс - вставляем туда nan, чтобы кривая не
+        соединялась вертикальной линией через асимптоту
+        """
+        if len(xs) < 2:
+            return xs, ys
+        bounds = enclose(xs[:-1], xs[1:])
+        pole = ~bounds.continuous & np.isfinite(ys[:-1]) & np.isfinite(ys[1:])
+        cuts = np.flatnonzero(pole)
+        if len(cuts) == 0:
+            return xs, ys
+        x_cut = (xs[cuts] + xs[cuts + 1]) * 0.5
+        return np.insert(xs, cuts + 1, x_cut), np.insert(ys, cuts + 1, np.nan)
+
+
+def decimate_columns(screen_x, screen_y, device_pixel_ratio=1.0, dense_turns=2, min_band_columns=3):
+    """
+    M4-прореживание непрерывного куска кривой (screen_x возрастает, всё конечно)
+    В каждом столбце физических пикселей оставляем первую, последнюю, минимальную
+    и максимальную точку - картинка та же, а точек не больше 4 на столбец.
+    Подряд идущие столбцы, где кривая меняет направление не меньше dense_turns раз
+    (то есть гуще пикселя), отдаём как полосу min/max: её дешевле залить,
+    чем обводить ломаной.
+    Возвращает список кусков по порядку:
+    ('polyline', индексы точек) или ('band', x, максимумы y, минимумы y)
+    """
+    count = len(screen_x)
+    span = (screen_x[-1] - screen_x[0]) * device_pixel_ratio + 1 if count else 0
+    if count <= 2 * span:
+        # Кривая и так не гуще пары точек на столбец
+        return [('polyline', np.arange(count))]
+
+    columns = np.floor(screen_x * device_pixel_ratio).astype(np.int64)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(columns)) + 1))
+    if count <= 2 * len(starts):
+        return [('polyline', np.arange(count))]
+
+    ends = np.append(starts[1:], count)
+    sizes = ends - starts
+    lows = np.minimum.reduceat(screen_y, starts)
+    highs = np.maximum.reduceat(screen_y, starts)
+
+    # Индекс первого минимума/максимума в каждом столбце
+    group = np.repeat(np.arange(len(starts)), sizes)
+    index = np.arange(count)
+    arg_low = np.minimum.reduceat(np.where(screen_y == lows[group], index, count), starts)
+    arg_high = np.minimum.reduceat(np.where(screen_y == highs[group], index, count), starts)
+
+    # Точки поворота (локальные экстремумы) по столбцам
+    direction = np.sign(np.diff(screen_y))
+    turning = np.zeros(count, dtype=np.int64)
+    turning[1:-1] = direction[1:] * direction[:-1] < 0
+    turns = np.add.reduceat(turning, starts)
+
+    # Полосы - серии густых столбцов длиной от min_band_columns
+    dense = np.concatenate(([0], (turns >= dense_turns).astype(np.int8), [0]))
+    edges = np.diff(dense)
+    band_starts, band_ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    long_enough = band_ends - band_starts >= min_band_columns
+    band_starts, band_ends = band_starts[long_enough], band_ends[long_enough]
+
+    if len(band_starts):
+        # Ломаная заходит в столбец и отрезками, соединяющими его с соседями:
+        # добавляем к min/max её значения на границах столбцов
+        last = ends[:-1] - 1
+        following = starts[1:]
+        edge_x = columns[following] / device_pixel_ratio
+        t = (edge_x - screen_x[last]) / (screen_x[following] - screen_x[last])
+        edge_y = screen_y[last] + t * (screen_y[following] - screen_y[last])
+        lows[:-1] = np.minimum(lows[:-1], edge_y)
+        lows[1:] = np.minimum(lows[1:], edge_y)
+        highs[:-1] = np.maximum(highs[:-1], edge_y)
+        highs[1:] = np.maximum(highs[1:], edge_y)
+
+    pieces = []
+    column = 0
+    for band_start, band_end in zip(list(band_starts) + [len(starts)], list(band_ends) + [len(starts)]):
+        if band_start > column:
+            # Редкий участок: M4-точки его столбцов плюс по точке от соседних полос
+            picked = np.concatenate((starts[column:band_start], ends[column:band_start] - 1,
+                                     arg_low[column:band_start], arg_high[column:band_start]))
+            if column > 0:
+                picked = np.append(picked, ends[column - 1] - 1)
+            if band_start < len(starts):
+                picked = np.append(picked, starts[band_start])
+            pieces.append(('polyline', np.unique(picked)))
+        if band_start < band_end:
+            # Полоса - ступеньки шириной в столбец
+            band_columns = columns[starts[band_start:band_end]]
+            band_x = np.column_stack((band_columns, band_columns + 1)).ravel() / device_pixel_ratio
+            cols = slice(band_start, band_end)
+            pieces.append(('band', band_x, np.repeat(highs[cols], 2), np.repeat(lows[cols], 2)))
+        column = band_end
+    return pieces
@@ -2,12 +2,167 @@
 # Qt - куча констант для цветов и стилей
 # QPointF - класс для точек (координаты могут быть дробными)
 from PyQt5.QtCore import Qt, QPointF
+# OrderedDict - словарь, который помнит порядок: из него сделан LRU для надписей
+from collections import OrderedDict
 # QPen - для рисования линий (цвет и толщина)
 # QBrush - для закрашивания фигур
-from PyQt5.QtGui import QPen, QBrush
+# QPolygonF - ломаная из точек QPointF (её можно нарисовать одним вызовом)
+# QColor, QFont - цвет и шрифт
+# QStaticText - надпись, разложенная на глифы один раз (дальше рисуется без раскладки)
+from PyQt5.QtGui import QPen, QBrush, QColor, QFont, QPolygonF, QStaticText, QTransform
+# numpy - чтобы копировать координаты в ломаную целым массивом, без цикла
+import numpy as np
+# Обрезка отрезков по прямоугольнику экрана
+from viewport_clip import clip_segments
+
+# Пулы стилей: ключ стиля → готовое перо, кисть или шрифт.
+# Создать QPen на каждую фигуру в каждом кадре дороже, чем взять готовый из словаря
+_pens = {}
+_brushes = {}
+_fonts = {}
+# Готовые надписи: (текст, шрифт) → QStaticText. Текстов бывает сколько угодно,
+# поэтому храним последние STATIC_TEXT_LIMIT, самые давние выкидываем
+_static_texts = OrderedDict()
+STATIC_TEXT_LIMIT = 1024
+
+
+def _color(color):
+    # Цвет можно задать как Qt.black или кортежем (r, g, b) / (r, g, b, a)
+    return QColor(*color) if isinstance(color, tuple) else color
+
 
 # Класс DrawingObjects - тут методы для рисования всякого
 class DrawingObjects: 
+    # ========== ПУЛ ПЕРЬЕВ, КИСТЕЙ И ШРИФТОВ ==========
+    # Возвращают общий объект из пула - менять его нельзя (setWidth и т.п.),
+    # нужна правка - сначала копия: QPen(DrawingObjects.pen(...))
+
+    @staticmethod
+    def pen(color=Qt.black, width=2, style=Qt.SolidLine, cap=Qt.SquareCap, dashes=None, cosmetic=False):
+        # dashes - штрихи и промежутки (в толщинах пера), например (5, 5)
+        # cosmetic - толщина в пикселях устройства при любой матрице painter
+        key = (color, width, style, cap, dashes, cosmetic)
+        pen = _pens.get(key)
+        if pen is None:
+            pen = QPen(_color(color), width, style, cap)
+            if dashes:
+                pen.setDashPattern(list(dashes))
+            pen.setCosmetic(cosmetic)
+            _pens[key] = pen
+        return pen
+
+    @staticmethod
+    def world_pen(painter, color=Qt.black, width=2, style=Qt.SolidLine, cap=Qt.SquareCap, dashes=None):
+        # Перо для рисования в координатах мира (на painter стоит матрица мир → экран).
+        # Обычное перо растягивалось бы вместе с миром, косметическое - нет,
+        # но его толщину Qt меряет в пикселях устройства, а не в логических,
+        # поэтому на экранах с devicePixelRatio 2 сами умножаем её на 2
+        ratio = painter.device().devicePixelRatioF()
+        return DrawingObjects.pen(color, width * ratio, style, cap, dashes, cosmetic=True)
+
+    @staticmethod
+    def brush(color=None):
+        # None - без заливки
+        brush = _brushes.get(color)
+        if brush is None:
+            brush = QBrush(Qt.NoBrush) if color is None else QBrush(_color(color))
+            _brushes[color] = brush
+        return brush
+
+    @staticmethod
+    def font(family="Arial", size=12, bold=False):
+        key = (family, size, bold)
+        font = _fonts.get(key)
+        if font is None:
+            font = QFont(family, size)
+            font.setBold(bold)
+            _fonts[key] = font
+        return font
+
+    @staticmethod
+    def static_text(text, family="Arial", size=12, bold=False):
+        # Разложенная надпись для painter.drawStaticText; рисовать её надо
+        # тем же шрифтом DrawingObjects.font(family, size, bold), иначе Qt
+        # разложит её заново. Левый верхний угол - в точке, которую дали
+        key = (text, family, size, bold)
+        static = _static_texts.get(key)
+        if static is not None:
+            _static_texts.move_to_end(key)
+            return static
+        static = DrawingObjects.prepare_text(text, DrawingObjects.font(family, size, bold))
+        _static_texts[key] = static
+        while len(_static_texts) > STATIC_TEXT_LIMIT:
+            _static_texts.popitem(last=False)
+        return static
+
+    @staticmethod
+    def prepare_text(text, font):
+        # Новая QStaticText, сразу разложенная этим шрифтом
+        static = QStaticText(text)
+        static.setPerformanceHint(QStaticText.AggressiveCaching)
+        static.prepare(QTransform(), font)
+        return static
+
+    # ========== ПАЧКИ: МНОГО ФИГУР ЗА ОДИН ВЫЗОВ QPainter ==========
+    # Координаты - numpy-массивы в системе painter: экранные пиксели или,
+    # с матрицей мир → экран и world_pen, координаты мира. Сколько бы фигур
+    # ни было, в Qt уходит один вызов со всеми точками сразу
+
+    @staticmethod
+    def draw_points_batch(painter, xs, ys, pen=None):
+        # Точки; по умолчанию - те же кружки, что в draw_point: круглое перо
+        # толщиной в диаметр кружка рисует каждую точку закрашенным кругом
+        if not len(xs):
+            return
+        painter.setPen(pen or DrawingObjects.pen(Qt.black, 10, cap=Qt.RoundCap))
+        painter.drawPoints(DrawingObjects.polygon_from_array(xs, ys))
+
+    @staticmethod
+    def draw_lines_batch(painter, x1, y1, x2, y2, pen=None, clip=None):
+        # Отрезки (x1[i], y1[i]) - (x2[i], y2[i]); drawLines берёт точки парами
+        # clip - прямоугольник (x0, y0, x1, y1): концы за ним подрезаются,
+        # а отрезки целиком снаружи в Qt вообще не уходят
+        if clip is not None:
+            x1, y1, x2, y2 = clip_segments(np.asarray(x1, dtype=float), np.asarray(y1, dtype=float),
+                                           np.asarray(x2, dtype=float), np.asarray(y2, dtype=float), clip)
+        count = len(x1)
+        if not count:
+            return
+        xs = np.empty(2 * count)
+        ys = np.empty(2 * count)
+        xs[0::2], xs[1::2] = x1, x2
+        ys[0::2], ys[1::2] = y1, y2
+        painter.setPen(pen or DrawingObjects.pen())
+        painter.drawLines(DrawingObjects.polygon_from_array(xs, ys))
+
+    @staticmethod
+    def draw_polygons_batch(painter, xs, ys, counts, pen=None, clip=None):
+        # Контуры многоугольников: вершины всех подряд в xs, ys,
+        # counts[i] - сколько вершин у i-го. Каждая сторона - отрезок из
+        # вершины в следующую, у последней вершины - в первую того же многоугольника
+        counts = np.asarray(counts)
+        if not len(xs):
+            return
+        following = np.arange(1, len(xs) + 1)
+        # Номер первой вершины каждого многоугольника и конец его вершин
+        ends = np.cumsum(counts)
+        following[ends - 1] = ends - counts
+        DrawingObjects.draw_lines_batch(painter, xs, ys, xs[following], ys[following], pen, clip)
+
+    @staticmethod
+    def draw_circles_batch(painter, xs, ys, radii, pen=None):
+        # Окружности: перо и кисть ставим один раз на все.
+        # Пачечного вызова для эллипсов в Qt нет, а один QPainterPath из многих
+        # эллипсов со сглаживанием обводится в разы медленнее, чем по одному
+        if not len(xs):
+            return
+        painter.setPen(pen or DrawingObjects.pen())
+        painter.setBrush(DrawingObjects.brush())
+        for x, y, r in zip(xs.tolist(), ys.tolist(), radii.tolist()):
+            painter.drawEllipse(QPointF(x, y), r, r)
+
+    # ========== ОДИНОЧНЫЕ ФИГУРЫ ==========
+
     # @staticmethod значит, что метод статический (не нужен экземпляр класса чтобы его вызвать)
     @staticmethod
     def draw_point(painter, x, y):
@@ -15,9 +170,9 @@ class DrawingObjects:
         # x, y - координаты где рисовать точку
         
         # Ставим перо (линию) чёрного цвета толщиной 2 пикселя
-        painter.setPen(QPen(Qt.black, 2))
+        painter.setPen(DrawingObjects.pen())
         # Ставим кисть (заливку) чёрного цвета
-        painter.setBrush(QBrush(Qt.black))
+        painter.setBrush(DrawingObjects.brush(Qt.black))
         # Рисуем кружок в точке (x, y) радиусом 4 пикселя
         # QPointF(x, y) - просто точка с координатами x и y
         painter.drawEllipse(QPointF(x, y), 4, 4)
@@ -28,7 +183,7 @@ class DrawingObjects:
         # (x1, y1) - первая точка, (x2, y2) - вторая
         
         # Чёрная линия толщиной 2 пикселя
-        painter.setPen(QPen(Qt.black, 2))
+        painter.setPen(DrawingObjects.pen())
         # int() превращает дробные числа в целые (экран работает с целыми пикселями)
         # Рисуем линию от (x1, y1) к (x2, y2)
         painter.drawLine(int(x1), int(y1), int(x2), int(y2))
@@ -40,7 +195,7 @@ class DrawingObjects:
         # radius - радиус
         
         # Чёрное перо толщиной 2 пикселя
-        painter.setPen(QPen(Qt.black, 2))
+        painter.setPen(DrawingObjects.pen())
         # drawEllipse рисует эллипс (или круг если ширина = высоте)
         # Параметры: левый край, верхний край, ширина, высота прямоугольника вокруг круга
         painter.drawEllipse(
@@ -55,16 +210,11 @@ class DrawingObjects:
         # Рисуем многоугольник (фигуру с несколькими углами)
         # points - список координат вершин [(x1,y1), (x2,y2), (x3,y3), ...]
         
-        # Чёрное перо толщиной 2 пикселя
-        painter.setPen(QPen(Qt.black, 2))
-        # Проходим по всем вершинам многоугольника
-        for i in range(len(points)):
-            # Берём текущую точку
-            x1, y1 = points[i]
-            # Берём следующую точку (% len(points) - если это последняя, берём первую)
-            x2, y2 = points[(i + 1) % len(points)]
-            # Рисуем линию от текущей точки к следующей
-            painter.drawLine(int(x1), int(y1), int(x2), int(y2))
+        # Все стороны уходят в Qt одним drawLines (чёрное перо толщиной 2 пикселя)
+        if not len(points):
+            return
+        xs, ys = np.asarray(points, dtype=float).T
+        DrawingObjects.draw_polygons_batch(painter, xs, ys, [len(points)])
 
     @staticmethod
     def draw_angle(painter, vertex_x, vertex_y, point1_x, point1_y, point2_x, point2_y, radius=30):
@@ -75,8 +225,68 @@ class DrawingObjects:
         # radius=30 - параметр по умолчанию (не используется тут)
         
         # Чёрное перо толщиной 2 пикселя
-        painter.setPen(QPen(Qt.black, 2))
+        painter.setPen(DrawingObjects.pen())
         # Рисуем первую линию от вершины к первой точке
         painter.drawLine(int(vertex_x), int(vertex_y), int(point1_x), int(point1_y))
         # Рисуем вторую линию от вершины ко второй точке
-        painter.drawLine(int(vertex_x), int(vertex_y), int(point2_x), int(point2_y))
\ No newline at end of file
+        painter.drawLine(int(vertex_x), int(vertex_y), int(point2_x), int(point2_y))
+
+    @staticmethod
+    def polygon_from_array(xs, ys):
+        # Собираем QPolygonF прямо из numpy-массивов координат
+        # xs, ys - массивы экранных координат одинаковой длины
+        
+        count = len(xs)
+        # Создаём ломаную из count пустых точек
+        polygon = QPolygonF()
+        polygon.fill(QPointF(), count)
+        # QPointF внутри - это два double подряд (x, y), так что память ломаной
+        # можно открыть как numpy-массив формы (count, 2) и записать туда всё сразу
+        buffer = polygon.data()
+        buffer.setsize(count * 2 * 8)
+        coords = np.frombuffer(buffer, dtype=np.float64).reshape(count, 2)
+        coords[:, 0] = xs
+        coords[:, 1] = ys
+        return polygon
+
+    @staticmethod
+    def draw_band(painter, xs, y_max, y_min, chunk=32):
+        # Заливаем полосу-ступеньки (по паре x на столбец) между y_min и y_max цветом текущего
+        # пера - так выглядит ломаная, мечущаяся вверх-вниз внутри каждого пикселя.
+        # Вместо обводки расширяем полосу на полтолщины пера по вертикали и по горизонтали
+        # (на соседние столбцы), а заливку режем на куски: обе вещи у Qt на длинных контурах
+        # медленные. Соседние куски перекрываются на две точки, чтобы на стыке не было шва
+        pen = painter.pen()
+        half_width = pen.widthF() / 2
+        top, bottom = y_min[::2] - half_width, y_max[::2] + half_width
+        column_width = xs[1] - xs[0]
+        for shift in range(1, int(round(half_width / column_width)) + 1):
+            top[:-shift] = np.minimum(top[:-shift], y_min[2 * shift::2] - half_width)
+            top[shift:] = np.minimum(top[shift:], y_min[:-2 * shift:2] - half_width)
+            bottom[:-shift] = np.maximum(bottom[:-shift], y_max[2 * shift::2] + half_width)
+            bottom[shift:] = np.maximum(bottom[shift:], y_max[:-2 * shift:2] + half_width)
+        top, bottom = np.repeat(top, 2), np.repeat(bottom, 2)
+
+        painter.save()
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QBrush(pen.color()))
+        count = len(xs)
+        for start in range(0, max(count - 2, 1), chunk - 2):
+            end = min(start + chunk, count)
+            part = slice(start, end)
+            painter.drawPolygon(DrawingObjects.polygon_from_array(
+                np.concatenate((xs[part], xs[part][::-1])),
+                np.concatenate((top[part], bottom[part][::-1]))
+            ))
+        painter.restore()
+
+    @staticmethod
+    def draw_polyline(painter, xs, ys, chunk=32):
+        # Рисуем ломаную через все точки (перо должно быть уже выставлено - у графиков оно цветное)
+        # Длинную ломаную режем на куски по chunk точек: Qt сглаживает всю ломаную
+        # как один контур, и на густых самопересекающихся кривых это очень медленно.
+        # Соседние куски делят общую точку, чтобы не было разрывов
+        count = len(xs)
+        for start in range(0, count - 1, chunk - 1):
+            end = min(start + chunk, count)
+            painter.drawPolyline(DrawingObjects.polygon_from_array(xs[start:end], ys[start:end]))
@@ -0,0 +1,192 @@
+"""
+Кэш скомпилированных выражений функций
+Ключ - текст функции. Сначала пробуем лёгкий компилятор (expression_compiler.py),
+и только выражения вне его грамматики идут через sympy. В памяти держим LRU из
+(выражение, numpy-функция), на диске - то же выражение, переписанное sympy
+в грамматике лёгкого компилятора (sin x → sin(x)), чтобы при повторном
+открытии проектов его разобрал компилятор, а не sympy. Исполняемый код на
+диск не пишется: файл лежит в папке проектов, а её могут прислать вместе
+с чужим проектом
+"""
+
+import importlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from expression_compiler import compile_expression, UnsupportedExpression
+
+
+# Подстановки для lambdify (те же имена понимает FunctionInput)
+NUMPY_MODULES = {
+    'sin': np.sin, 'cos': np.cos, 'tan': np.tan,
+    'cot': lambda x: 1/np.tan(x),
+    'ctg': lambda x: 1/np.tan(x),
+    'sqrt': np.sqrt, 'abs': np.abs, 'Abs': np.abs,
+    'pi': np.pi, 'e': np.e,
+}
+
+# Имена sympy, которые лёгкий компилятор пишет по-своему
+SYMPY_NAMES = {'Abs': 'abs', 'E': 'e'}
+_SYMPY_NAME_RE = re.compile(r'\b(' + '|'.join(SYMPY_NAMES) + r')\b')
+
+
+class CompiledExpressionCache:
+    """LRU-кэш: текст выражения → (sympy-выражение, numpy-функция)"""
+
+    def __init__(self, max_entries=256, disk_path=None, max_disk_entries=1024):
+        self.max_entries = max_entries
+        # Файл с исходниками функций; None - кэш только в памяти
+        self.disk_path = Path(disk_path) if disk_path else None
+        self.max_disk_entries = max_disk_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.sympy_compiles = 0
+
+        self._entries = OrderedDict()
+        self._disk_texts = None
+
+    def get(self, function_text):
+        """
+        Возвращает (expr, func) для текста функции
+        expr - CompiledExpression или sympy-выражение
+        """
+        key = function_text.strip()
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        try:
+            compiled = compile_expression(key)
+            entry = (compiled, compiled)
+        except UnsupportedExpression:
+            entry = self._load_from_disk(key)
+            if entry is None:
+                entry, normalized = self._compile_sympy(key)
+                self.sympy_compiles += 1
+                if normalized is not None:
+                    self._save_to_disk(key, normalized)
+            else:
+                self.disk_hits += 1
+
+        self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'disk_hits': self.disk_hits,
+            'sympy_compiles': self.sympy_compiles,
+            'entries': len(self._entries),
+        }
+
+    def clear(self):
+        self._entries.clear()
+
+    def preload_sympy(self):
+        """
+        Импортирует sympy в фоновом потоке, чтобы первое сложное выражение
+        не ждало полсекунды. Если поток не успел, get() просто дождётся импорта
+        """
+        thread = threading.Thread(target=self._import_sympy, name='sympy-preload', daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def _import_sympy():
+        importlib.import_module('sympy.parsing.sympy_parser')
+
+    # ========== КОМПИЛЯЦИЯ ==========
+
+    def _compile_sympy(self, text):
+        """
+        Запасной путь через sympy; возвращает ((expr, func), запись выражения
+        для диска или None, если и после sympy оно не в грамматике компилятора)
+        """
+        from sympy import symbols, cot, lambdify
+        from sympy.parsing.sympy_parser import (
+            parse_expr, standard_transformations, convert_xor, implicit_multiplication_application
+        )
+
+        # ^ как степень, 2x как 2*x, ctg как cot
+        transformations = standard_transformations + (convert_xor, implicit_multiplication_application)
+        expr = parse_expr(text, local_dict={'x': symbols('x'), 'ctg': cot}, transformations=transformations)
+        if not expr.free_symbols:
+            func = _constant_function(float(expr))
+        else:
+            func = lambdify(symbols('x'), expr, modules=[NUMPY_MODULES, 'numpy'])
+        return (expr, func), _normalized_text(expr)
+
+    # ========== ДИСК ==========
+
+    def _disk_entries(self):
+        if self._disk_texts is None:
+            self._disk_texts = {}
+            if self.disk_path and self.disk_path.exists():
+                try:
+                    with open(self.disk_path, 'r', encoding='utf-8') as f:
+                        self._disk_texts = json.load(f)
+                except (OSError, ValueError):
+                    self._disk_texts = {}
+                if not isinstance(self._disk_texts, dict):
+                    self._disk_texts = {}
+        return self._disk_texts
+
+    def _load_from_disk(self, processed_text):
+        if not self.disk_path:
+            return None
+        normalized = self._disk_entries().get(processed_text)
+        if not isinstance(normalized, str):
+            return None
+
+        # Файл мог подменить кто угодно: его текст только разбирается
+        # компилятором, ничего из файла не исполняется
+        try:
+            compiled = compile_expression(normalized)
+        except UnsupportedExpression:
+            return None
+        return (compiled, compiled)
+
+    def _save_to_disk(self, processed_text, normalized):
+        if not self.disk_path:
+            return
+        texts = self._disk_entries()
+        texts.pop(processed_text, None)
+        texts[processed_text] = normalized
+        while len(texts) > self.max_disk_entries:
+            texts.pop(next(iter(texts)))
+
+        try:
+            self.disk_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.disk_path, 'w', encoding='utf-8') as f:
+                json.dump(texts, f, indent=2, ensure_ascii=False)
+        except OSError as e:
+            print(f"Expression cache write error: {e}")
+
+
+def _constant_function(value):
+    def constant(x):
+        return np.full(np.shape(x), value, dtype=float)
+    return constant
+
+
+def _normalized_text(expr):
+    """sympy-выражение в грамматике лёгкого компилятора; None - не укладывается в неё"""
+    text = _SYMPY_NAME_RE.sub(lambda match: SYMPY_NAMES[match.group(1)], str(expr))
+    try:
+        compile_expression(text)
+    except UnsupportedExpression:
+        return None
+    return text
@@ -0,0 +1,247 @@
+"""
+Лёгкий компилятор выражений функций без sympy
+Понимает грамматику из подсказки FunctionInput: числа, x, pi, e, + - * / ^,
+скобки, неявное умножение (2x, 3(x+1)) и функции sin, cos, tan, cot/ctg,
+sqrt, abs. Выражение превращается в последовательность вызовов numpy-ufunc,
+константы сворачиваются, одинаковые подвыражения считаются один раз.
+Всё, что не входит в грамматику, отдаём sympy (см. expression_cache.py)
+"""
+
+import re
+
+import numpy as np
+
+
+class UnsupportedExpression(ValueError):
+    """Выражение не входит в грамматику компилятора"""
+
+
+def _cot(x):
+    return 1 / np.tan(x)
+
+
+# Унарные функции, которые можно писать в выражениях
+FUNCTIONS = {
+    'sin': np.sin,
+    'cos': np.cos,
+    'tan': np.tan,
+    'cot': _cot,
+    'ctg': _cot,
+    'sqrt': np.sqrt,
+    'abs': np.abs,
+}
+
+CONSTANTS = {
+    'pi': np.pi,
+    'e': np.e,
+}
+
+# Операции программы: имя → numpy-функция
+OPERATIONS = {
+    'add': np.add,
+    'sub': np.subtract,
+    'mul': np.multiply,
+    'div': np.divide,
+    'pow': np.power,
+    'neg': np.negative,
+}
+OPERATIONS.update(FUNCTIONS)
+
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<name>[A-Za-z_]\w*)
+      | (?P<op>\*\*|[-+*/^()])
+    )""", re.VERBOSE)
+
+
+def tokenize(text):
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN_RE.match(text, position)
+        if not match:
+            raise UnsupportedExpression(f"unexpected symbol {text[position:].strip()[:1]!r}")
+        position = match.end()
+        if match.group('number') is not None:
+            tokens.append(('number', float(match.group('number'))))
+        elif match.group('name') is not None:
+            tokens.append(('name', match.group('name')))
+        else:
+            op = match.group('op')
+            tokens.append(('op', '^' if op == '**' else op))
+    return tokens
+
+
+class _Parser:
+    """
+    Рекурсивный спуск. Узлы дерева - кортежи, поэтому одинаковые
+    поддеревья равны и склеиваются при сборке программы:
+    ('const', value), ('x',), (операция, аргумент, ...)
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def parse(self):
+        if not self.tokens:
+            raise UnsupportedExpression("empty expression")
+        node = self.expression()
+        if self.position != len(self.tokens):
+            raise UnsupportedExpression(f"unexpected {self.tokens[self.position][1]!r}")
+        return node
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def expect(self, op):
+        if self.take() != ('op', op):
+            raise UnsupportedExpression(f"expected {op!r}")
+
+    def expression(self):
+        node = self.term()
+        while self.peek() in (('op', '+'), ('op', '-')):
+            op = self.take()[1]
+            node = _fold('add' if op == '+' else 'sub', node, self.term())
+        return node
+
+    def term(self):
+        node = self.unary()
+        while True:
+            kind, value = self.peek()
+            if kind == 'op' and value in '*/':
+                self.take()
+                node = _fold('mul' if value == '*' else 'div', node, self.unary())
+            elif kind in ('number', 'name') or (kind, value) == ('op', '('):
+                # Неявное умножение: 2x, 2(x + 1), x sin(x)
+                node = _fold('mul', node, self.power())
+            else:
+                return node
+
+    def unary(self):
+        if self.peek() == ('op', '-'):
+            self.take()
+            return _fold('neg', self.unary())
+        if self.peek() == ('op', '+'):
+            self.take()
+            return self.unary()
+        return self.power()
+
+    def power(self):
+        base = self.atom()
+        if self.peek() == ('op', '^'):
+            self.take()
+            # Степень правоассоциативна и может иметь знак: x^-1, 2^x^2
+            return _fold('pow', base, self.unary())
+        return base
+
+    def atom(self):
+        kind, value = self.take()
+        if kind == 'number':
+            return ('const', value)
+        if kind == 'op' and value == '(':
+            node = self.expression()
+            self.expect(')')
+            return node
+        if kind == 'name':
+            if value == 'x':
+                return ('x',)
+            if value in CONSTANTS:
+                return ('const', CONSTANTS[value])
+            if value in FUNCTIONS:
+                self.expect('(')
+                argument = self.expression()
+                self.expect(')')
+                return _fold(value, argument)
+            raise UnsupportedExpression(f"unknown name {value!r}")
+        raise UnsupportedExpression("unexpected end of expression" if kind is None else f"unexpected {value!r}")
+
+
+def _fold(op, *args):
+    """Создаёт узел; если все аргументы - константы, сразу считает значение"""
+    if all(arg[0] == 'const' for arg in args):
+        with np.errstate(all='ignore'):
+            value = OPERATIONS[op](*(np.float64(arg[1]) for arg in args))
+        return ('const', float(value))
+
+    # Простейшие тождества: x*1, x+0, x^1
+    if op in ('mul', 'add') and args[0][0] == 'const':
+        args = (args[1], args[0])
+    if len(args) == 2 and args[1][0] == 'const':
+        right = args[1][1]
+        if (op in ('mul', 'div', 'pow') and right == 1) or (op in ('add', 'sub') and right == 0):
+            return args[0]
+    return (op,) + args
+
+
+class CompiledExpression:
+    """Скомпилированное выражение: вызывается как numpy-функция f(x)"""
+
+    def __init__(self, text, tree):
+        self.text = text
+        self.tree = tree
+        # Программа: список (операция, аргументы); аргумент - номер ячейки
+        # с результатом предыдущей инструкции или готовая константа
+        self.program = []
+        self.result = self._emit(tree, {})
+
+    def _emit(self, node, slots):
+        if node[0] == 'const':
+            return ('const', node[1])
+        if node[0] == 'x':
+            return ('x', None)
+        if node in slots:
+            return ('slot', slots[node])
+
+        args = tuple(self._emit(arg, slots) for arg in node[1:])
+        self.program.append((node[0], args))
+        slots[node] = len(self.program) - 1
+        return ('slot', slots[node])
+
+    def is_constant(self):
+        return self.result[0] == 'const'
+
+    def evaluate(self, x, operations=OPERATIONS):
+        """Прогоняет программу; operations позволяет подменить арифметику"""
+        slots = []
+
+        def value(arg):
+            kind, data = arg
+            if kind == 'slot':
+                return slots[data]
+            if kind == 'x':
+                return x
+            return data
+
+        for op, args in self.program:
+            slots.append(operations[op](*(value(arg) for arg in args)))
+        return value(self.result)
+
+    def __call__(self, x):
+        x = np.asarray(x, dtype=float)
+        with np.errstate(all='ignore'):
+            result = self.evaluate(x)
+        if np.shape(result) != np.shape(x):
+            result = np.broadcast_to(result, np.shape(x)).astype(float)
+        if np.ndim(result) == 0:
+            return np.float64(result)
+        return result
+
+    def __repr__(self):
+        return f"CompiledExpression({self.text!r}, ops={len(self.program)})"
+
+
+def compile_expression(text):
+    """Текст функции → CompiledExpression (или UnsupportedExpression)"""
+    tree = _Parser(tokenize(text)).parse()
+    return CompiledExpression(text, tree)
@@ -0,0 +1,219 @@
+"""
+Индексы особых точек графиков для прилипания
+Пересечения графиков и корни функций ищутся один раз на окно вокруг экрана:
+смена знака на сетке, затем векторная бисекция до точного корня. Пока функции
+и масштаб не поменялись, а экран не ушёл за окно, прилипание - это просто
+поиск ближайших точек в отсортированном массиве
+"""
+
+import math
+
+import numpy as np
+
+from curve_sampler import evaluate_function
+
+
+def sign_changes(ys):
+    """
+    Узлы сетки, где значение ровно 0, и левые концы отрезков,
+    на концах которых значения конечны и разного знака
+    """
+    finite = np.isfinite(ys)
+    with np.errstate(invalid='ignore'):
+        zeros = np.flatnonzero(finite & (ys == 0))
+        brackets = np.flatnonzero(finite[:-1] & finite[1:] & (ys[:-1] * ys[1:] < 0))
+    return zeros, brackets
+
+
+def bisect_roots(evaluate, lo, hi, y_lo, y_hi, iterations=60):
+    """
+    Векторная бисекция сразу всех отрезков [lo, hi] со сменой знака.
+    Возвращает корни и маску настоящих: смена знака через полюс (tan, 1/x)
+    тоже сходится, но значение там огромное, а не около нуля
+    """
+    scale = np.maximum(1.0, np.abs(y_lo) + np.abs(y_hi))
+    for _ in range(iterations):
+        mid = (lo + hi) * 0.5
+        y_mid = evaluate(mid)
+        # Корень в левой половине, если знак сменился между lo и mid
+        left_half = np.signbit(y_mid) != np.signbit(y_lo)
+        hi = np.where(left_half, mid, hi)
+        lo = np.where(left_half, lo, mid)
+        y_lo = np.where(left_half, y_lo, y_mid)
+        if np.all(hi - lo <= 4 * np.finfo(float).eps * np.maximum(1.0, np.abs(lo))):
+            break
+
+    roots = (lo + hi) * 0.5
+    y_roots = evaluate(roots)
+    return roots, np.isfinite(y_roots) & (np.abs(y_roots) <= 1e-6 * scale)
+
+
+def find_roots(func, left, right, count, iterations=60):
+    """Корни func на [left, right]: смена знака на сетке из count точек и бисекция"""
+    if not right > left:
+        return np.empty(0)
+
+    xs = np.linspace(left, right, count)
+    ys = evaluate_function(func, xs)
+    zeros, brackets = sign_changes(ys)
+    if len(brackets) == 0:
+        return xs[zeros]
+
+    roots, genuine = bisect_roots(
+        lambda x: evaluate_function(func, x),
+        xs[brackets], xs[brackets + 1], ys[brackets], ys[brackets + 1], iterations
+    )
+    return np.sort(np.concatenate((xs[zeros], roots[genuine])))
+
+
+class WindowedIndex:
+    """
+    Отсортированные по x точки, посчитанные для окна вокруг экрана.
+    Наследники реализуют _build(grid) → (xs, ys)
+    """
+
+    def __init__(self, samples_per_pixel=1.0, window_screens=3.0, max_scale_change=2.0):
+        # Плотность сетки поиска смены знака (на логический пиксель)
+        self.samples_per_pixel = samples_per_pixel
+        # Ширина окна, в котором ищем точки, в ширинах экрана
+        self.window_screens = window_screens
+        # Во сколько раз может поменяться масштаб, прежде чем пересчитать индекс
+        self.max_scale_change = max_scale_change
+
+        self.xs = np.empty(0)
+        self.ys = np.empty(0)
+        self._key = None
+        self._window = None
+        self._scale = None
+
+    def invalidate(self):
+        self._window = None
+
+    def _refresh(self, key, left, right, scale):
+        """
+        Пересчитывает точки, если изменился key, масштаб
+        или видимая область [left, right] вышла за посчитанное окно
+        """
+        if self._is_valid(key, left, right, scale):
+            return
+
+        width = right - left
+        margin = width * (self.window_screens - 1) / 2
+        window_left, window_right = left - margin, right + margin
+        count = max(256, int(width * scale * self.samples_per_pixel * self.window_screens))
+
+        xs, ys = self._build(np.linspace(window_left, window_right, count))
+        order = np.argsort(xs)
+        self.xs, self.ys = xs[order], ys[order]
+
+        self._key = key
+        self._window = (window_left, window_right)
+        self._scale = scale
+
+    def _build(self, grid):
+        raise NotImplementedError
+
+    def _is_valid(self, key, left, right, scale):
+        if self._key != key or self._window is None:
+            return False
+        ratio = scale / self._scale
+        if not 1 / self.max_scale_change <= ratio <= self.max_scale_change:
+            return False
+        return self._window[0] <= left and right <= self._window[1]
+
+    def near(self, world_x, world_y, radius):
+        """Точки индекса ближе radius к (world_x, world_y): список (x, y, расстояние)"""
+        start = np.searchsorted(self.xs, world_x - radius)
+        end = np.searchsorted(self.xs, world_x + radius, side='right')
+        result = []
+        for x, y in zip(self.xs[start:end], self.ys[start:end]):
+            distance = math.hypot(x - world_x, y - world_y)
+            if distance < radius:
+                result.append((float(x), float(y), distance))
+        return result
+
+
+class IntersectionIndex(WindowedIndex):
+    """Точки пересечения видимых графиков"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._functions = []
+
+    def update(self, functions, revision, left, right, scale):
+        """Индекс для видимых functions; revision меняется при любом изменении набора"""
+        self._functions = [data['func'] for data in functions if data['visible']]
+        self._refresh(revision, left, right, scale)
+
+    def _build(self, grid):
+        visible = self._functions
+        values = [evaluate_function(func, grid) for func in visible]
+
+        # Смены знака f_i - f_j по всем парам; бисекцию потом делаем для всех
+        # пар разом, вычисляя каждую функцию один раз за итерацию
+        exact_x, exact_y = [np.empty(0)], [np.empty(0)]
+        lo, hi, first, second = [np.empty(0)], [np.empty(0)], [np.empty(0, int)], [np.empty(0, int)]
+        for i, j in self._pairs(len(visible)):
+            zeros, brackets = sign_changes(values[i] - values[j])
+            exact_x.append(grid[zeros])
+            exact_y.append(values[i][zeros])
+            lo.append(grid[brackets])
+            hi.append(grid[brackets + 1])
+            first.append(np.full(len(brackets), i))
+            second.append(np.full(len(brackets), j))
+
+        lo, hi = np.concatenate(lo), np.concatenate(hi)
+        first, second = np.concatenate(first), np.concatenate(second)
+
+        def difference(x):
+            return self._evaluate_grouped(visible, first, x) - self._evaluate_grouped(visible, second, x)
+
+        roots, genuine = bisect_roots(difference, lo, hi, difference(lo), difference(hi))
+        roots, first, second = roots[genuine], first[genuine], second[genuine]
+        ys = (self._evaluate_grouped(visible, first, roots) + self._evaluate_grouped(visible, second, roots)) * 0.5
+        exact_x, exact_y = np.concatenate(exact_x), np.concatenate(exact_y)
+
+        return np.concatenate((exact_x, roots)), np.concatenate((exact_y, ys))
+
+    def _pairs(self, count):
+        for i in range(count):
+            for j in range(i + 1, count):
+                yield i, j
+
+    def _evaluate_grouped(self, functions, owner, x):
+        """Значения functions[owner[k]] в x[k]: по одному вызову на функцию"""
+        result = np.full(len(x), np.nan)
+        for index in np.unique(owner):
+            mask = owner == index
+            result[mask] = evaluate_function(functions[index], x[mask])
+        return result
+
+
+class AxisTable(WindowedIndex):
+    """
+    Точки графика одной функции на осях: корни (пересечения с осью x)
+    и пересечение с осью y. Хранится рядом с функцией в DrawingCanvas.functions
+    """
+
+    def __init__(self, func, **kwargs):
+        super().__init__(**kwargs)
+        self.func = func
+        self._y_intercept = None
+
+    @property
+    def y_intercept(self):
+        """f(0) или nan; от камеры не зависит, считаем один раз"""
+        if self._y_intercept is None:
+            self._y_intercept = float(evaluate_function(self.func, np.zeros(1))[0])
+        return self._y_intercept
+
+    def update(self, left, right, scale):
+        self._refresh(None, left, right, scale)
+
+    def _build(self, grid):
+        xs = find_roots(self.func, grid[0], grid[-1], len(grid))
+        ys = np.zeros(len(xs))
+
+        if np.isfinite(self.y_intercept):
+            xs, ys = np.append(xs, 0.0), np.append(ys, self.y_intercept)
+        return xs, ys
@@ -0,0 +1,70 @@
+"""
+Деления координатной сетки и подписи к ним
+Шаг сетки - "красивое" число 1, 2 или 5 × 10^k, ближайшее сверху к шагу,
+при котором линии идут не чаще MIN_GRID_PIXELS. Значения делений - целые
+номера, умноженные на шаг, поэтому ошибка не копится, как при x += step.
+Подписи лежат готовыми QStaticText в LRU по тексту: при зуме и сдвиге
+те же числа не раскладываются заново
+"""
+
+import math
+from collections import OrderedDict
+
+import numpy as np
+from PyQt5.QtGui import QFont
+
+from drawing_objects import DrawingObjects
+
+
+# Линии сетки не ближе этого расстояния на экране
+MIN_GRID_PIXELS = 25
+
+
+def nice_step(min_step):
+    """Наименьший шаг вида 1, 2, 5 × 10^k, не меньший min_step"""
+    power = 10.0 ** math.floor(math.log10(min_step))
+    for factor in (1, 2, 5, 10):
+        if factor * power >= min_step * (1 - 1e-9):
+            return factor * power
+    return 10 * power
+
+
+def grid_step(grid_size):
+    """Шаг сетки в единицах мира при grid_size пикселей на единицу"""
+    return nice_step(MIN_GRID_PIXELS / grid_size)
+
+
+def tick_indices(start, end, step):
+    """Номера делений k (значение k * step), покрывающих [start, end]"""
+    return np.arange(math.floor(start / step), math.ceil(end / step) + 1)
+
+
+def tick_text(index, step):
+    """Подпись деления: столько знаков после запятой, сколько есть у шага"""
+    decimals = max(0, -math.floor(math.log10(step) + 1e-9))
+    text = f"{index * step:.{decimals}f}"
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    return text
+
+
+class TickLabels:
+    """LRU подписей: текст → QStaticText, разложенный один раз"""
+
+    def __init__(self, max_entries=512, point_size=8):
+        self.max_entries = max_entries
+        self.font = QFont()
+        self.font.setPointSize(point_size)
+        self._entries = OrderedDict()
+
+    def get(self, text):
+        static = self._entries.get(text)
+        if static is not None:
+            self._entries.move_to_end(text)
+            return static
+
+        static = DrawingObjects.prepare_text(text, self.font)
+        self._entries[text] = static
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return static
@@ -240,6 +240,35 @@ class FunctionListWidget(QWidget):
         self.title.setText(i18n.get('function_functions'))
 
 
+# Общая таблица стилей панели: один setStyleSheet на всю панель вместо
+# отдельного на каждую кнопку (каждый вызов заново разбирает QSS)
+TOOLBAR_STYLE = """
+    QWidget {
+        background-color: #f5f5f5;
+    }
+    QPushButton[toolButton="true"] {
+        background-color: #e8e8e8;
+        border-radius: 5px;
+        padding: 4px;
+        border: 1px solid #d0d0d0;
+    }
+    QPushButton[toolButton="true"]:hover {
+        background-color: #f0f0f0;
+        border: 1px solid #c0c0c0;
+    }
+    QPushButton[actionButton="true"]:pressed {
+        background-color: #d0d0d0;
+    }
+    QPushButton[toolButton="true"]:checked {
+        background-color: #ffffff;
+        border: 2px solid #a0a0a0;
+    }
+    QLabel[toolLabel="true"] {
+        color: #505050;
+    }
+"""
+
+
 class HoverToolbar(QWidget):
     """Главная панель инструментов"""
     
@@ -255,11 +284,7 @@ class HoverToolbar(QWidget):
         super().__init__(parent)
         
         self.setMaximumHeight(200)
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #f5f5f5;
-            }
-        """)
+        self.setStyleSheet(TOOLBAR_STYLE)
         
         self.tool_buttons = {}
         self.tool_labels = {}
@@ -277,10 +302,11 @@ class HoverToolbar(QWidget):
         self.show()
 
     def init_ui(self):
-        """Инициализировать интерфейс"""
+        """Инициализировать интерфейс (ввод функций достраивается после первого кадра)"""
         main_layout = QVBoxLayout(self)
         main_layout.setSpacing(5)
         main_layout.setContentsMargins(15, 5, 15, 5)
+        self.main_layout = main_layout
 
         # Слой кнопок инструментов
         buttons_layout = QHBoxLayout()
@@ -306,32 +332,16 @@ class HoverToolbar(QWidget):
 
             btn = QPushButton()
             btn.setObjectName(btn_name)
-            btn.setIcon(QIcon(f"icons/{btn_name}.png"))
+            btn.setProperty('toolButton', True)
             btn.setIconSize(QSize(24, 24))
             btn.setFixedSize(40, 40)
-            btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #e8e8e8;
-                    border-radius: 5px;
-                    padding: 4px;
-                    border: 1px solid #d0d0d0;
-                }
-                QPushButton:hover {
-                    background-color: #f0f0f0;
-                    border: 1px solid #c0c0c0;
-                }
-                QPushButton:checked {
-                    background-color: #ffffff;
-                    border: 2px solid #a0a0a0;
-                }
-            """)
             btn.setCheckable(True)
             btn.clicked.connect(self.on_tool_selected)
 
             label = QLabel(btn_label)
             label.setAlignment(Qt.AlignCenter)
             label.setFont(QFont("Arial", 8))
-            label.setStyleSheet("color: #505050;")
+            label.setProperty('toolLabel', True)
 
             vlay.addWidget(btn)
             vlay.addWidget(label)
@@ -365,7 +375,19 @@ class HoverToolbar(QWidget):
         
         buttons_layout.addStretch()
 
-        # Виджеты функций
+        main_layout.addLayout(buttons_layout)
+
+    def load_icons(self):
+        """Загрузить иконки кнопок (декодирование PNG - заметная часть запуска)"""
+        buttons = list(self.tool_buttons.values()) + [self.grid_btn, self.save_btn, self.load_btn]
+        for btn in buttons:
+            btn.setIcon(QIcon(f"icons/{btn.objectName()}.png"))
+
+    def build_function_widgets(self):
+        """Создать ввод и список функций (не нужны для первого кадра)"""
+        if self.function_input is not None:
+            return
+
         self.function_input = FunctionInput()
         self.function_input.function_added.connect(self.on_function_added)
 
@@ -373,9 +395,8 @@ class HoverToolbar(QWidget):
         self.function_list.function_toggled.connect(self.on_function_toggled)
         self.function_list.function_deleted.connect(self.on_function_deleted)
 
-        main_layout.addLayout(buttons_layout)
-        main_layout.addWidget(self.function_input)
-        main_layout.addWidget(self.function_list)
+        self.main_layout.addWidget(self.function_input)
+        self.main_layout.addWidget(self.function_list)
 
     def _create_tool_button(self, tool_name, label_text):
         """Создать контейнер с кнопкой и подписью"""
@@ -386,34 +407,16 @@ class HoverToolbar(QWidget):
         
         btn = QPushButton()
         btn.setObjectName(tool_name)
-        btn.setIcon(QIcon(f"icons/{tool_name}.png"))
+        btn.setProperty('toolButton', True)
+        btn.setProperty('actionButton', True)
         btn.setIconSize(QSize(24, 24))
         btn.setFixedSize(40, 40)
-        btn.setStyleSheet("""
-            QPushButton {
-                background-color: #e8e8e8;
-                border-radius: 5px;
-                padding: 4px;
-                border: 1px solid #d0d0d0;
-            }
-            QPushButton:hover {
-                background-color: #f0f0f0;
-                border: 1px solid #c0c0c0;
-            }
-            QPushButton:pressed {
-                background-color: #d0d0d0;
-            }
-            QPushButton:checked {
-                background-color: #ffffff;
-                border: 2px solid #a0a0a0;
-            }
-        """)
         layout.addWidget(btn)
         
         label = QLabel(label_text)
         label.setAlignment(Qt.AlignCenter)
         label.setFont(QFont("Arial", 8))
-        label.setStyleSheet("color: #505050;")
+        label.setProperty('toolLabel', True)
         layout.addWidget(label)
         
         return {
@@ -492,9 +495,10 @@ class HoverToolbar(QWidget):
         self.load_label.setText(i18n.get('toolbar_load'))
         print(f"DEBUG: Load: {i18n.get('toolbar_load')}")
         
-        # Обновляем виджеты функций
-        self.function_input.update_language()
-        self.function_list.update_language()
+        # Обновляем виджеты функций (если они уже созданы)
+        if self.function_input is not None:
+            self.function_input.update_language()
+            self.function_list.update_language()
         
         print(f"DEBUG: update_language() completed\n")
 
@@ -0,0 +1,219 @@
+"""
+Интервальная арифметика для графиков функций
+Для отрезка [x0, x1] считаем отрезок [lo, hi], в котором гарантированно лежат
+все значения функции, и флаг непрерывности: если он True, на отрезке нет ни
+полюсов, ни выхода из области определения. Работает поверх программы
+CompiledExpression (см. expression_compiler.py), все операции векторные
+"""
+
+import numpy as np
+
+from expression_compiler import CompiledExpression
+
+
+class Interval:
+    """Массивы нижних и верхних границ плюс флаг доказанной непрерывности"""
+
+    __slots__ = ('lo', 'hi', 'continuous')
+
+    def __init__(self, lo, hi, continuous=True):
+        self.lo = lo
+        self.hi = hi
+        self.continuous = continuous
+
+    def __repr__(self):
+        return f"Interval({self.lo!r}, {self.hi!r}, continuous={self.continuous!r})"
+
+
+def _interval(value):
+    """Константы программы превращаем в вырожденные интервалы"""
+    if isinstance(value, Interval):
+        return value
+    return Interval(value, value, True)
+
+
+def _unbounded(mask, lo, hi, continuous):
+    """Там, где mask, значение может быть любым (полюс или выход из области)"""
+    return Interval(
+        np.where(mask, -np.inf, lo),
+        np.where(mask, np.inf, hi),
+        continuous & ~mask,
+    )
+
+
+def _contains_zero(a):
+    return (a.lo <= 0) & (a.hi >= 0)
+
+
+def _add(a, b):
+    a, b = _interval(a), _interval(b)
+    return Interval(a.lo + b.lo, a.hi + b.hi, a.continuous & b.continuous)
+
+
+def _sub(a, b):
+    a, b = _interval(a), _interval(b)
+    return Interval(a.lo - b.hi, a.hi - b.lo, a.continuous & b.continuous)
+
+
+def _neg(a):
+    a = _interval(a)
+    return Interval(-a.hi, -a.lo, a.continuous)
+
+
+def _mul(a, b):
+    a, b = _interval(a), _interval(b)
+    products = [a.lo * b.lo, a.lo * b.hi, a.hi * b.lo, a.hi * b.hi]
+    # 0 * inf в интервальной арифметике равно 0; пустой интервал (nan) остаётся пустым
+    empty = np.isnan(a.lo) | np.isnan(b.lo)
+    products = [np.where(np.isnan(p), 0.0, p) for p in products]
+    lo = np.where(empty, np.nan, np.minimum.reduce(products))
+    hi = np.where(empty, np.nan, np.maximum.reduce(products))
+    return Interval(lo, hi, a.continuous & b.continuous)
+
+
+def _div(a, b):
+    a, b = _interval(a), _interval(b)
+    pole = _contains_zero(b)
+    quotient = _mul(a, Interval(1.0 / b.hi, 1.0 / b.lo, b.continuous))
+    return _unbounded(pole, quotient.lo, quotient.hi, quotient.continuous)
+
+
+def _pow(a, b):
+    a = _interval(a)
+    if not isinstance(b, Interval):
+        return _pow_constant(a, float(b))
+
+    # Переменный показатель: при основании > 0 степень монотонна по каждому
+    # аргументу, значит экстремумы в углах. Иначе честно сдаёмся
+    corners = [a.lo ** b.lo, a.lo ** b.hi, a.hi ** b.lo, a.hi ** b.hi]
+    positive = a.lo > 0
+    return _unbounded(
+        ~positive,
+        np.minimum.reduce(corners),
+        np.maximum.reduce(corners),
+        a.continuous & b.continuous,
+    )
+
+
+def _pow_constant(a, p):
+    if p == round(p):
+        n = int(p)
+        if n == 0:
+            return Interval(np.ones_like(a.lo), np.ones_like(a.hi), a.continuous)
+        if n < 0:
+            return _div(1.0, _pow_constant(a, -n))
+
+        lo_n, hi_n = a.lo ** n, a.hi ** n
+        if n % 2:
+            return Interval(lo_n, hi_n, a.continuous)
+        # Чётная степень: минимум в нуле, если он внутри
+        lo = np.where(_contains_zero(a), 0.0, np.minimum(lo_n, hi_n))
+        return Interval(lo, np.maximum(lo_n, hi_n), a.continuous)
+
+    # Дробная степень определена только для x >= 0
+    return _monotone_on_positive(a, lambda v: v ** p, increasing=p > 0, pole_at_zero=p < 0)
+
+
+def _monotone_on_positive(a, func, increasing, pole_at_zero=False):
+    inside = a.lo >= 0
+    lo = np.maximum(a.lo, 0.0)
+    hi = np.where(a.hi < 0, np.nan, a.hi)
+    y_lo, y_hi = func(lo), func(hi)
+    if not increasing:
+        y_lo, y_hi = y_hi, y_lo
+    continuous = a.continuous & inside
+    if pole_at_zero:
+        continuous = continuous & (lo > 0)
+    return Interval(y_lo, y_hi, continuous)
+
+
+def _sqrt(a):
+    return _monotone_on_positive(_interval(a), np.sqrt, increasing=True)
+
+
+def _abs(a):
+    a = _interval(a)
+    abs_lo, abs_hi = np.abs(a.lo), np.abs(a.hi)
+    lo = np.where(_contains_zero(a), 0.0, np.minimum(abs_lo, abs_hi))
+    return Interval(lo, np.maximum(abs_lo, abs_hi), a.continuous)
+
+
+def _hits_grid(a, offset, period):
+    """Есть ли внутри [lo, hi] точка вида offset + k * period"""
+    return np.ceil((a.lo - offset) / period) <= np.floor((a.hi - offset) / period)
+
+
+def _periodic(a, func, peak):
+    """sin/cos: значения в концах плюс максимумы и минимумы, попавшие внутрь"""
+    a = _interval(a)
+    y0, y1 = func(a.lo), func(a.hi)
+    lo, hi = np.minimum(y0, y1), np.maximum(y0, y1)
+    hi = np.where(_hits_grid(a, peak, 2 * np.pi), 1.0, hi)
+    lo = np.where(_hits_grid(a, peak + np.pi, 2 * np.pi), -1.0, lo)
+    return Interval(lo, hi, a.continuous)
+
+
+def _sin(a):
+    return _periodic(a, np.sin, np.pi / 2)
+
+
+def _cos(a):
+    return _periodic(a, np.cos, 0.0)
+
+
+def _tan(a):
+    # Полюса в pi/2 + k*pi, между ними tan возрастает
+    a = _interval(a)
+    pole = _hits_grid(a, np.pi / 2, np.pi)
+    return _unbounded(pole, np.tan(a.lo), np.tan(a.hi), a.continuous)
+
+
+def _cot(a):
+    # Полюса в k*pi, между ними cot убывает
+    a = _interval(a)
+    pole = _hits_grid(a, 0.0, np.pi)
+    return _unbounded(pole, 1 / np.tan(a.hi), 1 / np.tan(a.lo), a.continuous)
+
+
+# Те же имена, что в expression_compiler.OPERATIONS
+INTERVAL_OPERATIONS = {
+    'add': _add,
+    'sub': _sub,
+    'mul': _mul,
+    'div': _div,
+    'pow': _pow,
+    'neg': _neg,
+    'sin': _sin,
+    'cos': _cos,
+    'tan': _tan,
+    'cot': _cot,
+    'ctg': _cot,
+    'sqrt': _sqrt,
+    'abs': _abs,
+}
+
+
+def enclose(compiled, x0, x1):
+    """Границы значений compiled на отрезках [x0[i], x1[i]]"""
+    x0 = np.asarray(x0, dtype=float)
+    x1 = np.asarray(x1, dtype=float)
+    with np.errstate(all='ignore'):
+        result = _interval(compiled.evaluate(Interval(x0, x1, True), INTERVAL_OPERATIONS))
+        shape = np.shape(x0)
+        return Interval(
+            np.broadcast_to(result.lo, shape).astype(float),
+            np.broadcast_to(result.hi, shape).astype(float),
+            np.broadcast_to(result.continuous, shape),
+        )
+
+
+def interval_function(func):
+    """
+    Функция (x0, x1) → Interval для func или None, если func не умеет
+    интервальную арифметику (выражения из sympy, константы)
+    """
+    if not isinstance(func, CompiledExpression) or func.is_constant():
+        return None
+    if any(op not in INTERVAL_OPERATIONS for op, _ in func.program):
+        return None
+    return lambda x0, x1: enclose(func, x0, x1)
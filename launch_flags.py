@@ -0,0 +1,43 @@
+"""
+Флаги командной строки, переключающие режимы холста
+Как и --startup-profile, флаги убираются из argv до того, как его увидит Qt
+"""
+
+import sys
+
+
+# Графики обычной адаптивной выборкой, без интервальной арифметики
+NO_INTERVAL_PLOTTING_FLAG = '--no-interval-plotting'
+# Прилипание в фоновом потоке
+THREADED_SNAP_FLAG = '--threaded-snap'
+# Выбор объекта правым кликом по буферу номеров, а не перебором
+PICK_BUFFER_FLAG = '--pick-buffer'
+
+
+def take_flag(flag, argv=None):
+    """Был ли флаг в командной строке; сам флаг из argv убираем"""
+    argv = sys.argv if argv is None else argv
+    present = flag in argv
+    while flag in argv:
+        argv.remove(flag)
+    return present
+
+
+class LaunchFlags:
+    """Режимы холста, выбранные при запуске"""
+
+    def __init__(self, interval_plotting=True, threaded_snap=False, pick_buffer=False):
+        self.interval_plotting = interval_plotting
+        self.threaded_snap = threaded_snap
+        self.pick_buffer = pick_buffer
+
+    @classmethod
+    def from_argv(cls, argv=None):
+        return cls(interval_plotting=not take_flag(NO_INTERVAL_PLOTTING_FLAG, argv),
+                   threaded_snap=take_flag(THREADED_SNAP_FLAG, argv),
+                   pick_buffer=take_flag(PICK_BUFFER_FLAG, argv))
+
+    def apply(self, canvas):
+        canvas.set_interval_plotting(self.interval_plotting)
+        canvas.set_threaded_snapping(self.threaded_snap)
+        canvas.set_pick_buffer(self.pick_buffer)
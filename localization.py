@@ -33,12 +33,15 @@ LOCALIZATION = {
         'dialog_save_prompt': 'File name:',
         'dialog_load_title': 'Load Project',
         'dialog_load_prompt': 'File name:',
+        'dialog_loading': 'Loading project...',
+        'dialog_cancel': 'Cancel',
         
         'msg_saved': 'Saved: ',
         'msg_loaded': 'Loaded: ',
         'msg_error': 'Error: ',
         'msg_error_save': 'Save error: ',
         'msg_error_load': 'Load error: ',
+        'msg_load_cancelled': 'Load cancelled: ',
         'msg_file_not_found': 'File not found: ',
         'msg_initialized': 'DrawingCanvas initialized',
         'msg_tool_changed': 'Tool: ',
@@ -78,12 +81,15 @@ LOCALIZATION = {
         'dialog_save_prompt': 'Имя файла:',
         'dialog_load_title': 'Загрузить проект',
         'dialog_load_prompt': 'Имя файла:',
+        'dialog_loading': 'Загрузка проекта...',
+        'dialog_cancel': 'Отмена',
         
         'msg_saved': 'Сохранено: ',
         'msg_loaded': 'Загружено: ',
         'msg_error': 'Ошибка: ',
         'msg_error_save': 'Ошибка сохранения: ',
         'msg_error_load': 'Ошибка загрузки: ',
+        'msg_load_cancelled': 'Загрузка отменена: ',
         'msg_file_not_found': 'Файл не найден: ',
         'msg_initialized': 'DrawingCanvas инициализирован',
         'msg_tool_changed': 'Инструмент: ',
@@ -1,32 +1,68 @@
 import sys
+
+from startup_profile import StartupProfiler
+from launch_flags import LaunchFlags
+
+# Профиль запуска (--startup-profile); отсчёт идёт с этой строки
+profiler = StartupProfiler.from_argv()
+# Режимы холста из командной строки (launch_flags.py)
+launch_flags = LaunchFlags.from_argv()
+
 import math
 import json
+import threading
+import time
 from pathlib import Path
 
 import numpy as np
-import sympy
-from sympy import symbols, sympify, lambdify, sin, cos, tan, cot, sqrt, Abs, pi, E
+profiler.mark('import numpy')
 
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, 
-    QPushButton, QLabel, QInputDialog
+    QPushButton, QLabel, QInputDialog, QProgressDialog
 )
-from PyQt5.QtCore import Qt, QPointF, QRectF, pyqtSignal
-from PyQt5.QtGui import QPainter, QPen, QColor, QFont, QBrush
+from PyQt5.QtCore import Qt, QPointF, QRectF, QTimer, pyqtSignal
+from PyQt5.QtGui import QPainter, QPen, QColor, QFontMetrics, QFontMetricsF, QTransform
+profiler.mark('import PyQt5')
 
+# sympy здесь не импортируем: он нужен только для выражений, которые не понял
+# expression_compiler, и подгружается в фоне после первого кадра
 from hover_toolbar import HoverToolbar, set_i18n
 from drawing_objects import DrawingObjects
+from curve_sampler import AdaptiveSampler, decimate_columns
+from sample_cache import SampleTileCache
+from render_layers import LayerStack
+from grid_ticks import TickLabels, grid_step, tick_indices, tick_text
+from expression_cache import CompiledExpressionCache
+from function_index import IntersectionIndex, AxisTable
+from spatial_index import SnapIndex, CullIndex
+from viewport_clip import clip_polyline
+from columnar_store import PointStore
+from snap_scheduler import SnapScheduler
+from pick_buffer import PickBuffer
+import project_binary
+from project_loader import ProjectLoader
+from scene_model import (
+    Line, Circle, Polygon, Angle, Text, draw_objects
+)
 from localization import Localization
 
 # Глобальный объект локализации (создаётся один раз)
 i18n = Localization('en')
 
+# Все цифры → '0': строка координат превращается в шаблон её ширины
+DIGITS_TO_ZERO = str.maketrans('123456789', '000000000')
+
 # ВОТ ЭТА СТРОКА - передаём i18n в hover_toolbar! (оно не работает с простым импортом)
 # Конечно, оно же не в классе даже (я не буду это менять)
 set_i18n(i18n)
+profiler.mark('import app modules')
 
 class DrawingCanvas(QWidget):
     """Основной холст для рисования графиков и геометрических фигур"""
+
+    # Первый кадр нарисован - можно достраивать остальное
+    first_frame_painted = pyqtSignal()
     
     def __init__(self):
         super().__init__()
@@ -34,8 +70,11 @@ class DrawingCanvas(QWidget):
         # Объекты и функции
         self.objects = []
         self.functions = {}
-        self.points = []
-        self.x = symbols('x')
+        # Точки - колонками в numpy (id, x, y), чтобы их могли быть миллионы
+        self.points = PointStore()
+        self.first_frame_done = False
+        # Скомпилированные выражения функций (путь к кэшу на диске задаёт MainWindow)
+        self.expression_cache = CompiledExpressionCache()
         
         # Текущее состояние инструмента
         self.current_tool = None
@@ -50,6 +89,10 @@ class DrawingCanvas(QWidget):
         self.min_zoom = 0.01
         self.max_zoom = 10.0
         self.show_grid = True
+        # Подписи делений сетки (QStaticText по тексту)
+        self.grid_labels = TickLabels()
+        # Размеры плашки с координатами курсора по шаблону строки
+        self._cursor_info_sizes = {}
         
         # Панорамирование
         self.offset_x = 0.0
@@ -66,6 +109,37 @@ class DrawingCanvas(QWidget):
         # Система прилипания (snap)
         self.snap_point = None
         self.snap_radius = 15
+        # Snap считается не чаще раза за кадр (по желанию - в фоновом потоке);
+        # индексы прилипания общие для потоков, поэтому расчёт под замком, и под
+        # ним же всё, что меняет сцену, функции или индексы (фоновый поток сам
+        # перестраивает сетку центров и индекс пересечений)
+        self.snap_lock = threading.RLock()
+        self.snap_scheduler = SnapScheduler(self.find_snap_point)
+        self.snap_scheduler.updated.connect(self.update)
+        # Выбор объекта под курсором чтением пикселя из буфера номеров
+        # (по желанию; перерисовывается только при смене камеры или сцены)
+        self.use_pick_buffer = False
+        self.pick_buffer = PickBuffer(self._render_pick_ids)
+        
+        # Адаптивная выборка точек для графиков (с интервальной арифметикой:
+        # меньше точек и честные разрывы на асимптотах)
+        self.sampler = AdaptiveSampler(use_intervals=True)
+        self.sample_cache = SampleTileCache(self.sampler)
+        # Точки пересечения графиков для прилипания (пересчёт при смене функций/камеры)
+        self.intersection_index = IntersectionIndex()
+        # Центры окружностей и стороны фигур для прилипания
+        self.snap_index = SnapIndex()
+        # Рамки фигур: рисуем и кладём в буфер выбора только видимое
+        self.cull_index = CullIndex()
+        
+        # Слои отрисовки: перерисовываются только при изменении камеры или содержимого
+        self.scene_revision = 0
+        self.functions_revision = 0
+        self.scene_draw_seconds = 0.0
+        self.layers = LayerStack()
+        self.layers.add_layer('grid', self.draw_grid)
+        self.layers.add_layer('functions', self._draw_functions_layer)
+        self.layers.add_layer('scene', self._draw_scene_layer)
         
         # Настройки виджета
         self.setMouseTracking(True)
@@ -85,49 +159,27 @@ class DrawingCanvas(QWidget):
         self._process_function(function_text, func_index)
 
     def _process_function(self, function_text, func_index):
-        """Парсим и компилируем функцию с помощью sympy"""
+        """Парсим и компилируем функцию (лёгкий компилятор, sympy - запасной путь)"""
         try:
-            processed_text = self._preprocess_function(function_text)
+            expr, func = self.expression_cache.get(function_text)
             
-            if 'x' not in processed_text:
-                expr = sympify(processed_text)
-                const_value = float(expr)
-                func = lambda x_vals: np.full_like(np.asarray(x_vals), const_value, dtype=float)
-            else:
-                expr = sympify(processed_text)
-                func = lambdify(
-                    self.x, expr,
-                    modules=[{
-                        'sin': np.sin, 'cos': np.cos, 'tan': np.tan,
-                        'cot': lambda x: 1/np.tan(x),
-                        'ctg': lambda x: 1/np.tan(x),
-                        'sqrt': np.sqrt, 'abs': np.abs, 'Abs': np.abs,
-                        'pi': np.pi, 'e': np.e,
-                    }, 'numpy']
-                )
-            
-            self.functions[func_index] = {
-                'expr': expr,
-                'func': func,
-                'text': function_text,
-                'visible': True,
-                'color': self._get_color_for_index(func_index)
-            }
-            self.update()
+            self.sample_cache.invalidate(func_index)
+            with self.snap_lock:
+                self.functions[func_index] = {
+                    'expr': expr,
+                    'func': func,
+                    'text': function_text,
+                    'visible': True,
+                    'color': self._get_color_for_index(func_index),
+                    # Корни и пересечение с осью y, считаются лениво под текущий экран
+                    'axis': AxisTable(func)
+                }
+            self.functions_changed()
             
         except Exception as e:
             msg = i18n.get('msg_function_error').format(function_text, str(e))
             print(msg)
 
-    def _preprocess_function(self, func_text):
-        """Преобразуем пользовательские обозначения в Python-синтаксис"""
-        func_text = func_text.replace('^', '**')
-        func_text = func_text.replace('cot(', '(1/tan(')
-        func_text = func_text.replace('ctg(', '(1/tan(')
-        cot_count = func_text.count('(1/tan(')
-        func_text += ')' * cot_count
-        return func_text
-
     def _get_color_for_index(self, index):
         colors = [
             QColor(40, 200, 40),
@@ -143,26 +195,162 @@ class DrawingCanvas(QWidget):
 
     def delete_function(self, func_index):
         if func_index in self.functions:
-            del self.functions[func_index]
-            self.update()
+            with self.snap_lock:
+                del self.functions[func_index]
+            self.sample_cache.invalidate(func_index)
+            self.functions_changed()
 
     def toggle_function(self, func_index, visible):
         if func_index in self.functions:
-            self.functions[func_index]['visible'] = visible
-            self.update()
+            with self.snap_lock:
+                self.functions[func_index]['visible'] = visible
+            self.sample_cache.invalidate(func_index)
+            self.functions_changed()
+
+    def functions_changed(self):
+        """Набор функций изменился - слой графиков надо перерисовать"""
+        self.functions_revision += 1
+        self.update()
+
+    def set_interval_plotting(self, enabled):
+        """Включить/выключить интервальную арифметику при построении графиков"""
+        self.sampler.use_intervals = enabled
+        self.sample_cache.clear()
+        self.functions_changed()
+
+    def set_threaded_snapping(self, enabled):
+        """Считать прилипание в фоновом потоке (ввод не ждёт дорогой snap)"""
+        self.snap_scheduler.set_threaded(enabled)
+        self.update()
+
+    def set_pick_buffer(self, enabled):
+        """Искать объект под курсором по буферу номеров вместо перебора"""
+        self.use_pick_buffer = enabled
+        self.pick_buffer.invalidate()
+
+    def scene_changed(self):
+        """Объекты или точки изменились - слой геометрии надо перерисовать"""
+        self.scene_revision += 1
+        self.update()
+
+    def add_point(self, pos):
+        """Добавляет точку; возвращает её id"""
+        with self.snap_lock:
+            return self.points.append(*pos)
+
+    def add_points(self, xs, ys):
+        """Массовое добавление точек из массивов координат; возвращает их id"""
+        with self.snap_lock:
+            return self.points.extend(xs, ys)
+
+    def remove_point(self, point_id):
+        with self.snap_lock:
+            return self.points.remove(point_id)
+
+    def add_object(self, obj):
+        with self.snap_lock:
+            self.objects.append(obj)
+            self.snap_index.add_object(obj)
+            self.cull_index.add_object(obj)
+
+    def add_objects(self, objects):
+        """Много фигур разом (кусок загружаемого проекта): индексы пополняются пачкой"""
+        with self.snap_lock:
+            self.objects.extend(objects)
+            self.snap_index.add_objects(objects)
+            self.cull_index.add_objects(objects)
+
+    def remove_object(self, obj):
+        with self.snap_lock:
+            self.objects.remove(obj)
+            self.snap_index.remove_object(obj)
+            self.cull_index.remove_object(obj)
+
+    def take_scene(self):
+        """
+        Забирает сцену (фигуры, точки, функции, камеру и индексы) и оставляет
+        холст пустым; restore_scene() вернёт её как было
+        """
+        with self.snap_lock:
+            scene = {
+                'objects': self.objects,
+                'points': self.points,
+                'functions': self.functions,
+                'camera': (self.zoom_factor, self.offset_x, self.offset_y),
+                'snap_index': self.snap_index,
+                'cull_index': self.cull_index,
+            }
+            self.objects = []
+            self.points = PointStore()
+            self.functions = {}
+            self.snap_index = SnapIndex()
+            self.cull_index = CullIndex()
+        self.sample_cache.clear()
+        self.angle_points = []
+        self.temp_object = None
+        self.functions_changed()
+        self.scene_changed()
+        return scene
+
+    def restore_scene(self, scene):
+        """Возвращает сцену, забранную take_scene()"""
+        with self.snap_lock:
+            self.objects = scene['objects']
+            self.points = scene['points']
+            self.functions = scene['functions']
+            self.zoom_factor, self.offset_x, self.offset_y = scene['camera']
+            self.snap_index = scene['snap_index']
+            self.cull_index = scene['cull_index']
+        self.sample_cache.clear()
+        self.angle_points = []
+        self.temp_object = None
+        self.functions_changed()
+        self.scene_changed()
+
+    def rebuild_scene_indexes(self):
+        """После массовой замены objects (открытие проекта)"""
+        with self.snap_lock:
+            self.snap_index.load(self.objects)
+            # Сетку рамок строим сразу с ячейкой под текущий экран,
+            # иначе первый же кадр перестроит её заново
+            self.cull_index.clear()
+            self._fit_cull_cells()
+            self.cull_index.load(self.objects)
 
     # ========== СИСТЕМА ПРИЛИПАНИЯ (SNAP) ==========
 
-    def find_snap_point(self, world_x, world_y):
-        """Ищет ближайшую "важную" точку для прилипания"""
-        snap_points = []
-        snap_points.extend(self._find_function_intersections(world_x, world_y))
-        snap_points.extend(self._find_axis_intersections(world_x, world_y))
-        snap_points.extend(self._find_existing_points(world_x, world_y))
-        snap_points.extend(self._find_circle_centers(world_x, world_y))
-        
+    def snap_view(self):
+        """
+        Снимок камеры для snap: (размер клетки, левый и правый край экрана в мире)
+        Берётся в GUI-потоке - фоновый поток не должен трогать сам виджет
+        """
+        left, _ = self.screen_to_world(0, 0)
+        right, _ = self.screen_to_world(self.width(), 0)
+        return self.get_grid_size(), left, right
+
+    def find_snap_point(self, world_x, world_y, view=None, cancelled=None):
+        """
+        Ищет ближайшую "важную" точку для прилипания
+        view - снимок snap_view(); без него снимается сейчас (только из GUI-потока)
+        cancelled() - запрос устарел (курсор уже ушёл), дальше искать незачем
+        """
+        if view is None:
+            view = self.snap_view()
+        sources = [
+            self._find_function_intersections,
+            self._find_axis_intersections,
+            self._find_existing_points,
+            self._find_circle_centers,
+        ]
         if self.current_tool == 'point':
-            snap_points.extend(self._find_figure_sides(world_x, world_y))
+            sources.append(self._find_figure_sides)
+        
+        snap_points = []
+        with self.snap_lock:
+            for find in sources:
+                if cancelled is not None and cancelled():
+                    return None
+                snap_points.extend(find(world_x, world_y, view))
         
         if snap_points:
             snap_points.sort(key=lambda p: p['distance'])
@@ -170,286 +358,224 @@ class DrawingCanvas(QWidget):
         
         return None
 
-    def _find_function_intersections(self, world_x, world_y):
-        snap_points = []
-        snap_range = self.snap_radius / self.get_grid_size()
-        func_list = list(self.functions.values())
+    def _find_function_intersections(self, world_x, world_y, view):
+        grid_size, left, right = view
+        snap_range = self.snap_radius / grid_size
         
-        for i in range(len(func_list)):
-            for j in range(i + 1, len(func_list)):
-                if not func_list[i]['visible'] or not func_list[j]['visible']:
-                    continue
-                
-                try:
-                    x_min, x_max = world_x - snap_range, world_x + snap_range
-                    x_test = np.linspace(x_min, x_max, 100)
-                    y1 = func_list[i]['func'](x_test)
-                    y2 = func_list[j]['func'](x_test)
-                    
-                    diff = np.abs(y1 - y2)
-                    indices = np.where(diff < snap_range)[0]
-                    
-                    for idx in indices:
-                        if np.isfinite(y1[idx]) and np.isfinite(y2[idx]):
-                            px, py = x_test[idx], (y1[idx] + y2[idx]) / 2
-                            dist = math.sqrt((px - world_x)**2 + (py - world_y)**2)
-                            
-                            if dist < snap_range:
-                                snap_points.append({
-                                    'x': px, 'y': py, 'distance': dist,
-                                    'type': 'intersection'
-                                })
-                except:
-                    pass
+        # Индекс пересчитывается только при смене функций, масштаба
+        # или когда экран уходит за посчитанное окно
+        self.intersection_index.update(
+            list(self.functions.values()), self.functions_revision,
+            left, right, grid_size
+        )
         
-        return snap_points
+        return [
+            {'x': px, 'y': py, 'distance': dist, 'type': 'intersection'}
+            for px, py, dist in self.intersection_index.near(world_x, world_y, snap_range)
+        ]
 
-    def _find_axis_intersections(self, world_x, world_y):
+    def _find_axis_intersections(self, world_x, world_y, view):
         snap_points = []
-        snap_range = self.snap_radius / self.get_grid_size()
+        grid_size, left, right = view
+        snap_range = self.snap_radius / grid_size
         
         for func_data in self.functions.values():
             if not func_data['visible']:
                 continue
             
-            try:
-                func = func_data['func']
-                x_min, x_max = world_x - snap_range, world_x + snap_range
-                x_test = np.linspace(x_min, x_max, 100)
-                y_test = func(x_test)
-                
-                indices = np.where(np.abs(y_test) < snap_range)[0]
-                for idx in indices:
-                    if np.isfinite(y_test[idx]):
-                        px, py = x_test[idx], y_test[idx]
-                        dist = math.sqrt((px - world_x)**2 + (py - world_y)**2)
-                        
-                        if dist < snap_range:
-                            snap_points.append({
-                                'x': px, 'y': py, 'distance': dist,
-                                'type': 'axis_intersection'
-                            })
-                
-                try:
-                    y_at_zero = func(0)
-                    if np.isfinite(y_at_zero) and abs(y_at_zero - world_y) < snap_range:
-                        dist = abs(y_at_zero - world_y)
-                        snap_points.append({
-                            'x': 0, 'y': y_at_zero, 'distance': dist,
-                            'type': 'axis_intersection'
-                        })
-                except:
-                    pass
-                    
-            except:
-                pass
+            # Таблица пересчитывается, только когда экран уходит за её окно
+            table = func_data['axis']
+            table.update(left, right, grid_size)
+            snap_points.extend(
+                {'x': px, 'y': py, 'distance': dist, 'type': 'axis_intersection'}
+                for px, py, dist in table.near(world_x, world_y, snap_range)
+            )
         
         return snap_points
 
-    def _find_existing_points(self, world_x, world_y):
+    def _snap_range(self, view):
+        """Радиус прилипания в мировых координатах; под него же подгоняем сетки индексов"""
+        snap_range = self.snap_radius / view[0]
+        self.snap_index.fit_cell_size(snap_range)
+        self.points.fit_cell_size(snap_range)
+        return snap_range
+
+    def _find_existing_points(self, world_x, world_y, view):
         snap_points = []
-        snap_range = self.snap_radius / self.get_grid_size()
-        
-        for i, point in enumerate(self.points):
-            px, py = point['pos']
-            dist = math.sqrt((px - world_x)**2 + (py - world_y)**2)
-            if dist < snap_range:
-                snap_points.append({
-                    'x': px, 'y': py, 'distance': dist,
-                    'type': 'point', 'point_index': i
-                })
+        snap_range = self._snap_range(view)
+        
+        # Векторная проверка точек из ячеек сетки рядом с курсором
+        ids, xs, ys, distances = self.points.within(world_x, world_y, snap_range)
+        for point_id, px, py, dist in zip(ids.tolist(), xs.tolist(), ys.tolist(), distances.tolist()):
+            snap_points.append({
+                'x': px, 'y': py, 'distance': dist,
+                'type': 'point', 'point': point_id
+            })
         
         return snap_points
 
-    def _find_circle_centers(self, world_x, world_y):
+    def _find_circle_centers(self, world_x, world_y, view):
         snap_points = []
-        snap_range = self.snap_radius / self.get_grid_size()
+        snap_range = self._snap_range(view)
         
-        for obj in self.objects:
-            if obj['type'] == 'circle':
-                cx, cy = obj['center']
-                dist = math.sqrt((cx - world_x)**2 + (cy - world_y)**2)
-                if dist < snap_range:
-                    snap_points.append({
-                        'x': cx, 'y': cy, 'distance': dist,
-                        'type': 'circle_center'
-                    })
+        for cx, cy in self.snap_index.centers_near(world_x, world_y, snap_range):
+            dist = math.hypot(cx - world_x, cy - world_y)
+            if dist < snap_range:
+                snap_points.append({
+                    'x': cx, 'y': cy, 'distance': dist,
+                    'type': 'circle_center'
+                })
         
         return snap_points
 
-    def _find_figure_sides(self, world_x, world_y):
+    def _find_figure_sides(self, world_x, world_y, view):
         snap_points = []
-        snap_range = self.snap_radius / self.get_grid_size()
-        
-        for obj in self.objects:
-            if obj['type'] == 'line':
-                x1, y1 = obj['points'][:2]
-                x2, y2 = obj['points'][2:]
-                
-                closest = self._closest_point_on_line(world_x, world_y, x1, y1, x2, y2)
-                if closest:
-                    cx, cy, dist = closest
-                    if dist < snap_range:
-                        snap_points.append({
-                            'x': cx, 'y': cy, 'distance': dist,
-                            'type': 'line_point'
-                        })
-            
-            elif obj['type'] == 'polygon':
-                points = obj['points']
-                for j in range(len(points)):
-                    x1, y1 = points[j]
-                    x2, y2 = points[(j + 1) % len(points)]
-                    
-                    closest = self._closest_point_on_line(world_x, world_y, x1, y1, x2, y2)
-                    if closest:
-                        cx, cy, dist = closest
-                        if dist < snap_range:
-                            snap_points.append({
-                                'x': cx, 'y': cy, 'distance': dist,
-                                'type': 'polygon_point'
-                            })
+        snap_range = self._snap_range(view)
+        
+        # Ближайшие точки сразу всех сторон линий и многоугольников
+        xs, ys, distances, kinds = self.snap_index.sides.closest(world_x, world_y, snap_range)
+        for cx, cy, dist, kind in zip(xs.tolist(), ys.tolist(), distances.tolist(), kinds):
+            snap_points.append({
+                'x': cx, 'y': cy, 'distance': dist,
+                'type': kind
+            })
         
         return snap_points
 
-    def _closest_point_on_line(self, px, py, x1, y1, x2, y2):
-        """Ищет ближайшую точку на отрезке"""
-        dx, dy = x2 - x1, y2 - y1
-        
-        if dx == 0 and dy == 0:
-            dist = math.sqrt((px - x1)**2 + (py - y1)**2)
-            return (x1, y1, dist)
-        
-        t = max(0, min(1, ((px - x1) * dx + (py - y1) * dy) / (dx * dx + dy * dy)))
-        
-        closest_x = x1 + t * dx
-        closest_y = y1 + t * dy
-        dist = math.sqrt((px - closest_x)**2 + (py - closest_y)**2)
-        
-        return (closest_x, closest_y, dist)
-
     # ========== ПОИСК ОБЪЕКТОВ ==========
 
     def find_object_at_point(self, world_x, world_y):
-        """Определяет какой объект находится в позиции"""
+        """
+        Определяет какой объект находится в позиции
+        Возвращает ('point', id точки) для точек из self.points, ('object', объект) для фигур
+        """
+        if self.use_pick_buffer:
+            screen_x, screen_y = self.world_to_screen(world_x, world_y)
+            if self.rect().contains(int(screen_x), int(screen_y)):
+                key = (self._camera_key(), self.scene_revision, self.snap_radius)
+                self.pick_buffer.ensure(key, self.size(), self.devicePixelRatioF())
+                return self.pick_buffer.pick(screen_x, screen_y)
+        
         search_radius = self.snap_radius / self.get_grid_size()
         
-        for i, point in enumerate(self.points):
-            px, py = point['pos']
-            dist = math.sqrt((px - world_x)**2 + (py - world_y)**2)
-            if dist < search_radius:
-                return ('point', i)
-        
-        for i, obj in enumerate(self.objects):
-            if obj['type'] == 'line':
-                x1, y1 = obj['points'][:2]
-                x2, y2 = obj['points'][2:]
-                dist = self._point_to_line_distance(world_x, world_y, x1, y1, x2, y2)
-                if dist < search_radius * 2:
-                    return ('line', i)
-            
-            elif obj['type'] == 'circle':
-                cx, cy = obj['center']
-                r = obj['radius']
-                dist_to_center = math.sqrt((world_x - cx)**2 + (world_y - cy)**2)
-                if abs(dist_to_center - r) < search_radius * 2:
-                    return ('circle', i)
-            
-            elif obj['type'] == 'polygon':
-                points = obj['points']
-                for j in range(len(points)):
-                    x1, y1 = points[j]
-                    x2, y2 = points[(j + 1) % len(points)]
-                    dist = self._point_to_line_distance(world_x, world_y, x1, y1, x2, y2)
-                    if dist < search_radius * 2:
-                        return ('polygon', i)
-            
-            elif obj['type'] == 'angle':
-                vertex = obj['vertex']
-                point1 = obj['point1']
-                point2 = obj['point2']
-                
-                dist1 = self._point_to_line_distance(world_x, world_y, vertex[0], vertex[1], point1[0], point1[1])
-                dist2 = self._point_to_line_distance(world_x, world_y, vertex[0], vertex[1], point2[0], point2[1])
-                
-                if min(dist1, dist2) < search_radius * 2:
-                    return ('angle', i)
-            
-            elif obj['type'] == 'text':
-                tx, ty = obj['pos']
-                dist = math.sqrt((world_x - tx)**2 + (world_y - ty)**2)
-                if dist < search_radius * 2:
-                    return ('text', i)
+        # Как и раньше, из нескольких точек побеждает добавленная первой
+        # (запрос достраивает сетку точек - под тем же замком, что и прилипание)
+        with self.snap_lock:
+            ids = self.points.within(world_x, world_y, search_radius)[0]
+        if len(ids):
+            return ('point', int(ids[0]))
+        
+        for obj in self.objects:
+            if obj.distance_to(world_x, world_y) < search_radius * obj.hit_scale:
+                return ('object', obj)
         
         return None
 
-    def _point_to_line_distance(self, px, py, x1, y1, x2, y2):
-        dx, dy = x2 - x1, y2 - y1
-        
-        if dx == 0 and dy == 0:
-            return math.sqrt((px - x1)**2 + (py - y1)**2)
-        
-        t = max(0, min(1, ((px - x1) * dx + (py - y1) * dy) / (dx * dx + dy * dy)))
-        closest_x = x1 + t * dx
-        closest_y = y1 + t * dy
-        
-        return math.sqrt((px - closest_x)**2 + (py - closest_y)**2)
+    def _render_pick_ids(self, painter, register):
+        """
+        Рисует объекты в буфер выбора толщиной радиуса поиска из find_object_at_point
+        Нарисованное позже перекрывает раньше, поэтому идём с конца, а точки -
+        последними: приоритет тот же, что у перебора
+        """
+        pen = QPen(Qt.black, 1, Qt.SolidLine, Qt.RoundCap, Qt.RoundJoin)
+        
+        def use(target):
+            pen.setColor(register(target))
+            painter.setPen(pen)
+        
+        # Запас отсечения - полтолщины самого толстого пера (hit_scale до 2)
+        for obj in reversed(self.visible_objects(pad=2 * self.snap_radius)):
+            pen.setWidthF(2 * self.snap_radius * obj.hit_scale)
+            use(('object', obj))
+            obj.draw_pick(painter, self)
+        
+        if not self.points:
+            return
+        # Точки считаем разом и рисуем только те, чей кружок задевает экран
+        pen.setWidthF(2 * self.snap_radius)
+        world_x, world_y, ids = self.points.positions()
+        screen_x, screen_y = self.world_to_screen_array(world_x, world_y)
+        margin = self.snap_radius
+        visible = ((screen_x > -margin) & (screen_x < self.width() + margin) &
+                   (screen_y > -margin) & (screen_y < self.height() + margin))
+        for i in np.flatnonzero(visible)[::-1]:
+            use(('point', int(ids[i])))
+            painter.drawPoint(QPointF(screen_x[i], screen_y[i]))
 
     # ========== РИСОВАНИЕ ==========
 
-    def draw_function(self, painter, function_data):
+    def draw_function(self, painter, function_data, func_index=None):
         """Рисует график функции"""
         if not function_data['visible']:
             return
             
         try:
-            left, _ = self.screen_to_world(0, 0)
-            right, _ = self.screen_to_world(self.width(), 0)
+            # Если рисуем только полосу слоя (при панорамировании), считаем только её
+            screen_left, screen_right = 0, self.width()
+            if painter.hasClipping():
+                clip = painter.clipBoundingRect()
+                screen_left, screen_right = clip.left(), clip.right()
+            
+            left, _ = self.screen_to_world(screen_left, 0)
+            right, _ = self.screen_to_world(screen_right, 0)
             
             margin = (right - left) * 0.05
             left -= margin
             right += margin
             
-            x_points = np.linspace(left, right, 2000)
             func = function_data['func']
             
             try:
-                y_points = func(x_points)
+                if func_index is None:
+                    x_points, y_points = self.sampler.sample(
+                        func, left, right, self.get_grid_size(),
+                        self.width() * 1.1, self.devicePixelRatioF()
+                    )
+                else:
+                    x_points, y_points = self.sample_cache.samples(
+                        func_index, func, left, right,
+                        self.get_grid_size(), self.devicePixelRatioF()
+                    )
                 
-                screen_points = []
-                for x, y in zip(x_points, y_points):
-                    if np.isfinite(y):
-                        screen_points.append(self.world_to_screen(x, float(y)))
-                    else:
-                        screen_points.append(None)
+                screen_x, screen_y = self.world_to_screen_array(x_points, y_points)
+                painter.setPen(QPen(function_data['color'], 2))
+                
+                # Разбиваем кривую на куски между точками, где значение не конечно,
+                # и каждый кусок прореживаем по столбцам пикселей перед рисованием
+                area = painter.clipBoundingRect() if painter.hasClipping() else QRectF(self.rect())
+                finite = np.isfinite(screen_y)
+                for start, end in self._segment_runs(finite[:-1] & finite[1:]):
+                    self._draw_run(painter, screen_x[start:end], screen_y[start:end], area)
                 
-                if screen_points:
-                    painter.setPen(QPen(function_data['color'], 2))
-                    
-                    segment_points = []
-                    for point in screen_points:
-                        if point is None:
-                            if len(segment_points) > 1:
-                                for i in range(len(segment_points) - 1):
-                                    x1, y1 = segment_points[i]
-                                    x2, y2 = segment_points[i + 1]
-                                    painter.drawLine(QPointF(x1, y1), QPointF(x2, y2))
-                            segment_points = []
-                        else:
-                            segment_points.append(point)
-                    
-                    if len(segment_points) > 1:
-                        for i in range(len(segment_points) - 1):
-                            x1, y1 = segment_points[i]
-                            x2, y2 = segment_points[i + 1]
-                            painter.drawLine(QPointF(x1, y1), QPointF(x2, y2))
-                            
             except (ValueError, ZeroDivisionError, TypeError, RuntimeWarning):
                 pass
                 
         except Exception as e:
             pass
 
+    def _draw_run(self, painter, run_x, run_y, area, pad=2):
+        """Рисует непрерывный кусок графика: не больше 4 точек на столбец пикселей"""
+        for piece in decimate_columns(run_x, run_y, self.devicePixelRatioF()):
+            if piece[0] == 'band':
+                # Полосу за краем области заливать незачем (а большая заливка дорогая)
+                band_x, y_max, y_min = piece[1:]
+                low, high = area.top() - pad, area.bottom() + pad
+                DrawingObjects.draw_band(painter, band_x, np.clip(y_max, low, high), np.clip(y_min, low, high))
+            else:
+                # Ломаную обрезаем по области отрисовки: у полюса точки уходят на
+                # миллионы пикселей, и Qt обводил бы невидимые километры линии
+                line_x, line_y = run_x[piece[1]], run_y[piece[1]]
+                clip = (area.left() - pad, area.top() - pad, area.right() + pad, area.bottom() + pad)
+                for part_x, part_y in clip_polyline(line_x, line_y, clip):
+                    DrawingObjects.draw_polyline(painter, part_x, part_y)
+
+    def _segment_runs(self, segments):
+        """Серии подряд идущих отмеченных отрезков [s, e) - это точки [s, e + 1)"""
+        edges = np.diff(np.concatenate(([False], segments, [False])).astype(np.int8))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1) + 1
+        return zip(starts, ends)
+
     def get_grid_size(self):
         return self.base_grid_size * self.zoom_factor
 
@@ -497,180 +623,107 @@ class DrawingCanvas(QWidget):
         center_x = self.width() / 2 + self.offset_x
         center_y = self.height() / 2 + self.offset_y
         
-        left, top = self.screen_to_world(0, 0)
-        right, bottom = self.screen_to_world(self.width(), self.height())
+        left, bottom, right, top = self.visible_world_rect()
         
-        if self.zoom_factor < 0.1:
-            step = 10
-        elif self.zoom_factor < 0.5:
-            step = 5
-        elif self.zoom_factor < 1.0:
-            step = 1
-        elif self.zoom_factor < 2.0:
-            step = 0.5
-        else:
-            step = 0.2
-        
-        start_x = math.floor(left / step) * step
-        end_x = math.ceil(right / step) * step
-        start_y = math.floor(bottom / step) * step
-        end_y = math.ceil(top / step) * step
-        
-        font = QFont()
-        font.setPointSize(8)
-        painter.setFont(font)
-        
-        x = start_x
-        while x <= end_x:
-            screen_x, _ = self.world_to_screen(x, 0)
-            painter.setPen(QPen(QColor(200, 200, 200), 1))
-            painter.drawLine(QPointF(screen_x, 0), QPointF(screen_x, self.height()))
-            
-            if abs(x) > step/2:
-                painter.setPen(Qt.black)
-                value = round(x, 3)
-                text = str(int(value)) if value.is_integer() else f"{value}"
-                rect = QRectF(screen_x + 5, center_y + 5, 50, 20)
-                painter.drawText(rect, Qt.AlignLeft | Qt.AlignVCenter, text)
-            x += step
-        
-        y = start_y
-        while y <= end_y:
-            _, screen_y = self.world_to_screen(0, y)
-            painter.setPen(QPen(QColor(200, 200, 200), 1))
-            painter.drawLine(QPointF(0, screen_y), QPointF(self.width(), screen_y))
-            
-            if abs(y) > step/2:
-                painter.setPen(Qt.black)
-                value = round(y, 3)
-                text = str(int(value)) if value.is_integer() else f"{value}"
-                rect = QRectF(center_x + 5, screen_y - 10, 50, 20)
-                painter.drawText(rect, Qt.AlignLeft | Qt.AlignVCenter, text)
-            y += step
+        # Шаг 1, 2, 5 × 10^k под текущий зум; значения делений - k * step
+        step = grid_step(grid_size)
+        x_indices = tick_indices(left, right, step)
+        y_indices = tick_indices(bottom, top, step)
+        grid_xs = x_indices * step
+        grid_ys = y_indices * step
+        
+        # Линии сетки и оси - в координатах мира, каждые одним drawLines
+        painter.save()
+        painter.setTransform(self.world_transform(), True)
+        DrawingObjects.draw_lines_batch(
+            painter,
+            np.concatenate((grid_xs, np.full(len(grid_ys), left))),
+            np.concatenate((np.full(len(grid_xs), bottom), grid_ys)),
+            np.concatenate((grid_xs, np.full(len(grid_ys), right))),
+            np.concatenate((np.full(len(grid_xs), top), grid_ys)),
+            DrawingObjects.world_pen(painter, (200, 200, 200), 1)
+        )
+        DrawingObjects.draw_lines_batch(painter, np.array([left, 0.0]), np.array([0.0, bottom]),
+                                        np.array([right, 0.0]), np.array([0.0, top]),
+                                        DrawingObjects.world_pen(painter, Qt.black, 2))
+        painter.restore()
+        
+        # Подписи - в пикселях экрана, готовым QStaticText из кэша
+        labels = self.grid_labels
+        painter.setFont(labels.font)
+        painter.setPen(Qt.black)
+        
+        for index, x in zip(x_indices.tolist(), grid_xs.tolist()):
+            if index:
+                static = labels.get(tick_text(index, step))
+                screen_x = center_x + x * grid_size
+                painter.drawStaticText(QPointF(screen_x + 5, center_y + 15 - static.size().height() / 2), static)
         
-        painter.setPen(QPen(Qt.black, 2))
-        painter.drawLine(QPointF(0, center_y), QPointF(self.width(), center_y))
-        painter.drawLine(QPointF(center_x, 0), QPointF(center_x, self.height()))
+        for index, y in zip(y_indices.tolist(), grid_ys.tolist()):
+            if index:
+                static = labels.get(tick_text(index, step))
+                screen_y = center_y - y * grid_size
+                painter.drawStaticText(QPointF(center_x + 5, screen_y - static.size().height() / 2), static)
         
-        painter.drawText(QPointF(self.width() - 20, center_y - 5), "X")
-        painter.drawText(QPointF(center_x + 5, 15), "Y")
+        ascent = QFontMetricsF(labels.font).ascent()
+        painter.drawStaticText(QPointF(self.width() - 20, center_y - 5 - ascent), labels.get("X"))
+        painter.drawStaticText(QPointF(center_x + 5, 15 - ascent), labels.get("Y"))
         
         painter.restore()
 
     def draw_object(self, painter, obj):
         """Рисует один геометрический объект"""
-        if obj['type'] == 'point':
-            x, y = self.world_to_screen(*obj['pos'])
-            DrawingObjects.draw_point(painter, x, y)
-            
-        elif obj['type'] == 'line':
-            x1, y1 = self.world_to_screen(*obj['points'][:2])
-            x2, y2 = self.world_to_screen(*obj['points'][2:])
-            
-            painter.setPen(QPen(Qt.black, 2))
-            painter.drawLine(QPointF(x1, y1), QPointF(x2, y2))
-            
-            if obj.get('infinite', False):
-                pen = QPen(Qt.black, 1)
-                pen.setDashPattern([5, 5])
-                painter.setPen(pen)
-                
-                dx = x2 - x1
-                dy = y2 - y1
-                
-                if abs(dx) > 0.1 or abs(dy) > 0.1:
-                    length = math.sqrt(dx*dx + dy*dy)
-                    norm_x = dx / length
-                    norm_y = dy / length
-                    
-                    ext = max(self.width(), self.height()) * 3
-                    
-                    start_x = x1 - norm_x * ext
-                    start_y = y1 - norm_y * ext
-                    end_x = x2 + norm_x * ext
-                    end_y = y2 + norm_y * ext
-                    
-                    painter.drawLine(QPointF(start_x, start_y), QPointF(end_x, end_y))
-            
-        elif obj['type'] == 'circle':
-            center_x, center_y = self.world_to_screen(*obj['center'])
-            radius = obj['radius'] * self.get_grid_size()
-            
-            painter.setPen(QPen(Qt.black, 2))
-            painter.setBrush(QBrush(Qt.NoBrush))
-            painter.drawEllipse(QPointF(center_x, center_y), radius, radius)
-            
-            painter.setPen(QPen(Qt.red, 2))
-            painter.setBrush(QBrush(Qt.red))
-            painter.drawEllipse(QPointF(center_x, center_y), 3, 3)
-        
-        elif obj['type'] == 'polygon':
-            painter.setPen(QPen(Qt.black, 2))
-            painter.setBrush(QBrush(Qt.NoBrush))
-            points_screen = [self.world_to_screen(*p) for p in obj['points']]
-            for i in range(len(points_screen)):
-                x1, y1 = points_screen[i]
-                x2, y2 = points_screen[(i + 1) % len(points_screen)]
-                painter.drawLine(QPointF(x1, y1), QPointF(x2, y2))
-        
-        elif obj['type'] == 'angle':
-            vertex = obj['vertex']
-            point1 = obj['point1']
-            point2 = obj['point2']
-            
-            vx, vy = self.world_to_screen(*vertex)
-            p1x, p1y = self.world_to_screen(*point1)
-            p2x, p2y = self.world_to_screen(*point2)
-            
-            painter.setPen(QPen(Qt.black, 2))
-            painter.drawLine(QPointF(vx, vy), QPointF(p1x, p1y))
-            painter.drawLine(QPointF(vx, vy), QPointF(p2x, p2y))
-        
-        elif obj['type'] == 'text':
-            x, y = self.world_to_screen(*obj['pos'])
-            painter.setPen(QPen(Qt.black))
-            painter.setFont(QFont("Arial", obj.get('size', 12)))
-            painter.drawText(int(x), int(y), obj['text'])
+        obj.draw(painter, self)
 
     def draw_points(self, painter):
         """Рисует все добавленные точки"""
-        for point in self.points:
-            x, y = self.world_to_screen(*point['pos'])
-            DrawingObjects.draw_point(painter, x, y)
+        if not self.points:
+            return
+        xs, ys, _ = self.points.positions()
+        # Кружок точки - радиус 5 px; всё, что за краем, в Qt не отдаём
+        left, bottom, right, top = self.visible_world_rect()
+        margin = 5 / self.get_grid_size()
+        visible = (xs > left - margin) & (xs < right + margin) & (ys > bottom - margin) & (ys < top + margin)
+        # Точки рисуем прямо в координатах мира, в пиксели их переводит матрица
+        painter.save()
+        painter.setTransform(self.world_transform(), True)
+        DrawingObjects.draw_points_batch(painter, xs[visible], ys[visible],
+                                         DrawingObjects.world_pen(painter, Qt.black, 10, cap=Qt.RoundCap))
+        painter.restore()
 
     def draw_temp_construction_points(self, painter):
         """Рисует временные точки при построении"""
         if self.current_tool == 'angle' and self.angle_points:
-            for point in self.angle_points:
-                x, y = self.world_to_screen(*point)
-                painter.setPen(QPen(QColor(0, 150, 255), 3))
-                painter.setBrush(QBrush(QColor(0, 150, 255, 100)))
-                painter.drawEllipse(QPointF(x, y), 6, 6)
-        
-        elif self.current_tool == 'polygon' and self.temp_object and self.temp_object.get('points'):
-            for point in self.temp_object['points']:
-                x, y = self.world_to_screen(*point)
-                painter.setPen(QPen(QColor(0, 150, 255), 3))
-                painter.setBrush(QBrush(QColor(0, 150, 255, 100)))
-                painter.drawEllipse(QPointF(x, y), 6, 6)
-            
-            if len(self.temp_object['points']) > 1:
-                painter.setPen(QPen(Qt.black, 1))
-                for i in range(len(self.temp_object['points'])):
-                    x1, y1 = self.world_to_screen(*self.temp_object['points'][i])
-                    x2, y2 = self.world_to_screen(*self.temp_object['points'][(i + 1) % len(self.temp_object['points'])])
-                    painter.drawLine(QPointF(x1, y1), QPointF(x2, y2))
+            points = self.angle_points
+        elif self.current_tool == 'polygon' and self.temp_object and self.temp_object.points:
+            points = self.temp_object.points
+        else:
+            return
+        
+        painter.setPen(DrawingObjects.pen((0, 150, 255), 3))
+        painter.setBrush(DrawingObjects.brush((0, 150, 255, 100)))
+        for point in points:
+            x, y = self.world_to_screen(*point)
+            painter.drawEllipse(QPointF(x, y), 6, 6)
+        
+        if self.current_tool == 'polygon' and len(points) > 1:
+            xs, ys = np.array(points, dtype=float).T
+            painter.save()
+            painter.setTransform(self.world_transform(), True)
+            DrawingObjects.draw_polygons_batch(painter, xs, ys, [len(points)],
+                                               DrawingObjects.world_pen(painter, Qt.black, 1))
+            painter.restore()
 
     def draw_snap_highlight(self, painter):
         """Рисует индикатор прилипания"""
         if self.snap_point:
             screen_x, screen_y = self.world_to_screen(self.snap_point['x'], self.snap_point['y'])
             
-            painter.setPen(QPen(QColor(255, 255, 0), 2))
-            painter.setBrush(QBrush(QColor(255, 255, 0, 50)))
+            painter.setPen(DrawingObjects.pen((255, 255, 0), 2))
+            painter.setBrush(DrawingObjects.brush((255, 255, 0, 50)))
             painter.drawEllipse(QPointF(screen_x, screen_y), 10, 10)
             
-            painter.setPen(QPen(QColor(255, 200, 0), 3))
+            painter.setPen(DrawingObjects.pen((255, 200, 0), 3))
             painter.drawPoint(QPointF(screen_x, screen_y))
 
     def draw_cursor_info(self, painter):
@@ -679,13 +732,14 @@ class DrawingCanvas(QWidget):
         
         text = f"{i18n.get('coord_x')}{self.mouse_world_x:.2f}{i18n.get('coord_y')}{self.mouse_world_y:.2f}"
         
-        font = QFont("Arial", 14)
-        font.setBold(True)
-        painter.setFont(font)
-        
-        fm = painter.fontMetrics()
-        text_width = fm.horizontalAdvance(text)
-        text_height = fm.height()
+        # Цифры в Arial одной ширины, так что размер плашки зависит только от
+        # того, где в строке цифры: меряем его один раз на каждый такой шаблон
+        template = text.translate(DIGITS_TO_ZERO)
+        size = self._cursor_info_sizes.get(template)
+        if size is None:
+            fm = QFontMetrics(DrawingObjects.font("Arial", 14, True))
+            size = self._cursor_info_sizes[template] = (fm.horizontalAdvance(template), fm.height())
+        text_width, text_height = size
         
         x = self.mouse_x + 20
         y = self.mouse_y - 20
@@ -699,38 +753,73 @@ class DrawingCanvas(QWidget):
             
         rect = QRectF(x, y, text_width + 16, text_height + 8)
         
-        painter.fillRect(rect, QColor(255, 255, 255))
-        painter.setPen(QPen(QColor(0, 0, 0), 3))
-        painter.setBrush(QBrush())
+        painter.fillRect(rect, Qt.white)
+        painter.setPen(DrawingObjects.pen(Qt.black, 3))
+        painter.setBrush(DrawingObjects.brush())
         painter.drawRect(rect)
         
-        painter.setPen(QPen(QColor(0, 0, 0), 2))
+        # Строка меняется почти с каждым движением мыши - QStaticText тут не
+        # переиспользуется, поэтому обычный drawText (готовые надписи - у делений сетки)
+        painter.setFont(DrawingObjects.font("Arial", 14, True))
+        painter.setPen(DrawingObjects.pen(Qt.black, 2))
         painter.drawText(rect, Qt.AlignCenter, text)
         
         painter.restore()
 
+    def _camera_key(self):
+        return (self.width(), self.height(), self.devicePixelRatioF(),
+                self.zoom_factor, self.offset_x, self.offset_y)
+
+    def _layer_keys(self):
+        """От чего зависит каждый слой: если ключ изменился, слой перерисуется"""
+        camera = self._camera_key()
+        return {
+            'grid': (camera, self.show_grid),
+            'functions': (camera, self.functions_revision),
+            'scene': (camera, self.scene_revision),
+        }
+
+    def _draw_functions_layer(self, painter):
+        for func_index, func_data in self.functions.items():
+            self.draw_function(painter, func_data, func_index)
+
+    def _draw_scene_layer(self, painter):
+        started = time.perf_counter()
+        # Фигуры за краем экрана в Qt не отдаём вовсе, остальные - пачками по классам
+        draw_objects(painter, self, self.visible_objects())
+        self.draw_points(painter)
+        # Сколько стоила перерисовка: по ней загрузка решает, как часто обновлять сцену
+        self.scene_draw_seconds = time.perf_counter() - started
+
     def paintEvent(self, event):
         """Главная функция отрисовки"""
         painter = QPainter(self)
         painter.setRenderHint(QPainter.Antialiasing)
 
-        if self.show_grid:
-            self.draw_grid(painter)
+        # Сетка, графики и геометрия берутся из кэша слоёв
+        self.layers.paint(painter, self.size(), self.devicePixelRatioF(), self._layer_keys())
 
-        for func_data in self.functions.values():
-            self.draw_function(painter, func_data)
-
-        for obj in self.objects:
-            self.draw_object(painter, obj)
-
-        if self.temp_object and self.temp_object['type'] not in ['polygon', 'angle']:
+        # Всё, что зависит от курсора, рисуем каждый кадр поверх
+        if self.temp_object and not isinstance(self.temp_object, (Polygon, Angle)):
             self.draw_object(painter, self.temp_object)
 
-        self.draw_points(painter)
         self.draw_temp_construction_points(painter)
+        self.snap_point = self._scheduled_snap()
         self.draw_snap_highlight(painter)
         self.draw_cursor_info(painter)
 
+        if not self.first_frame_done:
+            self.first_frame_done = True
+            self.first_frame_painted.emit()
+
+    def _scheduled_snap(self):
+        """Snap для текущего кадра: пересчёт, только если сдвинулся курсор, камера или сцена"""
+        key = (self.mouse_x, self.mouse_y, self._camera_key(),
+               self.scene_revision, self.functions_revision, self.current_tool)
+        world_x, world_y = self.screen_to_world(self.mouse_x, self.mouse_y)
+        self.snap_scheduler.request(key, world_x, world_y, self.snap_view())
+        return self.snap_scheduler.flush()
+
     # ========== ДИАЛОГИ ВВОДА ==========
 
     def show_angle_input_dialog(self):
@@ -759,12 +848,12 @@ class DrawingCanvas(QWidget):
         if event.button() == Qt.RightButton:
             obj_info = self.find_object_at_point(self.mouse_world_x, self.mouse_world_y)
             if obj_info:
-                obj_type, obj_index = obj_info
-                if obj_type == 'point':
-                    self.points.pop(obj_index)
+                kind, target = obj_info
+                if kind == 'point':
+                    self.remove_point(target)
                 else:
-                    self.objects.pop(obj_index)
-                self.update()
+                    self.remove_object(target)
+                self.scene_changed()
         
         elif event.button() == Qt.MiddleButton:
             self.is_panning = True
@@ -780,8 +869,8 @@ class DrawingCanvas(QWidget):
         if self.current_tool == 'point':
             snap = self.find_snap_point(self.mouse_world_x, self.mouse_world_y)
             world_pos = (snap['x'], snap['y']) if snap else (self.mouse_world_x, self.mouse_world_y)
-            self.points.append({'pos': world_pos})
-            self.update()
+            self.add_point(world_pos)
+            self.scene_changed()
         
         elif self.current_tool == 'line':
             if self.start_pos is None:
@@ -795,15 +884,11 @@ class DrawingCanvas(QWidget):
                 
                 is_connected = self._check_line_connection(x1, y1, x2, y2)
                 
-                self.objects.append({
-                    'type': 'line',
-                    'points': (x1, y1, x2, y2),
-                    'infinite': not is_connected
-                })
+                self.add_object(Line((x1, y1, x2, y2), infinite=not is_connected))
                 
                 self.start_pos = None
                 self.temp_object = None
-                self.update()
+                self.scene_changed()
         
         elif self.current_tool == 'circle':
             if self.start_pos is None:
@@ -816,15 +901,11 @@ class DrawingCanvas(QWidget):
                 
                 radius = math.sqrt((current[0] - center[0])**2 + (current[1] - center[1])**2)
                 
-                self.objects.append({
-                    'type': 'circle',
-                    'center': center,
-                    'radius': radius
-                })
+                self.add_object(Circle(center, radius))
                 
                 self.start_pos = None
                 self.temp_object = None
-                self.update()
+                self.scene_changed()
         
         elif self.current_tool == 'angle':
             if len(self.angle_points) < 3:
@@ -837,43 +918,32 @@ class DrawingCanvas(QWidget):
         
         elif self.current_tool == 'polygon':
             if self.temp_object is None:
-                self.temp_object = {'type': 'polygon', 'points': []}
+                self.temp_object = Polygon()
             
             snap = self.find_snap_point(self.mouse_world_x, self.mouse_world_y)
             world_pos = (snap['x'], snap['y']) if snap else self.screen_to_world(event.pos().x(), event.pos().y())
             
-            self.temp_object['points'].append(world_pos)
+            self.temp_object.points.append(world_pos)
             self.update()
         
         elif self.current_tool == 'text':
             text = self.show_text_input_dialog()
             if text:
-                self.objects.append({
-                    'type': 'text',
-                    'pos': (self.mouse_world_x, self.mouse_world_y),
-                    'text': text,
-                    'size': 12
-                })
-                self.update()
+                self.add_object(Text((self.mouse_world_x, self.mouse_world_y), text, 12))
+                self.scene_changed()
 
     def _check_line_connection(self, x1, y1, x2, y2):
         """Проверяет соединена ли линия с другими объектами"""
         snap_dist = self.snap_radius / self.get_grid_size()
         
-        for point in self.points:
-            px, py = point['pos']
-            d1 = math.sqrt((x1 - px)**2 + (y1 - py)**2)
-            d2 = math.sqrt((x2 - px)**2 + (y2 - py)**2)
-            if d1 < snap_dist or d2 < snap_dist:
-                return True
-        
-        for obj in self.objects:
-            if obj['type'] == 'circle':
-                cx, cy = obj['center']
-                d1 = math.sqrt((x1 - cx)**2 + (y1 - cy)**2)
-                d2 = math.sqrt((x2 - cx)**2 + (y2 - cy)**2)
-                if d1 < snap_dist or d2 < snap_dist:
+        # Сетку центров может перестраивать поток прилипания
+        with self.snap_lock:
+            for x, y in ((x1, y1), (x2, y2)):
+                if self.points.any_within(x, y, snap_dist):
                     return True
+                for cx, cy in self.snap_index.centers_near(x, y, snap_dist):
+                    if math.hypot(x - cx, y - cy) < snap_dist:
+                        return True
         
         return False
 
@@ -914,19 +984,13 @@ class DrawingCanvas(QWidget):
                     vertex[1] + len1 * math.sin(angle2_rad)
                 )
                 
-                self.objects.append({
-                    'type': 'angle',
-                    'vertex': vertex,
-                    'point1': point1,
-                    'point2': point2,
-                    'angle': angle_value
-                })
+                self.add_object(Angle(vertex, point1, point2, angle_value))
                 
                 for p in [point1, vertex, point2]:
-                    self.points.append({'pos': p})
+                    self.add_point(p)
                 
                 self.angle_points = []
-                self.update()
+                self.scene_changed()
         else:
             self.angle_points = []
 
@@ -936,23 +1000,26 @@ class DrawingCanvas(QWidget):
             self.is_panning = False
             self.setCursor(Qt.ArrowCursor)
             self.last_pan_pos = None
+            # Во время панорамирования слои сдвигались кусками - перерисовываем начисто
+            self.layers.invalidate()
+            self.update()
         
         elif event.button() == Qt.RightButton:
-            if self.current_tool == 'polygon' and self.temp_object and len(self.temp_object['points']) > 2:
+            if self.current_tool == 'polygon' and self.temp_object and len(self.temp_object.points) > 2:
                 snap = self.find_snap_point(self.mouse_world_x, self.mouse_world_y)
                 world_pos = (snap['x'], snap['y']) if snap else self.screen_to_world(event.pos().x(), event.pos().y())
                 
-                first_point = self.temp_object['points'][0]
+                first_point = self.temp_object.points[0]
                 snap_dist = self.snap_radius / self.get_grid_size()
                 dist_to_first = math.sqrt((world_pos[0] - first_point[0])**2 + (world_pos[1] - first_point[1])**2)
                 
                 if dist_to_first < snap_dist:
-                    for point_pos in self.temp_object['points']:
-                        self.points.append({'pos': point_pos})
+                    for point_pos in self.temp_object.points:
+                        self.add_point(point_pos)
                     
-                    self.objects.append(self.temp_object)
+                    self.add_object(self.temp_object)
                     self.temp_object = None
-                    self.update()
+                    self.scene_changed()
 
     def mouseMoveEvent(self, event):
         """Движение мыши"""
@@ -960,32 +1027,27 @@ class DrawingCanvas(QWidget):
         self.mouse_y = event.pos().y()
         self.mouse_world_x, self.mouse_world_y = self.screen_to_world(self.mouse_x, self.mouse_y)
         
-        self.snap_point = self.find_snap_point(self.mouse_world_x, self.mouse_world_y)
+        # Snap здесь не считаем: paintEvent посчитает его один раз за кадр
         
         if self.is_panning and self.last_pan_pos:
             delta = event.pos() - self.last_pan_pos
+            old_keys = self._layer_keys()
             self.offset_x += delta.x()
             self.offset_y += delta.y()
             self.last_pan_pos = event.pos()
+            # Сдвигаем уже нарисованную картинку и дорисовываем только открывшиеся полосы
+            self.layers.scroll(delta.x(), delta.y(), old_keys, self._layer_keys())
             self.update()
         
         elif self.start_pos and self.current_tool:
             if self.current_tool == 'line':
-                self.temp_object = {
-                    'type': 'line',
-                    'points': (*self.screen_to_world(self.start_pos.x(), self.start_pos.y()),
-                              *self.screen_to_world(event.pos().x(), event.pos().y())),
-                    'infinite': False
-                }
+                self.temp_object = Line((*self.screen_to_world(self.start_pos.x(), self.start_pos.y()),
+                                         *self.screen_to_world(event.pos().x(), event.pos().y())))
             elif self.current_tool == 'circle':
                 center = self.start_pos
                 current = self.screen_to_world(event.pos().x(), event.pos().y())
                 radius = ((current[0] - center[0])**2 + (current[1] - center[1])**2)**0.5
-                self.temp_object = {
-                    'type': 'circle',
-                    'center': center,
-                    'radius': radius
-                }
+                self.temp_object = Circle(center, radius)
             self.update()
         else:
             self.update()
@@ -993,13 +1055,13 @@ class DrawingCanvas(QWidget):
     def keyPressEvent(self, event):
         """Нажатие клавиши"""
         if event.key() == Qt.Key_Escape:
-            if self.current_tool == 'polygon' and self.temp_object and len(self.temp_object['points']) > 2:
-                for point_pos in self.temp_object['points']:
-                    self.points.append({'pos': point_pos})
+            if self.current_tool == 'polygon' and self.temp_object and len(self.temp_object.points) > 2:
+                for point_pos in self.temp_object.points:
+                    self.add_point(point_pos)
                 
-                self.objects.append(self.temp_object)
+                self.add_object(self.temp_object)
                 self.temp_object = None
-                self.update()
+                self.scene_changed()
             
             elif self.current_tool == 'angle' and self.angle_points:
                 self.angle_points = []
@@ -1026,6 +1088,43 @@ class DrawingCanvas(QWidget):
         screen_y = center_y - y * self.get_grid_size()
         return screen_x, screen_y
 
+    def world_to_screen_array(self, xs, ys):
+        """Мировые координаты → экранные пиксели сразу для numpy-массивов"""
+        grid_size = self.get_grid_size()
+        center_x = self.width() / 2 + self.offset_x
+        center_y = self.height() / 2 + self.offset_y
+        return center_x + xs * grid_size, center_y - ys * grid_size
+
+    def world_transform(self):
+        """
+        Та же формула, что в world_to_screen, одной матрицей для painter:
+        масштаб на размер клетки, переворот y и сдвиг к центру экрана
+        """
+        grid_size = self.get_grid_size()
+        return QTransform(grid_size, 0, 0, -grid_size,
+                          self.width() / 2 + self.offset_x, self.height() / 2 + self.offset_y)
+
+    def visible_world_rect(self):
+        """Видимая часть мира: (left, bottom, right, top)"""
+        left, top = self.screen_to_world(0, 0)
+        right, bottom = self.screen_to_world(self.width(), self.height())
+        return left, bottom, right, top
+
+    def visible_objects(self, pad=0):
+        """
+        Фигуры, которые задевают экран (с запасом pad пикселей), в порядке рисования
+        Вместо перебора всех objects - запрос к сетке рамок
+        """
+        left, bottom, right, top = self._fit_cull_cells()
+        return self.cull_index.visible(left, bottom, right, top, 1 / self.get_grid_size(), pad)
+
+    def _fit_cull_cells(self):
+        """Подгоняет ячейку сетки рамок под экран; возвращает visible_world_rect()"""
+        left, bottom, right, top = self.visible_world_rect()
+        # Ячейка сетки - около четверти экрана: запрос смотрит пару десятков ячеек
+        self.cull_index.fit_cell_size(max(right - left, top - bottom) / 4)
+        return left, bottom, right, top
+
     def screen_to_world(self, screen_x, screen_y):
         """Экранные пиксели → мировые координаты"""
         center_x = self.width() / 2 + self.offset_x
@@ -1041,6 +1140,7 @@ class MainWindow(QMainWindow):
     
     language_changed = pyqtSignal(str)
     DATA_DIR = Path("projects")
+    EXPRESSION_CACHE_FILE = DATA_DIR / ".expression_cache.json"
     
     def __init__(self):
         super().__init__()
@@ -1087,7 +1187,37 @@ class MainWindow(QMainWindow):
         
         # Холст
         self.canvas = DrawingCanvas()
+        self.canvas.expression_cache.disk_path = self.EXPRESSION_CACHE_FILE
+        self.canvas.first_frame_painted.connect(self._on_first_frame)
+        launch_flags.apply(self.canvas)
         main_layout.addWidget(self.canvas)
+        
+        # Потоковая загрузка JSON: сцена появляется кусками, пока файл читается
+        self.project_loader = ProjectLoader(parent=self)
+        self.project_loader.meta_loaded.connect(self._on_project_meta)
+        self.project_loader.chunk_loaded.connect(self._on_project_chunk)
+        self.project_loader.done.connect(self._on_project_loaded)
+        self.project_loader.failed.connect(self._on_project_failed)
+        # Сцена до начала загрузки (вернётся при отмене) и окно прогресса
+        self._previous_scene = None
+        self._load_progress = None
+        self._loading_path = None
+        self._load_repainted_at = 0.0
+
+    def _on_first_frame(self):
+        """Холст уже на экране - выходим из paintEvent и достраиваем остальное"""
+        profiler.mark('first frame')
+        QTimer.singleShot(0, self._finish_startup)
+
+    def _finish_startup(self):
+        """Отложенная часть запуска: иконки, ввод функций и фоновая загрузка sympy"""
+        self.toolbar.load_icons()
+        profiler.mark('toolbar icons')
+        self.toolbar.build_function_widgets()
+        profiler.mark('function widgets')
+
+        self.canvas.expression_cache.preload_sympy()
+        profiler.report()
 
     def _toggle_language(self):
         """Переключить язык"""
@@ -1133,17 +1263,22 @@ class MainWindow(QMainWindow):
         self.canvas.set_current_tool(tool_name)
 
     def keyPressEvent(self, event):
-        self.canvas.keyPressEvent(event)
+        # Во время загрузки холст отключён - клавиши ему тоже не передаём
+        if self.canvas.isEnabled():
+            self.canvas.keyPressEvent(event)
         super().keyPressEvent(event)
 
     def keyReleaseEvent(self, event):
-        self.canvas.keyReleaseEvent(event)
+        if self.canvas.isEnabled():
+            self.canvas.keyReleaseEvent(event)
         super().keyReleaseEvent(event)
 
-    # ========== СОХРАНЕНИЕ И ЗАГРУЗКА (JSON) ==========
+    # ========== СОХРАНЕНИЕ И ЗАГРУЗКА (JSON / .igp) ==========
+
+    PROJECT_SUFFIXES = ('.json', project_binary.SUFFIX)
 
     def on_save_requested(self):
-        """Сохраняет проект в JSON"""
+        """Сохраняет проект в JSON (или в двоичный .igp, если так назвать файл)"""
         filename, ok = QInputDialog.getText(
             self, 
             i18n.get('dialog_save_title'), 
@@ -1151,16 +1286,20 @@ class MainWindow(QMainWindow):
         )
         
         if ok and filename:
-            if not filename.endswith('.json'):
+            if not filename.endswith(self.PROJECT_SUFFIXES):
                 filename += '.json'
             
             filepath = self.DATA_DIR / filename
             
             try:
-                data = self._serialize_project()
-                
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
+                if filepath.suffix == project_binary.SUFFIX:
+                    xs, ys, _ = self.canvas.points.positions()
+                    project_binary.save_project(filepath, self._project_meta(), self.canvas.objects, xs, ys)
+                else:
+                    data = self._serialize_project()
+                    
+                    with open(filepath, 'w', encoding='utf-8') as f:
+                        json.dump(data, f, indent=2, ensure_ascii=False)
                 
                 print(f"{i18n.get('msg_saved')}{filepath}")
                 
@@ -1168,7 +1307,7 @@ class MainWindow(QMainWindow):
                 print(f"{i18n.get('msg_error_save')}{e}")
 
     def on_load_requested(self):
-        """Загружает проект из JSON"""
+        """Загружает проект из JSON или .igp"""
         filename, ok = QInputDialog.getText(
             self, 
             i18n.get('dialog_load_title'), 
@@ -1176,8 +1315,13 @@ class MainWindow(QMainWindow):
         )
         
         if ok and filename:
-            if not filename.endswith('.json'):
-                filename += '.json'
+            if not filename.endswith(self.PROJECT_SUFFIXES):
+                # Без расширения - JSON, а если его нет, двоичный проект с тем же именем
+                binary = self.DATA_DIR / (filename + project_binary.SUFFIX)
+                if not (self.DATA_DIR / (filename + '.json')).exists() and binary.exists():
+                    filename += project_binary.SUFFIX
+                else:
+                    filename += '.json'
             
             filepath = self.DATA_DIR / filename
             
@@ -1186,17 +1330,104 @@ class MainWindow(QMainWindow):
                     print(f"{i18n.get('msg_file_not_found')}{filepath}")
                     return
                 
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                self._deserialize_project(data)
-                print(f"{i18n.get('msg_loaded')}{filepath}")
+                if filepath.suffix == project_binary.SUFFIX:
+                    self._restore_project(*project_binary.load_project(filepath))
+                    self._report_loaded(filepath)
+                else:
+                    # JSON разбирается в фоне, сцена появляется по кускам
+                    self._start_json_load(filepath)
                 
             except Exception as e:
                 print(f"{i18n.get('msg_error_load')}{e}")
 
-    def _serialize_project(self) -> dict:
-        """Преобразует рабочую область в JSON-совместимый словарь"""
+    def _report_loaded(self, filepath):
+        print(f"{i18n.get('msg_loaded')}{filepath}")
+
+    # ========== ПОТОКОВАЯ ЗАГРУЗКА JSON ==========
+
+    # Пока идёт загрузка, слой геометрии перерисовываем не чаще, чем раз в столько секунд
+    # (и не чаще, чем позволяет цена самой перерисовки): куски приходят каждые
+    # несколько миллисекунд, а перерисовка большой сцены дороже
+    LOAD_REPAINT_INTERVAL = 0.2
+
+    def _start_json_load(self, filepath):
+        """Начинает фоновую загрузку; прежняя сцена откладывается до её конца"""
+        if self.project_loader.running:
+            self._cancel_json_load()
+        self._previous_scene = self.canvas.take_scene()
+        self._loading_path = filepath
+        
+        # Пока идёт загрузка, холст и панель не редактируются: правки на временной
+        # сцене пропали бы при отмене или ошибке, когда вернётся прежняя. Окно
+        # прогресса появляется не сразу, поэтому ввод отключаем сами
+        self.centralWidget().setEnabled(False)
+        
+        progress = QProgressDialog(i18n.get('dialog_loading'), i18n.get('dialog_cancel'), 0, 100, self)
+        progress.setWindowTitle(i18n.get('dialog_load_title'))
+        progress.setWindowModality(Qt.WindowModal)
+        # Маленький проект загрузится раньше, чем окно успело бы мигнуть
+        progress.setMinimumDuration(300)
+        progress.setAutoClose(False)
+        progress.setAutoReset(False)
+        progress.canceled.connect(self._cancel_json_load)
+        self._load_progress = progress
+        
+        self.project_loader.start(filepath)
+
+    def _on_project_meta(self, key, value):
+        if key == 'camera':
+            self._apply_camera(value)
+            self.canvas.update()
+        elif key == 'functions':
+            self._apply_functions(value)
+
+    def _on_project_chunk(self, objects, xs, ys, fraction):
+        """Очередной кусок сцены - сразу на холст, индексы пополняются пачкой"""
+        canvas = self.canvas
+        canvas.add_objects(objects)
+        canvas.add_points(xs, ys)
+        now = time.perf_counter()
+        interval = max(self.LOAD_REPAINT_INTERVAL, 4 * canvas.scene_draw_seconds)
+        if now - self._load_repainted_at >= interval:
+            self._load_repainted_at = now
+            canvas.scene_changed()
+        if self._load_progress is not None:
+            self._load_progress.setValue(int(fraction * 100))
+
+    def _on_project_loaded(self):
+        filepath = self._loading_path
+        self._end_json_load()
+        self.canvas.functions_changed()
+        self.canvas.scene_changed()
+        self._report_loaded(filepath)
+
+    def _on_project_failed(self, message):
+        self.canvas.restore_scene(self._previous_scene)
+        self._end_json_load()
+        print(f"{i18n.get('msg_error_load')}{message}")
+
+    def _cancel_json_load(self):
+        """Отмена: недочитанный проект выбрасываем, прежняя сцена возвращается целиком"""
+        if self._previous_scene is None:
+            return
+        self.project_loader.cancel()
+        self.canvas.restore_scene(self._previous_scene)
+        print(f"{i18n.get('msg_load_cancelled')}{self._loading_path}")
+        self._end_json_load()
+
+    def _end_json_load(self):
+        self._previous_scene = None
+        self._loading_path = None
+        self.centralWidget().setEnabled(True)
+        progress, self._load_progress = self._load_progress, None
+        if progress is not None:
+            # close() у QProgressDialog тоже шлёт canceled - отключаемся заранее
+            progress.canceled.disconnect()
+            progress.close()
+            progress.deleteLater()
+
+    def _project_meta(self) -> dict:
+        """Версия, камера и функции - общая часть JSON и двоичного формата"""
         data = {
             'version': '1.0',
             'camera': {
@@ -1205,8 +1436,6 @@ class MainWindow(QMainWindow):
                 'offset_y': self.canvas.offset_y,
             },
             'functions': {},
-            'objects': [],
-            'points': []
         }
         
         # Функции
@@ -1216,131 +1445,73 @@ class MainWindow(QMainWindow):
                 'visible': func_data['visible']
             }
         
+        return data
+
+    def _serialize_project(self) -> dict:
+        """Преобразует рабочую область в JSON-совместимый словарь"""
+        data = self._project_meta()
+        data['objects'] = []
+        data['points'] = []
+        
         # Объекты
         for obj in self.canvas.objects:
-            if obj['type'] == 'point':
-                data['objects'].append({
-                    'type': 'point',
-                    'pos': list(obj['pos'])
-                })
-            elif obj['type'] == 'line':
-                data['objects'].append({
-                    'type': 'line',
-                    'points': list(obj['points']),
-                    'infinite': obj.get('infinite', False)
-                })
-            elif obj['type'] == 'circle':
-                data['objects'].append({
-                    'type': 'circle',
-                    'center': list(obj['center']),
-                    'radius': obj['radius']
-                })
-            elif obj['type'] == 'polygon':
-                data['objects'].append({
-                    'type': 'polygon',
-                    'points': [list(p) for p in obj['points']]
-                })
-            elif obj['type'] == 'angle':
-                data['objects'].append({
-                    'type': 'angle',
-                    'vertex': list(obj['vertex']),
-                    'point1': list(obj['point1']),
-                    'point2': list(obj['point2']),
-                    'angle': obj['angle']
-                })
-            elif obj['type'] == 'text':
-                data['objects'].append({
-                    'type': 'text',
-                    'pos': list(obj['pos']),
-                    'text': obj['text'],
-                    'size': obj.get('size', 12)
-                })
+            data['objects'].append(obj.to_dict())
         
         # Точки
-        for point in self.canvas.points:
-            data['points'].append({
-                'pos': list(point['pos'])
-            })
+        xs, ys, _ = self.canvas.points.positions()
+        data['points'] = [{'pos': [x, y]} for x, y in zip(xs.tolist(), ys.tolist())]
         
         return data
 
-    def _deserialize_project(self, data: dict):
-        """Восстанавливает рабочую область из JSON"""
-        # Очищаем холст
-        self.canvas.objects = []
-        self.canvas.points = []
-        self.canvas.functions = {}
-        self.canvas.angle_points = []
-        self.canvas.temp_object = None
-        
-        # Восстанавливаем камеру
-        if 'camera' in data:
-            camera = data['camera']
-            self.canvas.zoom_factor = camera.get('zoom', 1.0)
-            self.canvas.offset_x = camera.get('offset_x', 0.0)
-            self.canvas.offset_y = camera.get('offset_y', 0.0)
-        
-        # Функции
-        for idx_str, func_data in data.get('functions', {}).items():
+    def _restore_project(self, meta: dict, objects: list, xs, ys):
+        """Заменяет рабочую область: meta - камера и функции, objects - фигуры, xs, ys - точки"""
+        # Поток прилипания не должен застать сцену наполовину заменённой
+        with self.canvas.snap_lock:
+            # Очищаем холст
+            self.canvas.objects = []
+            self.canvas.points = PointStore()
+            self.canvas.functions = {}
+            self.canvas.sample_cache.clear()
+            self.canvas.angle_points = []
+            self.canvas.temp_object = None
+            
+            # Восстанавливаем камеру
+            if 'camera' in meta:
+                self._apply_camera(meta['camera'])
+            
+            # Функции
+            self._apply_functions(meta.get('functions', {}))
+            
+            # Объекты
+            self.canvas.objects = objects
+            
+            # Точки - одним массовым добавлением
+            self.canvas.add_points(xs, ys)
+            
+            self.canvas.rebuild_scene_indexes()
+        self.canvas.functions_changed()
+        self.canvas.scene_changed()
+
+    def _apply_camera(self, camera: dict):
+        self.canvas.zoom_factor = camera.get('zoom', 1.0)
+        self.canvas.offset_x = camera.get('offset_x', 0.0)
+        self.canvas.offset_y = camera.get('offset_y', 0.0)
+
+    def _apply_functions(self, functions: dict):
+        for idx_str, func_data in functions.items():
             idx = int(idx_str)
             self.canvas._process_function(func_data['text'], idx)
-            if not func_data.get('visible', True):
+            # Функция с ошибкой в тексте не добавляется - скрывать нечего
+            if not func_data.get('visible', True) and idx in self.canvas.functions:
                 self.canvas.functions[idx]['visible'] = False
-        
-        # Объекты
-        for obj_data in data.get('objects', []):
-            obj_type = obj_data['type']
-            
-            if obj_type == 'point':
-                self.canvas.objects.append({
-                    'type': 'point',
-                    'pos': tuple(obj_data['pos'])
-                })
-            elif obj_type == 'line':
-                self.canvas.objects.append({
-                    'type': 'line',
-                    'points': tuple(obj_data['points']),
-                    'infinite': obj_data.get('infinite', False)
-                })
-            elif obj_type == 'circle':
-                self.canvas.objects.append({
-                    'type': 'circle',
-                    'center': tuple(obj_data['center']),
-                    'radius': obj_data['radius']
-                })
-            elif obj_type == 'polygon':
-                self.canvas.objects.append({
-                    'type': 'polygon',
-                    'points': [tuple(p) for p in obj_data['points']]
-                })
-            elif obj_type == 'angle':
-                self.canvas.objects.append({
-                    'type': 'angle',
-                    'vertex': tuple(obj_data['vertex']),
-                    'point1': tuple(obj_data['point1']),
-                    'point2': tuple(obj_data['point2']),
-                    'angle': obj_data['angle']
-                })
-            elif obj_type == 'text':
-                self.canvas.objects.append({
-                    'type': 'text',
-                    'pos': tuple(obj_data['pos']),
-                    'text': obj_data['text'],
-                    'size': obj_data.get('size', 12)
-                })
-        
-        # Точки
-        for point_data in data.get('points', []):
-            self.canvas.points.append({
-                'pos': tuple(point_data['pos'])
-            })
-        
-        self.canvas.update()
 
     def closeEvent(self, event):
         """Завершение приложения"""
         try:
+            if hasattr(self, 'project_loader'):
+                self.project_loader.cancel()
             if hasattr(self, 'canvas'):
+                self.canvas.snap_scheduler.stop()
                 self.canvas.deleteLater()
             if hasattr(self, 'toolbar'):
                 self.toolbar.deleteLater()
@@ -1352,8 +1523,10 @@ class MainWindow(QMainWindow):
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     app.setAttribute(Qt.ApplicationAttribute.AA_DisableWindowContextHelpButton)
+    profiler.mark('QApplication')
     
     window = MainWindow()
+    profiler.mark('MainWindow')
     window.show()
     
     try:
@@ -0,0 +1,82 @@
+"""
+Буфер идентификаторов для выбора объектов мышью
+Объекты рисуются в закадровый QImage без сглаживания, каждый своим цветом,
+который кодирует его номер, толстым пером ширины радиуса поиска. Проверка
+попадания - чтение одного пикселя. Картинка перерисовывается только при смене
+ключа (камера, сцена), как слои в render_layers.py
+"""
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage, QPainter, QColor
+
+
+# Цвет 0 (чёрный) - пусто; номера объектов начинаются с 1
+MAX_IDS = 0xFFFFFF
+
+
+def id_color(pick_id):
+    """Номер объекта → цвет RGB, которым он рисуется в буфере"""
+    return QColor.fromRgb(pick_id)
+
+
+class PickBuffer:
+    """Закадровая картинка с номерами объектов и список того, что за номером стоит"""
+
+    def __init__(self, render):
+        # render(painter, register) рисует объекты в экранных координатах;
+        # register(target) → цвет, которым рисовать target
+        self.render = render
+        self.image = None
+        self.key = None
+        self.device_pixel_ratio = 1.0
+        self.targets = []
+
+    def is_valid(self, key):
+        return self.image is not None and self.key == key
+
+    def invalidate(self):
+        self.key = None
+
+    def ensure(self, key, size, device_pixel_ratio):
+        """Перерисовывает буфер, если ключ изменился"""
+        if self.is_valid(key):
+            return
+
+        width = max(1, int(size.width() * device_pixel_ratio))
+        height = max(1, int(size.height() * device_pixel_ratio))
+        if self.image is None or self.image.width() != width or self.image.height() != height:
+            self.image = QImage(width, height, QImage.Format_RGB32)
+        self.image.fill(0)
+        # Рисуем в логических координатах, как и слои
+        self.image.setDevicePixelRatio(device_pixel_ratio)
+        self.device_pixel_ratio = device_pixel_ratio
+
+        self.targets = []
+        painter = QPainter(self.image)
+        # Без сглаживания: смешанные цвета на краях дали бы чужие номера
+        painter.setRenderHint(QPainter.Antialiasing, False)
+        painter.setBrush(Qt.NoBrush)
+        try:
+            self.render(painter, self._register)
+        finally:
+            painter.end()
+        self.key = key
+
+    def pick(self, x, y):
+        """Что нарисовано в логической точке (x, y); None - пусто или за краем"""
+        if self.image is None:
+            return None
+        px = int(x * self.device_pixel_ratio)
+        py = int(y * self.device_pixel_ratio)
+        if not (0 <= px < self.image.width() and 0 <= py < self.image.height()):
+            return None
+        pick_id = self.image.pixel(px, py) & 0xFFFFFF
+        if pick_id == 0 or pick_id > len(self.targets):
+            return None
+        return self.targets[pick_id - 1]
+
+    def _register(self, target):
+        if len(self.targets) >= MAX_IDS:
+            raise OverflowError("too many objects for the pick buffer")
+        self.targets.append(target)
+        return id_color(len(self.targets))
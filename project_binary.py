@@ -0,0 +1,138 @@
+"""
+Двоичный формат проекта (.igp)
+Рядом с JSON (он остаётся для обмена): в начале MAGIC, длина заголовка и сам
+заголовок - JSON с камерой, функциями и описанием массивов, дальше колонки
+float64 / int64 / bool подряд, каждая с границы ALIGNMENT байт. Фигуры лежат
+колонками по классам (SceneObject.to_columns), классы без колонок (надписи)
+- словарями to_dict() прямо в заголовке. При открытии файл отображается в
+память целиком (numpy.memmap), массивы - окна в него без разбора текста и
+без копирования. Точки копирует к себе PointStore, а отрезки и многоугольники
+так и читают вершины из отображения (scene_model, from_columns), пока проект
+не сохранят поверх этого же файла
+"""
+
+import json
+import os
+import struct
+
+import numpy as np
+
+from scene_model import OBJECT_TYPES, object_from_dict, release_mapping
+
+
+SUFFIX = '.igp'
+MAGIC = b'IGAFVS\x00\x01'
+ALIGNMENT = 64
+# Длина заголовка сразу после MAGIC
+_LENGTH = struct.Struct('<Q')
+
+
+class ProjectFormatError(ValueError):
+    """Файл - не двоичный проект iGAFVS или испорчен"""
+
+
+def save_project(path, meta, objects, xs, ys):
+    """
+    meta - словарь проекта без фигур и точек (версия, камера, функции),
+    objects - фигуры сцены по порядку, xs, ys - координаты точек холста
+    """
+    arrays = {'points/x': np.asarray(xs, dtype=float), 'points/y': np.asarray(ys, dtype=float)}
+    records = []
+
+    # Фигуры одного класса - вместе; order помнит их места в общем списке
+    groups = {}
+    for index, obj in enumerate(objects):
+        groups.setdefault(type(obj), []).append(index)
+    types = []
+    for cls, indices in groups.items():
+        group = [objects[index] for index in indices]
+        columns = cls.to_columns(group)
+        if columns is None:
+            records += [[index, obj.to_dict()] for index, obj in zip(indices, group)]
+            continue
+        types.append(cls.type_name)
+        columns['order'] = np.array(indices, dtype=np.int64)
+        for name, column in columns.items():
+            arrays[f'{cls.type_name}/{name}'] = column
+
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        # Порядок байт фиксируем: файл должен открываться на любой машине
+        array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<'))
+        arrays[name] = array
+        layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _aligned(offset + array.nbytes)
+
+    header = json.dumps({
+        'meta': meta,
+        'count': len(objects),
+        'types': types,
+        'records': records,
+        'arrays': layout,
+    }, ensure_ascii=False).encode('utf-8')
+    start = _aligned(len(MAGIC) + _LENGTH.size + len(header))
+
+    # Фигуры, открытые из этого же файла, читают вершины из его отображения в
+    # память: обрезать его на месте нельзя. Пишем рядом и подменяем целиком
+    path = os.fspath(path)
+    temporary = path + '.tmp'
+    try:
+        with open(temporary, 'wb') as f:
+            f.write(MAGIC)
+            f.write(_LENGTH.pack(len(header)))
+            f.write(header)
+            for name, array in arrays.items():
+                f.seek(start + layout[name]['offset'])
+                f.write(array.tobytes())
+            # Хвостовое выравнивание, чтобы последний массив не упирался в конец файла
+            f.truncate(start + offset)
+        # Отображение старого файла закрывается вместе с последним окном в него;
+        # пока оно открыто, Windows не даст подменить файл
+        release_mapping(objects, path)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def load_project(path):
+    """(meta, objects, xs, ys); неизвестные типы фигур пропускаются, как в JSON"""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ProjectFormatError(f"not an iGAFVS binary project: {path}")
+        (length,) = _LENGTH.unpack(f.read(_LENGTH.size))
+        header = json.loads(f.read(length).decode('utf-8'))
+    start = _aligned(len(MAGIC) + _LENGTH.size + length)
+
+    raw = np.memmap(path, dtype=np.uint8, mode='r')
+    arrays = {}
+    for name, spec in header['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        shape = tuple(spec['shape'])
+        begin = start + spec['offset']
+        end = begin + dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+        if end > len(raw):
+            raise ProjectFormatError(f"array {name} runs past the end of {path}")
+        arrays[name] = raw[begin:end].view(dtype).reshape(shape)
+
+    placed = [None] * header['count']
+    for type_name in header['types']:
+        cls = OBJECT_TYPES.get(type_name)
+        if cls is None:
+            continue
+        prefix = type_name + '/'
+        columns = {name[len(prefix):]: array for name, array in arrays.items() if name.startswith(prefix)}
+        order = columns.pop('order')
+        for index, obj in zip(order.tolist(), cls.from_columns(columns)):
+            placed[index] = obj
+    for index, data in header['records']:
+        placed[index] = object_from_dict(data)
+
+    objects = [obj for obj in placed if obj is not None]
+    return header['meta'], objects, arrays['points/x'], arrays['points/y']
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
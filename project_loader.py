@@ -0,0 +1,216 @@
+"""
+Потоковая загрузка JSON-проекта
+json.load разбирает весь файл разом, и до конца разбора холст пуст, а окно
+не отвечает. Здесь файл читается в фоновом потоке блоками, а массивы objects
+и points разбираются поэлементно (JSONDecoder.raw_decode по буферу), так что
+фигуры и точки уходят на холст кусками по мере чтения - холст рисует то, что
+уже пришло. Остальные ключи верхнего уровня (камера, функции) приходят
+целиком, как только прочитаны. Отмена - просто смена поколения: устаревший
+поток замолкает, а его недоставленные куски холст отбрасывает
+"""
+
+import codecs
+import json
+import os
+import re
+import threading
+
+import numpy as np
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from scene_model import object_from_dict
+
+
+# Массивы верхнего уровня, которые разбираются по элементу
+STREAMED_KEYS = ('objects', 'points')
+# Фигур или точек в одном куске
+CHUNK_SIZE = 2000
+# Сколько байт читать из файла за раз
+BLOCK_SIZE = 1 << 20
+# Кусков, ещё не забранных холстом: поток не убегает вперёд и не отнимает
+# GIL у потока окна, пока тот раскладывает пришедшее по индексам
+MAX_CHUNKS_IN_FLIGHT = 1
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class _JsonStream:
+    """Буфер текста поверх файла: значения JSON по одному, с дочитыванием по мере надобности"""
+
+    def __init__(self, f, block_size=BLOCK_SIZE):
+        self.f = f
+        self.block_size = block_size
+        self.decoder = json.JSONDecoder()
+        self.text_decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self.buffer = ''
+        self.pos = 0
+        self.bytes_read = 0
+        self.eof = False
+
+    def _fill(self):
+        """Дочитывает блок; False - файл кончился"""
+        if self.eof:
+            return False
+        data = self.f.read(self.block_size)
+        self.bytes_read += len(data)
+        self.eof = not data
+        # Разобранное начало буфера больше не нужно
+        self.buffer = self.buffer[self.pos:] + self.text_decoder.decode(data, final=self.eof)
+        self.pos = 0
+        return not self.eof
+
+    def peek(self):
+        """Следующий значащий символ ('' - конец файла), не сдвигаясь"""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, chars):
+        """Съедает один из символов chars и возвращает его"""
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"expected one of {chars!r}, got {char or 'end of file'!r} "
+                             f"near byte {self.bytes_read}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Следующее значение JSON целиком"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # Число в самом конце буфера могло обрезаться на середине - дочитываем
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+
+def _iter_project(stream):
+    """
+    События JSON-проекта по порядку файла: ('objects', элемент),
+    ('points', элемент) для массивов STREAMED_KEYS и (ключ, значение) для остальных
+    """
+    stream.expect('{')
+    if stream.peek() == '}':
+        return
+    while True:
+        key = stream.value()
+        stream.expect(':')
+        if key in STREAMED_KEYS and stream.peek() == '[':
+            stream.expect('[')
+            if stream.peek() == ']':
+                stream.expect(']')
+            else:
+                while True:
+                    yield key, stream.value()
+                    if stream.expect(',]') == ']':
+                        break
+        else:
+            yield key, stream.value()
+        if stream.expect(',}') == '}':
+            return
+
+
+class ProjectLoader(QObject):
+    """
+    Фоновый разбор JSON-проекта. Сигналы приходят в поток холста:
+    meta_loaded(ключ, значение) - камера, функции и прочее верхнего уровня;
+    chunk_loaded(фигуры, xs, ys, доля прочитанного) - очередной кусок сцены;
+    done() - файл разобран; failed(текст ошибки)
+    """
+
+    meta_loaded = pyqtSignal(str, object)
+    chunk_loaded = pyqtSignal(object, object, object, float)
+    done = pyqtSignal()
+    failed = pyqtSignal(str)
+    _event = pyqtSignal(int, str, object)
+
+    def __init__(self, chunk_size=CHUNK_SIZE, parent=None):
+        super().__init__(parent)
+        self.chunk_size = chunk_size
+        self.running = False
+        self._generation = 0
+        self._event.connect(self._on_event)
+
+    def start(self, path):
+        """Начинает загрузку; незаконченная предыдущая отменяется"""
+        self._generation += 1
+        self.running = True
+        self._in_flight = threading.Semaphore(MAX_CHUNKS_IN_FLIGHT)
+        thread = threading.Thread(target=self._run, args=(path, self._generation, self._in_flight),
+                                  name='project-loader', daemon=True)
+        thread.start()
+
+    def cancel(self):
+        """Поток бросит чтение на ближайшем элементе, его куски больше не придут"""
+        self._generation += 1
+        self.running = False
+
+    # ========== ФОНОВЫЙ ПОТОК ==========
+
+    def _run(self, path, generation, in_flight):
+        try:
+            with open(path, 'rb') as f:
+                finished = self._read(_JsonStream(f), max(1, os.path.getsize(path)), generation, in_flight)
+            if finished:
+                self._event.emit(generation, 'done', None)
+        except Exception as e:
+            self._event.emit(generation, 'failed', str(e))
+
+    def _read(self, stream, size, generation, in_flight):
+        """Разбирает файл и отдаёт его кусками; False - загрузку отменили"""
+        objects, points = [], []
+        for key, value in _iter_project(stream):
+            if generation != self._generation:
+                return False
+            self._take(key, value, objects, points, generation)
+            if len(objects) + len(points) >= self.chunk_size:
+                if not self._flush(objects, points, min(1.0, stream.bytes_read / size), generation, in_flight):
+                    return False
+        return self._flush(objects, points, 1.0, generation, in_flight)
+
+    def _take(self, key, value, objects, points, generation):
+        """Фигуры и точки копятся в кусок, остальное верхнего уровня уходит холсту сразу"""
+        if key == 'objects':
+            # Неизвестные типы пропускаем, как и двоичный формат
+            obj = object_from_dict(value)
+            if obj is not None:
+                objects.append(obj)
+        elif key == 'points':
+            points.append(value['pos'])
+        else:
+            self._event.emit(generation, 'meta', (key, value))
+
+    def _flush(self, objects, points, fraction, generation, in_flight):
+        """Отдаёт накопленное холсту; False - загрузку отменили"""
+        while not in_flight.acquire(timeout=0.1):
+            if generation != self._generation:
+                return False
+        positions = np.array(points, dtype=float).reshape(-1, 2)
+        self._event.emit(generation, 'chunk', (objects[:], positions[:, 0], positions[:, 1], fraction))
+        objects.clear()
+        points.clear()
+        return True
+
+    def _on_event(self, generation, kind, payload):
+        # Сигнал идёт через очередь событий: загрузку могли отменить или начать новую
+        if generation != self._generation:
+            return
+        if kind == 'meta':
+            self.meta_loaded.emit(*payload)
+        elif kind == 'chunk':
+            self.chunk_loaded.emit(*payload)
+            # Кусок разложен - потоку можно готовить следующий
+            self._in_flight.release()
+        else:
+            self.running = False
+            if kind == 'done':
+                self.done.emit()
+            else:
+                self.failed.emit(payload)
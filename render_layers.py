@@ -0,0 +1,164 @@
+"""
+Слои отрисовки холста
+Сетка, графики и геометрия рисуются в отдельные QPixmap и перерисовываются
+только когда меняется то, от чего они зависят (камера, объекты, функции).
+Курсор, прилипание и временные построения рисуются поверх каждый кадр
+"""
+
+from PyQt5.QtCore import Qt, QRect
+from PyQt5.QtGui import QPainter, QPixmap
+
+
+class RenderLayer:
+    """Закэшированный слой: картинка и ключ, с которым она была нарисована"""
+
+    def __init__(self, name, render):
+        self.name = name
+        # render(painter) рисует содержимое слоя в экранных координатах.
+        # Если у painter задан clip, достаточно нарисовать то, что в него попадает
+        self.render = render
+        self.pixmap = None
+        self.key = None
+
+    def is_valid(self, key):
+        return self.pixmap is not None and self.key == key
+
+
+class LayerStack:
+    """Стопка слоёв, склеенных в одну картинку для быстрого вывода"""
+
+    def __init__(self):
+        self.layers = []
+        self.composite = None
+        self._composite_valid = False
+
+    def add_layer(self, name, render):
+        self.layers.append(RenderLayer(name, render))
+
+    def layer(self, name):
+        for layer in self.layers:
+            if layer.name == name:
+                return layer
+        return None
+
+    def invalidate(self, name=None):
+        """Пометить слой (или все слои) как устаревшие"""
+        for layer in self.layers:
+            if name is None or layer.name == name:
+                layer.key = None
+        self._composite_valid = False
+
+    def paint(self, painter, size, device_pixel_ratio, keys):
+        """
+        Выводит все слои
+        keys - словарь {имя слоя: ключ}; слой перерисовывается, если ключ изменился
+        """
+        for layer in self.layers:
+            key = keys.get(layer.name)
+            if not layer.is_valid(key):
+                layer.pixmap = self._render_layer(layer, size, device_pixel_ratio)
+                layer.key = key
+                self._composite_valid = False
+
+        if not self._composite_valid or self.composite is None:
+            self.composite = self._new_pixmap(size, device_pixel_ratio)
+            composite_painter = QPainter(self.composite)
+            for layer in self.layers:
+                composite_painter.drawPixmap(0, 0, layer.pixmap)
+            composite_painter.end()
+            self._composite_valid = True
+
+        painter.drawPixmap(0, 0, self.composite)
+
+    def scroll(self, dx, dy, old_keys, new_keys):
+        """
+        Сдвигает готовые слои на (dx, dy) пикселей и дорисовывает только
+        открывшиеся полосы. Слои, нарисованные не для old_keys, просто сбрасываются
+        """
+        all_scrolled = True
+        for layer in self.layers:
+            exposed = None
+            if layer.is_valid(old_keys.get(layer.name)):
+                exposed = self._scroll_pixmap(layer.pixmap, dx, dy)
+
+            if exposed is None:
+                layer.key = None
+                all_scrolled = False
+                continue
+
+            # Каждую полосу рисуем отдельно: по прямоугольнику клипа слои
+            # отбрасывают всё, что в полосу не попадает
+            layer_painter = QPainter(layer.pixmap)
+            layer_painter.setRenderHint(QPainter.Antialiasing)
+            for rect in exposed:
+                self._clear_rect(layer_painter, rect)
+                layer_painter.save()
+                layer_painter.setClipRect(rect)
+                layer.render(layer_painter)
+                layer_painter.restore()
+            layer_painter.end()
+
+            layer.key = new_keys.get(layer.name)
+
+        exposed = None
+        if all_scrolled and self._composite_valid and self.composite is not None:
+            exposed = self._scroll_pixmap(self.composite, dx, dy)
+
+        if exposed is None:
+            self._composite_valid = False
+            return
+
+        # Склейку тоже сдвигаем и собираем заново только в открывшихся полосах
+        composite_painter = QPainter(self.composite)
+        for rect in exposed:
+            self._clear_rect(composite_painter, rect)
+            for layer in self.layers:
+                composite_painter.drawPixmap(rect, layer.pixmap, self._source_rect(layer.pixmap, rect))
+        composite_painter.end()
+
+    def _scroll_pixmap(self, pixmap, dx, dy):
+        """Сдвигает содержимое pixmap; возвращает открывшиеся полосы или None"""
+        ratio = pixmap.devicePixelRatio()
+        if ratio != int(ratio):
+            # При дробном масштабе сдвиг не попадает в целые пиксели
+            return None
+
+        pixmap_rect = pixmap.rect()
+        pixmap.scroll(int(dx * ratio), int(dy * ratio), pixmap_rect)
+
+        width = round(pixmap_rect.width() / ratio)
+        height = round(pixmap_rect.height() / ratio)
+        exposed = []
+        if dx > 0:
+            exposed.append(QRect(0, 0, dx, height))
+        elif dx < 0:
+            exposed.append(QRect(width + dx, 0, -dx, height))
+        if dy > 0:
+            exposed.append(QRect(0, 0, width, dy))
+        elif dy < 0:
+            exposed.append(QRect(0, height + dy, width, -dy))
+        return exposed
+
+    def _clear_rect(self, painter, rect):
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        painter.fillRect(rect, Qt.transparent)
+        painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
+
+    def _source_rect(self, pixmap, rect):
+        """Прямоугольник rect в физических пикселях pixmap"""
+        ratio = int(pixmap.devicePixelRatio())
+        return QRect(rect.x() * ratio, rect.y() * ratio, rect.width() * ratio, rect.height() * ratio)
+
+    def _render_layer(self, layer, size, device_pixel_ratio):
+        pixmap = self._new_pixmap(size, device_pixel_ratio)
+        layer_painter = QPainter(pixmap)
+        layer_painter.setRenderHint(QPainter.Antialiasing)
+        layer.render(layer_painter)
+        layer_painter.end()
+        return pixmap
+
+    def _new_pixmap(self, size, device_pixel_ratio):
+        pixmap = QPixmap(size * device_pixel_ratio)
+        pixmap.setDevicePixelRatio(device_pixel_ratio)
+        pixmap.fill(Qt.transparent)
+        return pixmap
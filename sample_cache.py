@@ -0,0 +1,94 @@
+"""
+Кэш выборок функций по тайлам (как у карт)
+Ключ тайла: (функция, уровень зума, номер тайла по x). При панорамировании
+и небольших шагах зума уже посчитанные тайлы переиспользуются
+"""
+
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SampleTileCache:
+    """Пирамида тайлов с выборками функций и LRU-вытеснением по памяти"""
+
+    def __init__(self, sampler, tile_pixels=256, max_bytes=64 * 1024 * 1024):
+        self.sampler = sampler
+        # Ширина тайла в физических пикселях на нижней границе уровня
+        self.tile_pixels = tile_pixels
+        self.max_bytes = max_bytes
+        self.bytes_used = 0
+        self._tiles = OrderedDict()
+
+    def level_for_scale(self, device_scale):
+        """Уровень пирамиды: между уровнями масштаб меняется вдвое"""
+        return math.floor(math.log2(device_scale))
+
+    def samples(self, func_key, func, left, right, scale, device_pixel_ratio=1.0):
+        """Выборка (xs, ys) функции, покрывающая [left, right], собранная из тайлов"""
+        device_scale = scale * device_pixel_ratio
+        level = self.level_for_scale(device_scale)
+
+        # Тайл фиксированной ширины в мировых координатах для всего уровня.
+        # Считаем его с масштабом верхней границы уровня, чтобы точности хватало
+        # при любом зуме внутри уровня
+        tile_width = self.tile_pixels / 2.0 ** level
+        tile_scale = 2.0 ** (level + 1)
+
+        first = math.floor(left / tile_width)
+        last = math.floor(right / tile_width)
+
+        xs_parts, ys_parts = [], []
+        for tile in range(first, last + 1):
+            xs, ys = self._get_tile(func_key, func, level, tile, tile_width, tile_scale)
+            if xs_parts and len(xs):
+                # Соседние тайлы делят общую граничную точку
+                xs, ys = xs[1:], ys[1:]
+            xs_parts.append(xs)
+            ys_parts.append(ys)
+
+        if not xs_parts:
+            return np.empty(0), np.empty(0)
+        xs, ys = np.concatenate(xs_parts), np.concatenate(ys_parts)
+
+        # Крайние тайлы торчат за края видимой области - обрезаем,
+        # оставляя по одной точке снаружи, чтобы кривая доходила до края
+        start = max(0, np.searchsorted(xs, left) - 1)
+        end = np.searchsorted(xs, right, side='right') + 1
+        return xs[start:end], ys[start:end]
+
+    def _get_tile(self, func_key, func, level, tile, tile_width, tile_scale):
+        key = (func_key, level, tile)
+        entry = self._tiles.get(key)
+        if entry is not None:
+            self._tiles.move_to_end(key)
+            return entry
+
+        left = tile * tile_width
+        xs, ys = self.sampler.sample(func, left, left + tile_width, tile_scale, tile_width * tile_scale)
+        entry = (xs, ys)
+        self._tiles[key] = entry
+        self.bytes_used += xs.nbytes + ys.nbytes
+        self._evict()
+        return entry
+
+    def _evict(self):
+        """Выкидываем самые давно использованные тайлы, пока не влезем в бюджет"""
+        while self.bytes_used > self.max_bytes and len(self._tiles) > 1:
+            _, (xs, ys) = self._tiles.popitem(last=False)
+            self.bytes_used -= xs.nbytes + ys.nbytes
+
+    def invalidate(self, func_key):
+        """Забыть все тайлы одной функции"""
+        stale = [key for key in self._tiles if key[0] == func_key]
+        for key in stale:
+            xs, ys = self._tiles.pop(key)
+            self.bytes_used -= xs.nbytes + ys.nbytes
+
+    def clear(self):
+        self._tiles.clear()
+        self.bytes_used = 0
+
+    def __len__(self):
+        return len(self._tiles)
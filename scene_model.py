@@ -0,0 +1,721 @@
+"""
+Модель сцены: геометрические объекты холста
+Каждая фигура - свой класс со __slots__ (без словаря на каждый экземпляр) и
+своими методами рисования, проверки попадания и сохранения, поэтому холсту не
+нужны цепочки if obj['type'] == ... Тип из файла проекта превращается в класс
+через реестр OBJECT_TYPES. У каждого объекта стабильный id, не зависящий от
+его места в списке. Рамка объекта в координатах мира считается один раз
+и кэшируется: по ней холст отбрасывает фигуры за краем экрана. Рисуются
+фигуры пачками по классам (draw_batch): все отрезки - одним drawLines и т.д.,
+прямо в координатах мира - перевод в пиксели делает матрица painter.
+Отрезки и многоугольники из двоичного файла (from_columns) держат вершины
+в его колонках и собирают кортежи, только когда их спросят по одной фигуре
+"""
+
+import itertools
+import math
+import os
+
+import numpy as np
+from PyQt5.QtCore import Qt, QPointF, QRectF
+from PyQt5.QtGui import QPen, QFontMetricsF, QPolygonF
+
+from drawing_objects import DrawingObjects
+from viewport_clip import circle_arcs
+
+
+# Имя типа в файле проекта → класс
+OBJECT_TYPES = {}
+
+_ids = itertools.count(1)
+
+
+def register_type(cls):
+    OBJECT_TYPES[cls.type_name] = cls
+    return cls
+
+
+def object_from_dict(data):
+    """Объект из словаря файла проекта; None, если тип неизвестен"""
+    cls = OBJECT_TYPES.get(data.get('type'))
+    if cls is None:
+        return None
+    return cls.from_dict(data)
+
+
+def release_mapping(objects, filename):
+    """
+    Фигуры, читающие вершины из отображённого в память файла filename
+    (from_columns), переводит на копии колонок в памяти. После этого
+    отображение закрывается, и файл можно перезаписать
+    """
+    filename = os.path.abspath(filename)
+    copies = {}
+    for obj in objects:
+        columns = getattr(obj, '_columns', None)
+        if isinstance(columns, np.memmap) and columns.filename == filename:
+            if id(columns) not in copies:
+                copies[id(columns)] = np.array(columns)
+            obj._columns = copies[id(columns)]
+
+
+def draw_objects(painter, view, objects):
+    """
+    Рисует фигуры пачками: по вызову draw_batch на класс. Число вызовов
+    QPainter не растёт с числом фигур. Классы идут в порядке реестра, а не
+    появления в списке, иначе наложение зависело бы от того, что видно на экране.
+    painter - в экранных координатах; геометрия рисуется под матрицей
+    мир → экран, надписи (draw_screen_batch) - поверх, уже в пикселях
+    """
+    groups = {}
+    for obj in objects:
+        groups.setdefault(type(obj), []).append(obj)
+    order = {cls: i for i, cls in enumerate(OBJECT_TYPES.values())}
+    groups = sorted(groups.items(), key=lambda item: order.get(item[0], len(order)))
+
+    painter.save()
+    painter.setTransform(view.world_transform(), True)
+    for cls, group in groups:
+        cls.draw_batch(painter, view, group)
+    painter.restore()
+
+    for cls, group in groups:
+        cls.draw_screen_batch(painter, view, group)
+
+
+def view_clip_rect(view, pad=8):
+    """
+    Видимая часть мира с запасом pad пикселей на толщину пера: по ней
+    геометрия обрезается перед рисованием (viewport_clip)
+    """
+    left, bottom, right, top = view.visible_world_rect()
+    pad /= view.get_grid_size()
+    return left - pad, bottom - pad, right + pad, top + pad
+
+
+def closest_point_on_segment(px, py, x1, y1, x2, y2):
+    """Ближайшая к (px, py) точка отрезка и расстояние до неё"""
+    dx, dy = x2 - x1, y2 - y1
+    if dx == 0 and dy == 0:
+        return x1, y1, math.hypot(px - x1, py - y1)
+
+    t = max(0, min(1, ((px - x1) * dx + (py - y1) * dy) / (dx * dx + dy * dy)))
+    closest_x = x1 + t * dx
+    closest_y = y1 + t * dy
+    return closest_x, closest_y, math.hypot(px - closest_x, py - closest_y)
+
+
+def line_span_in_rect(x, y, dir_x, dir_y, rect):
+    """Отрезок [t_start, t_end] прямой (x, y) + t * (dir_x, dir_y), лежащий внутри rect"""
+    t_start, t_end = -math.inf, math.inf
+    for origin, direction, low, high in ((x, dir_x, rect.left(), rect.right()),
+                                         (y, dir_y, rect.top(), rect.bottom())):
+        if abs(direction) < 1e-12:
+            if origin < low or origin > high:
+                return None
+            continue
+        t1 = (low - origin) / direction
+        t2 = (high - origin) / direction
+        t_start = max(t_start, min(t1, t2))
+        t_end = min(t_end, max(t1, t2))
+
+    if t_start >= t_end:
+        return None
+    return t_start, t_end
+
+
+class SceneObject:
+    """
+    Базовый класс фигур. view - холст: world_to_screen(), world_transform(),
+    visible_world_rect(), get_grid_size(), rect()
+    """
+
+    __slots__ = ('id', '_bounds')
+
+    type_name = None
+    # Попадание, если distance_to() меньше радиуса поиска, умноженного на hit_scale
+    hit_scale = 2
+    # Тип точки прилипания на сторонах фигуры (см. snap_sides)
+    side_snap_type = None
+    # Сколько пикселей рисунок выступает за рамку bounds() (перо, маркеры)
+    screen_margin = 2
+
+    def __init__(self):
+        self.id = next(_ids)
+        self._bounds = None
+
+    def bounds(self):
+        """
+        Рамка (x0, y0, x1, y1) в координатах мира; бесконечная, если фигура
+        тянется через всю плоскость. Кэшируется: фигуры сцены после
+        добавления на холст не меняются
+        """
+        if self._bounds is None:
+            self._bounds = self._compute_bounds()
+        return self._bounds
+
+    def _compute_bounds(self):
+        return (-math.inf, -math.inf, math.inf, math.inf)
+
+    def pixel_margin(self):
+        """Запас в пикселях вокруг bounds() при отсечении по экрану"""
+        return self.screen_margin
+
+    def draw(self, painter, view):
+        """Рисует одну фигуру (временную фигуру инструмента); painter - в экранных координатах"""
+        draw_objects(painter, view, [self])
+
+    @classmethod
+    def draw_batch(cls, painter, view, objects):
+        """
+        Геометрия сразу нескольких фигур класса. На painter уже стоит матрица
+        мир → экран: координаты - мировые, перья - DrawingObjects.world_pen
+        """
+
+    @classmethod
+    def draw_screen_batch(cls, painter, view, objects):
+        """То, что привязано к пикселям экрана (надписи), поверх геометрии"""
+        # Фигура без пачечного рисования рисует себя сама в экранных координатах
+        if cls.draw is not SceneObject.draw:
+            for obj in objects:
+                obj.draw(painter, view)
+
+    def draw_pick(self, painter, view):
+        """Контур для буфера выбора: рисуется текущим пером, цвет и толщину задаёт холст"""
+
+    def distance_to(self, x, y):
+        """Расстояние от точки мира до фигуры (для выбора мышью)"""
+        return math.inf
+
+    def snap_sides(self):
+        """Отрезки (x1, y1, x2, y2), к которым прилипает инструмент точки"""
+        return ()
+
+    @classmethod
+    def snap_sides_batch(cls, objects):
+        """snap_sides() всех фигур класса сразу: (отрезки (m, 4), сколько их у каждой фигуры)"""
+        sides = [np.asarray(obj.snap_sides(), dtype=float).reshape(-1, 4) for obj in objects]
+        return np.concatenate(sides) if sides else np.empty((0, 4)), [len(obj_sides) for obj_sides in sides]
+
+    def snap_centers(self):
+        """Особые точки фигуры для прилипания (центр окружности)"""
+        return ()
+
+    @classmethod
+    def snap_centers_batch(cls, objects):
+        """snap_centers() всех фигур класса сразу: (точки (m, 2), сколько их у каждой фигуры)"""
+        # Класс без особых точек не перебираем вовсе
+        if cls.snap_centers is SceneObject.snap_centers:
+            return np.empty((0, 2)), [0] * len(objects)
+        centers = [obj.snap_centers() for obj in objects]
+        return (np.array([center for obj_centers in centers for center in obj_centers], dtype=float).reshape(-1, 2),
+                [len(obj_centers) for obj_centers in centers])
+
+    def to_dict(self):
+        raise NotImplementedError
+
+    @classmethod
+    def from_dict(cls, data):
+        raise NotImplementedError
+
+    @classmethod
+    def to_columns(cls, objects):
+        """
+        Фигуры класса колонками numpy для двоичного файла проекта
+        (project_binary.py): имя → массив. None - класс хранится словарями to_dict()
+        """
+        return None
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Обратно к to_columns(): список фигур из колонок"""
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{type(self).__name__}(id={self.id})"
+
+
+@register_type
+class Point(SceneObject):
+    __slots__ = ('pos',)
+
+    type_name = 'point'
+    hit_scale = 1
+    # Кружок радиуса 4 и перо толщиной 2
+    screen_margin = 5
+
+    def __init__(self, pos):
+        super().__init__()
+        self.pos = tuple(pos)
+
+    def _compute_bounds(self):
+        return (*self.pos, *self.pos)
+
+    @classmethod
+    def draw_batch(cls, painter, view, points):
+        # Косметическое перо: кружки одного размера в пикселях при любом зуме
+        xs, ys = np.array([point.pos for point in points], dtype=float).T
+        DrawingObjects.draw_points_batch(painter, xs, ys,
+                                         DrawingObjects.world_pen(painter, Qt.black, 10, cap=Qt.RoundCap))
+
+    def draw_pick(self, painter, view):
+        painter.drawPoint(QPointF(*view.world_to_screen(*self.pos)))
+
+    def distance_to(self, x, y):
+        return math.hypot(self.pos[0] - x, self.pos[1] - y)
+
+    def to_dict(self):
+        return {'type': self.type_name, 'pos': list(self.pos)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['pos'])
+
+    @classmethod
+    def to_columns(cls, points):
+        return {'pos': np.array([point.pos for point in points], dtype=float).reshape(-1, 2)}
+
+    @classmethod
+    def from_columns(cls, columns):
+        return [cls(pos) for pos in columns['pos'].tolist()]
+
+
+@register_type
+class Line(SceneObject):
+    # _columns - концы многих отрезков (n, 4) из файла проекта, _row - строка этого
+    __slots__ = ('_points', 'infinite', '_columns', '_row')
+
+    type_name = 'line'
+    side_snap_type = 'line_point'
+
+    def __init__(self, points, infinite=False):
+        super().__init__()
+        # (x1, y1, x2, y2)
+        self._points = tuple(points)
+        self.infinite = infinite
+        self._columns = None
+        self._row = None
+
+    @property
+    def points(self):
+        """(x1, y1, x2, y2); у прочитанного из колонок собирается при первом обращении"""
+        if self._points is None:
+            self._points = tuple(self._columns[self._row].tolist())
+        return self._points
+
+    def _compute_bounds(self):
+        if self.infinite:
+            # Пунктир продолжается до краёв любого экрана
+            return super()._compute_bounds()
+        x1, y1, x2, y2 = self.points
+        return (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+
+    @classmethod
+    def draw_batch(cls, painter, view, lines):
+        ends = cls._end_array(lines)
+        DrawingObjects.draw_lines_batch(painter, ends[:, 0], ends[:, 1], ends[:, 2], ends[:, 3],
+                                        DrawingObjects.world_pen(painter), view_clip_rect(view))
+
+    @classmethod
+    def draw_screen_batch(cls, painter, view, lines):
+        # Фаза пунктира привязана к пикселям, и у каждой прямой она своя
+        for line in lines:
+            if line.infinite:
+                cls._draw_extension(painter, view, *view.world_to_screen(*line.points[:2]),
+                                    *view.world_to_screen(*line.points[2:]))
+
+    @staticmethod
+    def _draw_extension(painter, view, x1, y1, x2, y2):
+        dx = x2 - x1
+        dy = y2 - y1
+        if abs(dx) <= 0.1 and abs(dy) <= 0.1:
+            return
+
+        length = math.sqrt(dx*dx + dy*dy)
+        norm_x = dx / length
+        norm_y = dy / length
+
+        # Обрезаем прямую точно по краям холста. Иначе Qt сам обрежет
+        # её по краю картинки и начнёт штриховку оттуда, и штрихи
+        # будут ездить вдоль прямой при панорамировании
+        visible = line_span_in_rect(x1, y1, norm_x, norm_y, QRectF(view.rect()))
+        if visible:
+            t_start, t_end = visible
+            pen = QPen(DrawingObjects.pen(Qt.black, 1, dashes=(5, 5)))
+            # Фаза штриховки привязана к первой точке прямой
+            pen.setDashOffset(t_start % 10)
+            painter.setPen(pen)
+            painter.drawLine(QPointF(x1 + norm_x * t_start, y1 + norm_y * t_start),
+                             QPointF(x1 + norm_x * t_end, y1 + norm_y * t_end))
+
+    def draw_pick(self, painter, view):
+        painter.drawLine(QPointF(*view.world_to_screen(*self.points[:2])),
+                         QPointF(*view.world_to_screen(*self.points[2:])))
+
+    def distance_to(self, x, y):
+        return closest_point_on_segment(x, y, *self.points)[2]
+
+    def snap_sides(self):
+        return (self.points,)
+
+    @classmethod
+    def snap_sides_batch(cls, lines):
+        return cls._end_array(lines), [1] * len(lines)
+
+    def to_dict(self):
+        return {'type': self.type_name, 'points': list(self.points), 'infinite': self.infinite}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['points'], data.get('infinite', False))
+
+    @classmethod
+    def to_columns(cls, lines):
+        return {
+            'points': cls._end_array(lines),
+            'infinite': np.array([line.infinite for line in lines], dtype=bool),
+        }
+
+    @staticmethod
+    def _end_array(lines):
+        """Концы всех отрезков массивом (n, 4)"""
+        columns = lines[0]._columns if lines else None
+        if columns is not None and all(line._columns is columns for line in lines):
+            # Все из одних колонок - одна выборка по номерам строк
+            rows = np.fromiter((line._row for line in lines), dtype=np.int64, count=len(lines))
+            return np.asarray(columns[rows], dtype=float)
+        return np.array([line.points for line in lines], dtype=float).reshape(-1, 4)
+
+    @classmethod
+    def from_columns(cls, columns):
+        # Как у Polygon.from_columns: концы остаются в колонках, фигура помнит свою строку
+        ends = columns['points']
+        # Рамки отрезков - векторно; у бесконечных прямых её посчитает _compute_bounds
+        boxes = np.column_stack((np.minimum(ends[:, 0], ends[:, 2]), np.minimum(ends[:, 1], ends[:, 3]),
+                                 np.maximum(ends[:, 0], ends[:, 2]), np.maximum(ends[:, 1], ends[:, 3])))
+        lines = []
+        for row, (infinite, box) in enumerate(zip(columns['infinite'].tolist(), map(tuple, boxes.tolist()))):
+            line = cls.__new__(cls)
+            line.id = next(_ids)
+            line._bounds = None if infinite else box
+            line._points = None
+            line.infinite = infinite
+            line._columns = ends
+            line._row = row
+            lines.append(line)
+        return lines
+
+
+@register_type
+class Circle(SceneObject):
+    __slots__ = ('center', 'radius')
+
+    type_name = 'circle'
+    # Красная точка в центре рисуется радиусом 3 пикселя даже у крошечной окружности
+    screen_margin = 4
+
+    def __init__(self, center, radius):
+        super().__init__()
+        self.center = tuple(center)
+        self.radius = radius
+
+    def _compute_bounds(self):
+        x, y = self.center
+        return (x - self.radius, y - self.radius, x + self.radius, y + self.radius)
+
+    @classmethod
+    def draw_batch(cls, painter, view, circles):
+        xs, ys, radii = np.array([(*circle.center, circle.radius) for circle in circles], dtype=float).T
+        pen = DrawingObjects.world_pen(painter)
+        # Окружность больше экрана Qt обводит целиком, хоть видна лишь дуга -
+        # такие рисуем ломаной только по видимым дугам
+        grid_size = view.get_grid_size()
+        huge = radii * grid_size > max(view.width(), view.height())
+        DrawingObjects.draw_circles_batch(painter, xs[~huge], ys[~huge], radii[~huge], pen)
+        if huge.any():
+            clip = view_clip_rect(view)
+            painter.setPen(pen)
+            for x, y, radius in zip(xs[huge].tolist(), ys[huge].tolist(), radii[huge].tolist()):
+                # Хорды отходят от дуги не больше чем на четверть пикселя
+                for arc_x, arc_y in circle_arcs(x, y, radius, clip, 0.25 / grid_size):
+                    DrawingObjects.draw_polyline(painter, arc_x, arc_y)
+        # Центры - красные кружки радиуса 3 с пером 2, то есть круглые точки диаметром 8
+        DrawingObjects.draw_points_batch(painter, xs, ys,
+                                         DrawingObjects.world_pen(painter, Qt.red, 8, cap=Qt.RoundCap))
+
+    def draw_pick(self, painter, view):
+        radius = self.radius * view.get_grid_size()
+        painter.drawEllipse(QPointF(*view.world_to_screen(*self.center)), radius, radius)
+
+    def distance_to(self, x, y):
+        return abs(math.hypot(x - self.center[0], y - self.center[1]) - self.radius)
+
+    def snap_centers(self):
+        return (self.center,)
+
+    def to_dict(self):
+        return {'type': self.type_name, 'center': list(self.center), 'radius': self.radius}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['center'], data['radius'])
+
+    @classmethod
+    def to_columns(cls, circles):
+        return {
+            'center': np.array([circle.center for circle in circles], dtype=float).reshape(-1, 2),
+            'radius': np.array([circle.radius for circle in circles], dtype=float),
+        }
+
+    @classmethod
+    def from_columns(cls, columns):
+        return [cls(center, radius)
+                for center, radius in zip(columns['center'].tolist(), columns['radius'].tolist())]
+
+
+@register_type
+class Polygon(SceneObject):
+    # _columns - вершины многих многоугольников подряд (n, 2), например окно в
+    # отображённый в память файл проекта; _span - строки этого многоугольника
+    __slots__ = ('_points', '_columns', '_span')
+
+    type_name = 'polygon'
+    side_snap_type = 'polygon_point'
+
+    def __init__(self, points=()):
+        super().__init__()
+        # Список вершин; пока многоугольник строится, в него дописывают точки
+        # (рамку у недостроенного многоугольника не спрашивают)
+        self._points = [tuple(p) for p in points]
+        self._columns = None
+        self._span = None
+
+    @property
+    def points(self):
+        """Вершины списком кортежей; у прочитанного из колонок собираются при первом обращении"""
+        if self._points is None:
+            start, end = self._span
+            vertices = self._columns[start:end]
+            self._points = list(zip(vertices[:, 0].tolist(), vertices[:, 1].tolist()))
+        return self._points
+
+    def vertex_count(self):
+        if self._points is None:
+            return self._span[1] - self._span[0]
+        return len(self._points)
+
+    def _compute_bounds(self):
+        if not self.points:
+            return super()._compute_bounds()
+        xs, ys = zip(*self.points)
+        return (min(xs), min(ys), max(xs), max(ys))
+
+    @classmethod
+    def draw_batch(cls, painter, view, polygons):
+        polygons = [polygon for polygon in polygons if polygon.vertex_count()]
+        if not polygons:
+            return
+        counts = np.array([polygon.vertex_count() for polygon in polygons], dtype=np.int64)
+        xs, ys = cls._vertex_array(polygons, counts).T
+        DrawingObjects.draw_polygons_batch(painter, xs, ys, counts.tolist(),
+                                           DrawingObjects.world_pen(painter), view_clip_rect(view))
+
+    def draw_pick(self, painter, view):
+        painter.drawPolygon(QPolygonF([QPointF(*view.world_to_screen(*p)) for p in self.points]))
+
+    def distance_to(self, x, y):
+        return min((closest_point_on_segment(x, y, *side)[2] for side in self.snap_sides()),
+                   default=math.inf)
+
+    def snap_sides(self):
+        points = self.points
+        return [(*points[j], *points[(j + 1) % len(points)]) for j in range(len(points))]
+
+    @classmethod
+    def snap_sides_batch(cls, polygons):
+        # Как в DrawingObjects.draw_polygons_batch: сторона - из вершины в следующую,
+        # у последней вершины многоугольника - в его первую
+        counts = np.array([polygon.vertex_count() for polygon in polygons], dtype=np.int64)
+        vertices = cls._vertex_array(polygons, counts)
+        following = np.arange(1, len(vertices) + 1)
+        filled = counts[counts > 0]
+        ends = np.cumsum(filled)
+        following[ends - 1] = ends - filled
+        return np.hstack((vertices, vertices[following])), counts.tolist()
+
+    def to_dict(self):
+        return {'type': self.type_name, 'points': [list(p) for p in self.points]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['points'])
+
+    @classmethod
+    def to_columns(cls, polygons):
+        # Вершины всех многоугольников подряд, counts - сколько их у каждого
+        counts = np.array([polygon.vertex_count() for polygon in polygons], dtype=np.int64)
+        return {'vertices': cls._vertex_array(polygons, counts), 'counts': counts}
+
+    @staticmethod
+    def _vertex_array(polygons, counts):
+        """Вершины всех многоугольников подряд массивом (n, 2)"""
+        total = int(counts.sum())
+        columns = polygons[0]._columns if polygons else None
+        if columns is not None and all(polygon._columns is columns for polygon in polygons):
+            # Все из одних колонок: одна выборка по номерам строк, кортежи не нужны
+            starts = np.fromiter((polygon._span[0] for polygon in polygons), dtype=np.int64, count=len(polygons))
+            shift = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+            return np.asarray(columns[np.arange(total) + shift], dtype=float).reshape(-1, 2)
+        # fromiter по плоскому потоку чисел в разы быстрее np.array по списку кортежей
+        coordinates = itertools.chain.from_iterable(
+            itertools.chain.from_iterable(polygon.points for polygon in polygons))
+        return np.fromiter(coordinates, dtype=float, count=2 * total).reshape(-1, 2)
+
+    @classmethod
+    def from_columns(cls, columns):
+        vertices, counts = columns['vertices'], columns['counts']
+        ends = np.cumsum(counts)
+        starts = ends - counts
+        # Рамки сразу всех непустых - векторно, а не min/max по каждому списку вершин
+        bounds = [None] * len(counts)
+        filled = np.flatnonzero(counts > 0)
+        if len(filled):
+            offsets = starts[filled]
+            x0 = np.minimum.reduceat(vertices[:, 0], offsets).tolist()
+            y0 = np.minimum.reduceat(vertices[:, 1], offsets).tolist()
+            x1 = np.maximum.reduceat(vertices[:, 0], offsets).tolist()
+            y1 = np.maximum.reduceat(vertices[:, 1], offsets).tolist()
+            for index, box in zip(filled.tolist(), zip(x0, y0, x1, y1)):
+                bounds[index] = box
+        # Вершины остаются в колонках (без копии и без кортежей), фигура помнит
+        # только свой промежуток строк; __init__ с его списком вершин не зовём
+        polygons = []
+        for span, box in zip(zip(starts.tolist(), ends.tolist()), bounds):
+            polygon = cls.__new__(cls)
+            polygon.id = next(_ids)
+            polygon._bounds = box
+            polygon._points = None
+            polygon._columns = vertices
+            polygon._span = span
+            polygons.append(polygon)
+        return polygons
+
+
+@register_type
+class Angle(SceneObject):
+    __slots__ = ('vertex', 'point1', 'point2', 'angle')
+
+    type_name = 'angle'
+
+    def __init__(self, vertex, point1, point2, angle):
+        super().__init__()
+        self.vertex = tuple(vertex)
+        self.point1 = tuple(point1)
+        self.point2 = tuple(point2)
+        # Величина угла в градусах
+        self.angle = angle
+
+    def _compute_bounds(self):
+        xs, ys = zip(self.vertex, self.point1, self.point2)
+        return (min(xs), min(ys), max(xs), max(ys))
+
+    @classmethod
+    def draw_batch(cls, painter, view, angles):
+        vx, vy, p1x, p1y, p2x, p2y = np.array(
+            [(*angle.vertex, *angle.point1, *angle.point2) for angle in angles], dtype=float).T
+        # Обе стороны всех углов - одним drawLines
+        DrawingObjects.draw_lines_batch(painter, np.concatenate((vx, vx)), np.concatenate((vy, vy)),
+                                        np.concatenate((p1x, p2x)), np.concatenate((p1y, p2y)),
+                                        DrawingObjects.world_pen(painter), view_clip_rect(view))
+
+    def draw_pick(self, painter, view):
+        vertex = QPointF(*view.world_to_screen(*self.vertex))
+        painter.drawLine(vertex, QPointF(*view.world_to_screen(*self.point1)))
+        painter.drawLine(vertex, QPointF(*view.world_to_screen(*self.point2)))
+
+    def distance_to(self, x, y):
+        return min(closest_point_on_segment(x, y, *self.vertex, *self.point1)[2],
+                   closest_point_on_segment(x, y, *self.vertex, *self.point2)[2])
+
+    def to_dict(self):
+        return {
+            'type': self.type_name,
+            'vertex': list(self.vertex),
+            'point1': list(self.point1),
+            'point2': list(self.point2),
+            'angle': self.angle,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['vertex'], data['point1'], data['point2'], data['angle'])
+
+    @classmethod
+    def to_columns(cls, angles):
+        return {
+            'points': np.array([(*angle.vertex, *angle.point1, *angle.point2) for angle in angles],
+                               dtype=float).reshape(-1, 6),
+            'angle': np.array([angle.angle for angle in angles], dtype=float),
+        }
+
+    @classmethod
+    def from_columns(cls, columns):
+        return [cls(points[0:2], points[2:4], points[4:6], angle)
+                for points, angle in zip(columns['points'].tolist(), columns['angle'].tolist())]
+
+
+@register_type
+class Text(SceneObject):
+    __slots__ = ('pos', 'text', 'size', '_layout')
+
+    type_name = 'text'
+
+    def __init__(self, pos, text, size=12):
+        super().__init__()
+        self.pos = tuple(pos)
+        self.text = text
+        self.size = size
+        self._layout = None
+
+    def _compute_bounds(self):
+        return (*self.pos, *self.pos)
+
+    def layout(self):
+        """
+        (QStaticText, подъём над базовой линией, размер в пикселях);
+        раскладывается заново, только если поменялись текст или кегль
+        """
+        key = (self.text, self.size)
+        if self._layout is None or self._layout[0] != key:
+            font = DrawingObjects.font("Arial", self.size)
+            metrics = QFontMetricsF(font)
+            extent = math.ceil(max(metrics.horizontalAdvance(self.text), metrics.height()))
+            self._layout = (key, DrawingObjects.prepare_text(self.text, font), metrics.ascent(), extent)
+        return self._layout[1:]
+
+    def pixel_margin(self):
+        # Надпись не масштабируется вместе с миром: её размер известен только в пикселях
+        return self.layout()[2]
+
+    @classmethod
+    def draw_screen_batch(cls, painter, view, texts):
+        painter.setPen(DrawingObjects.pen(Qt.black, 1))
+        for text in texts:
+            static, ascent, _ = text.layout()
+            x, y = view.world_to_screen(*text.pos)
+            # Базовая линия - на y, как у drawText; drawStaticText берёт левый верхний угол
+            painter.setFont(DrawingObjects.font("Arial", text.size))
+            painter.drawStaticText(QPointF(int(x), int(y) - ascent), static)
+
+    def draw_pick(self, painter, view):
+        painter.drawPoint(QPointF(*view.world_to_screen(*self.pos)))
+
+    def distance_to(self, x, y):
+        return math.hypot(x - self.pos[0], y - self.pos[1])
+
+    def to_dict(self):
+        return {'type': self.type_name, 'pos': list(self.pos), 'text': self.text, 'size': self.size}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['pos'], data['text'], data.get('size', 12))
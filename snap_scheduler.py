@@ -0,0 +1,133 @@
+"""
+Планировщик поиска точки прилипания
+Мышь с высокой частотой опроса присылает событий больше, чем кадров, поэтому
+snap считается не в mouseMoveEvent, а не чаще одного раза за кадр и только если
+изменилось то, от чего он зависит (пиксель курсора, камера, сцена). По желанию
+расчёт уходит в фоновый поток: новая позиция курсора отменяет устаревший запрос,
+а результат доходит до холста сигналом, только если он ещё актуален
+"""
+
+import threading
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class SnapScheduler(QObject):
+    """
+    Последний результат snap и очередь из одного запроса
+    compute(world_x, world_y, view, cancelled) → точка прилипания или None;
+    view - снимок камеры, снятый в GUI-потоке; cancelled() становится True,
+    когда запрос устарел
+    """
+
+    # Пришёл свежий результат из фонового потока - холсту пора перерисоваться
+    updated = pyqtSignal()
+    _finished = pyqtSignal(int, object)
+
+    def __init__(self, compute, use_thread=False, parent=None):
+        super().__init__(parent)
+        self.compute = compute
+        self.use_thread = use_thread
+        self.result = None
+
+        # Ключ последнего принятого запроса: повтор с тем же ключом ничего не делает
+        self._key = None
+        self._generation = 0
+        self._pending = None
+
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self._finished.connect(self._on_finished)
+
+    def request(self, key, world_x, world_y, view=None):
+        """
+        Новая позиция курсора; key - всё, от чего зависит результат
+        view уходит в compute как есть: фоновый поток не читает виджет сам
+        """
+        if key == self._key:
+            return
+        self._key = key
+        with self._condition:
+            self._generation += 1
+            self._pending = (self._generation, world_x, world_y, view)
+            if self.use_thread:
+                self._ensure_thread()
+                self._condition.notify()
+
+    def flush(self):
+        """Считает отложенный запрос (вызывается из paintEvent); в потоковом режиме ничего не делает"""
+        if self.use_thread or self._pending is None:
+            return self.result
+        generation, world_x, world_y, view = self._pending
+        self._pending = None
+        self.result = self.compute(world_x, world_y, view, lambda: False)
+        return self.result
+
+    def invalidate(self):
+        """Следующий request пересчитает snap, даже если ключ тот же"""
+        self._key = None
+
+    def set_threaded(self, enabled):
+        if enabled == self.use_thread:
+            return
+        self.stop()
+        self.use_thread = enabled
+        self.invalidate()
+
+    def stop(self):
+        """Останавливает фоновый поток (при закрытии окна)"""
+        with self._condition:
+            self._stopped = True
+            self._pending = None
+            self._condition.notify()
+        # Поток, выходя, сам обнуляет _thread - берём ссылку заранее
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=1.0)
+        self._thread = None
+        self._stopped = False
+
+    # ========== ФОНОВЫЙ ПОТОК ==========
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='snap-worker', daemon=True)
+            self._thread.start()
+
+    def _is_stale(self, generation):
+        return generation != self._generation or self._stopped
+
+    def _run(self):
+        try:
+            while True:
+                with self._condition:
+                    while self._pending is None and not self._stopped:
+                        self._condition.wait()
+                    if self._stopped:
+                        return
+                    # Берём только самый свежий запрос, промежуточные позиции пропускаем
+                    generation, world_x, world_y, view = self._pending
+                    self._pending = None
+
+                try:
+                    result = self.compute(world_x, world_y, view, lambda: self._is_stale(generation))
+                except Exception as e:
+                    # Ошибка одного запроса не должна останавливать поток: следующий
+                    # запрос посчитается заново
+                    print(f"Snap error: {e}")
+                    continue
+                if not self._is_stale(generation):
+                    self._finished.emit(generation, result)
+        finally:
+            # Поток завершился - следующий request() запустит новый
+            with self._condition:
+                if self._thread is threading.current_thread():
+                    self._thread = None
+
+    def _on_finished(self, generation, result):
+        # Сигнал идёт через очередь событий: за это время мог прийти новый запрос
+        if generation != self._generation:
+            return
+        self.result = result
+        self.updated.emit()
@@ -0,0 +1,341 @@
+"""
+Пространственный индекс кандидатов для прилипания
+Иерархическая сетка-хэш: ячейка (уровень, i, j) → ключи объектов, чьи рамки её
+задевают. На уровне L ячейка в level_factor**L раз крупнее базовой; каждый объект
+лежит на самом мелком уровне, где он занимает немного ячеек, поэтому длинные
+отрезки не размазываются по тысячам ячеек. Запрос по квадрату вокруг курсора
+смотрит несколько ячеек на каждом занятом уровне вместо перебора всех точек и
+фигур. Размер базовой ячейки подстраивается под радиус прилипания (он зависит
+от зума), перестройка - O(n) и только при сильной смене зума.
+Рамки фигур для отсечения по экрану (CullIndex) лежат колонками в BoxStore
+(columnar_store.py) с такой же сеткой, только в массивах numpy
+"""
+
+import math
+
+import numpy as np
+
+from columnar_store import BoxStore, SegmentStore
+
+
+class SpatialHash:
+    """Сетка-хэш рамок (x0, y0, x1, y1) с произвольными ключами и данными"""
+
+    def __init__(self, cell_size=1.0, max_cells_per_item=16, level_factor=8, max_level=8,
+                 max_cells_per_query=256):
+        self.cell_size = cell_size
+        # Объект кладём на уровень, где он задевает не больше max_cells_per_item ячеек
+        self.max_cells_per_item = max_cells_per_item
+        # Запрос крупнее max_cells_per_query ячеек уровня отдаёт всё без сетки
+        self.max_cells_per_query = max_cells_per_query
+        self.level_factor = level_factor
+        self.max_level = max_level
+
+        self._cells = {}
+        # Уровень → сколько объектов на нём лежит; пустые уровни запрос пропускает
+        self._levels = {}
+        # Бесконечные рамки и всё, что не влезло даже в верхний уровень
+        self._large = set()
+        self._items = {}
+
+    def __len__(self):
+        return len(self._items)
+
+    def clear(self):
+        self._cells.clear()
+        self._levels.clear()
+        self._large.clear()
+        self._items.clear()
+
+    def insert(self, key, payload, x0, y0, x1, y1):
+        if key in self._items:
+            self.remove(key)
+        bbox = (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+        self._items[key] = (bbox, payload)
+        self._place(key, bbox)
+
+    def insert_many(self, keys, payloads, boxes):
+        """
+        Массовая вставка новых ключей (открытие проекта): boxes - массив (n, 4)
+        рамок. Уровни всех рамок считаются векторно, а не перебором по одной
+        """
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        boxes = np.column_stack((np.minimum(boxes[:, 0], boxes[:, 2]), np.minimum(boxes[:, 1], boxes[:, 3]),
+                                 np.maximum(boxes[:, 0], boxes[:, 2]), np.maximum(boxes[:, 1], boxes[:, 3])))
+        keys = list(keys)
+        for key, payload, bbox in zip(keys, payloads, map(tuple, boxes.tolist())):
+            self._items[key] = (bbox, payload)
+        self._place_many(keys, boxes)
+
+    def remove(self, key):
+        entry = self._items.pop(key, None)
+        if entry is None:
+            return
+        level, cells = self._fit_level(entry[0])
+        if cells is None:
+            self._large.discard(key)
+            return
+        for cell in cells:
+            bucket = self._cells.get(cell)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._cells[cell]
+        self._levels[level] -= 1
+        if not self._levels[level]:
+            del self._levels[level]
+
+    def query(self, x0, y0, x1, y1):
+        """Данные объектов, чьи рамки могут пересекать прямоугольник (без точной проверки)"""
+        keys = set(self._large)
+        for level in self._levels:
+            cells = self._cell_range((x0, y0, x1, y1), level, self.max_cells_per_query)
+            if cells is None:
+                # Прямоугольник больше сетки - проще отдать всё
+                keys = self._items.keys()
+                break
+            for cell in cells:
+                bucket = self._cells.get(cell)
+                if bucket:
+                    keys.update(bucket)
+        return [self._items[key][1] for key in keys]
+
+    def query_radius(self, x, y, radius):
+        return self.query(x - radius, y - radius, x + radius, y + radius)
+
+    def fit_cell_size(self, size, max_ratio=4.0):
+        """Перестраивает сетку, если размер ячейки ушёл от size больше чем в max_ratio раз"""
+        if not size > 0 or not math.isfinite(size):
+            return
+        ratio = size / self.cell_size
+        if 1 / max_ratio <= ratio <= max_ratio:
+            return
+        self.cell_size = size
+        self._cells.clear()
+        self._levels.clear()
+        self._large.clear()
+        boxes = np.array([bbox for bbox, _ in self._items.values()], dtype=float).reshape(-1, 4)
+        self._place_many(list(self._items), boxes)
+
+    def _place(self, key, bbox):
+        level, cells = self._fit_level(bbox)
+        if cells is None:
+            self._large.add(key)
+            return
+        self._levels[level] = self._levels.get(level, 0) + 1
+        for cell in cells:
+            self._cells.setdefault(cell, set()).add(key)
+
+    def _place_many(self, keys, boxes):
+        """То же, что _place для каждого ключа, но уровни - одним проходом numpy"""
+        level_of = np.full(len(keys), -1)
+        cells = {}
+        with np.errstate(invalid='ignore', over='ignore'):
+            # Нечисловые и бесконечные рамки так и останутся на уровне -1 (в _large)
+            pending = np.flatnonzero(np.isfinite(boxes).all(axis=1))
+            for level in range(self.max_level + 1):
+                if not len(pending):
+                    break
+                size = self.cell_size * self.level_factor ** level
+                first = np.floor(boxes[pending, :2] / size)
+                last = np.floor(boxes[pending, 2:] / size)
+                spans = last - first + 1
+                fits = spans[:, 0] * spans[:, 1] <= self.max_cells_per_item
+                placed = pending[fits]
+                level_of[placed] = level
+                cells[level] = (placed, first[fits].astype(np.int64), last[fits].astype(np.int64))
+                pending = pending[~fits]
+
+        for index in np.flatnonzero(level_of < 0).tolist():
+            self._large.add(keys[index])
+        key_array = np.fromiter(keys, dtype=object, count=len(keys))
+        for level, (placed, first, last) in cells.items():
+            if not len(placed):
+                continue
+            self._levels[level] = self._levels.get(level, 0) + len(placed)
+            # Все пары (ячейка, объект) уровня строками...
+            rows = (last[:, 0] - first[:, 0] + 1)
+            cols = (last[:, 1] - first[:, 1] + 1)
+            per_item = rows * cols
+            item = np.repeat(np.arange(len(placed)), per_item)
+            step = np.arange(len(item)) - np.repeat(np.cumsum(per_item) - per_item, per_item)
+            cell_i = first[item, 0] + step // cols[item]
+            cell_j = first[item, 1] + step % cols[item]
+            # ...и по ячейкам: каждое ведро - одним set() вместо add() на каждый объект
+            order = np.lexsort((cell_j, cell_i))
+            cell_i, cell_j, members = cell_i[order], cell_j[order], key_array[placed[item[order]]]
+            starts = np.flatnonzero(np.r_[True, (cell_i[1:] != cell_i[:-1]) | (cell_j[1:] != cell_j[:-1])])
+            ends = np.r_[starts[1:], len(order)]
+            for i, j, start, end in zip(cell_i[starts].tolist(), cell_j[starts].tolist(),
+                                        starts.tolist(), ends.tolist()):
+                bucket = self._cells.get((level, i, j))
+                if bucket is None:
+                    self._cells[(level, i, j)] = set(members[start:end].tolist())
+                else:
+                    bucket.update(members[start:end].tolist())
+
+    def _fit_level(self, bbox):
+        """Самый мелкий уровень, на котором рамка задевает немного ячеек"""
+        if not all(map(math.isfinite, bbox)):
+            return None, None
+        for level in range(self.max_level + 1):
+            cells = self._cell_range(bbox, level)
+            if cells is not None:
+                return level, cells
+        return None, None
+
+    def _cell_range(self, bbox, level, limit=None):
+        """Ячейки уровня, которые задевает рамка, или None, если их больше limit"""
+        x0, y0, x1, y1 = bbox
+        size = self.cell_size * self.level_factor ** level
+        i0, j0 = math.floor(x0 / size), math.floor(y0 / size)
+        i1, j1 = math.floor(x1 / size), math.floor(y1 / size)
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > (limit or self.max_cells_per_item):
+            return None
+        return [(level, i, j) for i in range(i0, i1 + 1) for j in range(j0, j1 + 1)]
+
+
+class SnapIndex:
+    """
+    Кандидаты прилипания от фигур сцены: центры окружностей в сетке-хэше
+    и стороны линий и многоугольников колонками в SegmentStore (у него своя
+    сетка по рамкам, точная проверка - векторно по сторонам рядом с курсором).
+    Ключи - id объектов сцены (scene_model.SceneObject.id), стабильные при
+    удалении других объектов из списков холста.
+    Точки холста индекс не хранит: они сами лежат в PointStore
+    """
+
+    def __init__(self, cell_size=1.0):
+        self.centers = SpatialHash(cell_size)
+        self.sides = SegmentStore()
+
+    def clear(self):
+        self.centers.clear()
+        self.sides = SegmentStore()
+
+    def load(self, objects):
+        """Массовая загрузка (открытие проекта)"""
+        self.clear()
+        self.add_objects(objects)
+
+    def fit_cell_size(self, size):
+        self.centers.fit_cell_size(size)
+        self.sides.fit_cell_size(size)
+
+    # ========== ИЗМЕНЕНИЯ ==========
+
+    def add_objects(self, objects):
+        """Много новых фигур разом (открытие проекта): центры и стороны - одной вставкой"""
+        # Центры и стороны считаем пачками по классам (snap_centers_batch, snap_sides_batch)...
+        groups = {}
+        for index, obj in enumerate(objects):
+            groups.setdefault(type(obj), []).append(index)
+        sides, positions, counts = [], [], []
+        for cls, indices in groups.items():
+            group = [objects[index] for index in indices]
+            centers, center_counts = cls.snap_centers_batch(group)
+            if len(centers):
+                keys = [(obj.id, j) for obj, count in zip(group, center_counts) for j in range(count)]
+                self.centers.insert_many(keys, map(tuple, centers.tolist()), np.hstack((centers, centers)))
+            segments, group_counts = cls.snap_sides_batch(group)
+            if len(segments):
+                sides.append(segments)
+                positions += indices
+                counts += group_counts
+        if not sides:
+            return
+        segments = np.concatenate(sides)
+        positions = np.array(positions, dtype=np.int64)
+        counts = np.array(counts, dtype=np.int64)
+        if np.any(positions[1:] < positions[:-1]):
+            # ...и возвращаем в порядок фигур, как если бы добавляли их по одной
+            segments = segments[np.argsort(np.repeat(positions, counts), kind='stable')]
+            order = np.argsort(positions, kind='stable')
+            positions, counts = positions[order], counts[order]
+        present = np.flatnonzero(counts)
+        owners = [objects[index] for index in positions[present].tolist()]
+        self.sides.extend_many(segments, [obj.id for obj in owners],
+                               [obj.side_snap_type for obj in owners], counts[present])
+
+    def add_object(self, obj):
+        for j, (cx, cy) in enumerate(obj.snap_centers()):
+            self.centers.insert((obj.id, j), (cx, cy), cx, cy, cx, cy)
+        sides = obj.snap_sides()
+        if len(sides):
+            self.sides.extend(sides, obj.id, obj.side_snap_type)
+
+    def remove_object(self, obj):
+        for j in range(len(obj.snap_centers())):
+            self.centers.remove((obj.id, j))
+        if len(obj.snap_sides()):
+            self.sides.remove_owner(obj.id)
+
+    # ========== ЗАПРОСЫ ==========
+
+    def centers_near(self, x, y, radius):
+        return self.centers.query_radius(x, y, radius)
+
+
+class CullIndex:
+    """
+    Рамки фигур сцены (scene_model.SceneObject.bounds) для отсечения невидимого
+    при рисовании. Запрос по прямоугольнику экрана отдаёт фигуры, чьи рамки с
+    запасом в пикселях его задевают, в том порядке, в каком их добавляли
+    (порядок рисования сохраняется). Рамки лежат колонками в BoxStore с его
+    сеткой, поэтому массовая вставка и запрос векторные; бесконечные прямые
+    лежат вне сетки и попадают в ответ всегда
+    """
+
+    def __init__(self, cell_size=1.0):
+        self.boxes = BoxStore()
+        self.boxes.grid.cell_size = cell_size
+        # id рамки → фигура и id фигуры → id рамки
+        self._objects = {}
+        self._box_ids = {}
+
+    def __len__(self):
+        return len(self.boxes)
+
+    @property
+    def max_margin(self):
+        """Самый большой запас в пикселях среди фигур: на столько расширяется запрос"""
+        return self.boxes.max_margin
+
+    def clear(self):
+        self.boxes.clear()
+        self._objects.clear()
+        self._box_ids.clear()
+
+    def load(self, objects):
+        """Массовая загрузка (открытие проекта)"""
+        self.clear()
+        self.add_objects(objects)
+
+    def fit_cell_size(self, size):
+        self.boxes.fit_cell_size(size)
+
+    def add_objects(self, objects):
+        """Много новых фигур разом: рамки ложатся в колонки одной вставкой"""
+        if not objects:
+            return
+        ids = self.boxes.extend([obj.bounds() for obj in objects],
+                                [obj.pixel_margin() for obj in objects]).tolist()
+        self._objects.update(zip(ids, objects))
+        self._box_ids.update(zip([obj.id for obj in objects], ids))
+
+    def add_object(self, obj):
+        self.add_objects([obj])
+
+    def remove_object(self, obj):
+        box_id = self._box_ids.pop(obj.id, None)
+        if box_id is not None:
+            self.boxes.remove(box_id)
+            del self._objects[box_id]
+
+    def visible(self, x0, y0, x1, y1, pixel, pad=0):
+        """
+        Фигуры, задевающие прямоугольник мира (x0, y0, x1, y1)
+        pixel - размер экранного пикселя в единицах мира, pad - общий запас в пикселях
+        """
+        objects = self._objects
+        return [objects[box_id] for box_id in self.boxes.touching(x0, y0, x1, y1, pixel, pad).tolist()]
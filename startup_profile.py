@@ -0,0 +1,50 @@
+"""
+Профиль холодного старта
+Запуск с флагом --startup-profile печатает, сколько заняла каждая фаза:
+импорты, сборка окна, первый кадр, отложенная достройка интерфейса
+"""
+
+import sys
+import time
+
+
+STARTUP_PROFILE_FLAG = '--startup-profile'
+
+
+class StartupProfiler:
+    """Отметки времени по фазам запуска"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.phases = []
+        self.reported = False
+
+    @classmethod
+    def from_argv(cls, argv=None):
+        """Включается флагом командной строки; сам флаг убираем, чтобы его не увидел Qt"""
+        argv = sys.argv if argv is None else argv
+        enabled = STARTUP_PROFILE_FLAG in argv
+        while STARTUP_PROFILE_FLAG in argv:
+            argv.remove(STARTUP_PROFILE_FLAG)
+        return cls(enabled)
+
+    def mark(self, phase):
+        """Закрыть фазу: время с предыдущей отметки"""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def report(self):
+        """Печатает разбивку по фазам (один раз)"""
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+
+        total = self.last - self.start
+        print("\nStartup profile:")
+        for phase, seconds in self.phases:
+            share = seconds / total * 100 if total > 0 else 0.0
+            print(f"  {phase:<28} {seconds * 1000:8.1f} ms  {share:5.1f}%")
+        print(f"  {'total':<28} {total * 1000:8.1f} ms\n")
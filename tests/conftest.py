@@ -0,0 +1,6 @@
+"""Модули приложения лежат плоско в корне репозитория - добавляем его в sys.path"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
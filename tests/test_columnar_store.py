@@ -0,0 +1,167 @@
+"""Колоночные хранилища: id, надгробия, уплотнение и запросы через сетку"""
+
+import numpy as np
+import pytest
+
+from columnar_store import BoxStore, CellGrid, PointStore, SegmentStore
+
+
+def _brute_segment_distance(store_rows, x, y):
+    x1, y1, x2, y2 = store_rows
+    dx, dy = x2 - x1, y2 - y1
+    length2 = dx * dx + dy * dy
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = np.clip(np.where(length2 > 0, ((x - x1) * dx + (y - y1) * dy) / length2, 0.0), 0, 1)
+    return np.hypot(x1 + t * dx - x, y1 + t * dy - y)
+
+
+def test_ids_are_stable_and_grow_with_rows():
+    store = PointStore(capacity=2)
+    first = store.append(1.0, 2.0)
+    ids = store.extend([3.0, 5.0, 7.0], [4.0, 6.0, 8.0])
+    assert ids.tolist() == [first + 1, first + 2, first + 3]
+    assert store.capacity >= 4
+    assert store.position(int(ids[1])) == (5.0, 6.0)
+    assert len(store) == 4
+
+
+def test_removed_point_leaves_a_tombstone():
+    store = PointStore()
+    ids = store.extend([0.0, 1.0, 2.0], [0.0, 0.0, 0.0]).tolist()
+    assert store.remove(ids[1])
+    assert not store.remove(ids[1])
+    assert store.position(ids[1]) is None
+    assert store.row_of(ids[1]) is None
+    xs, _, live_ids = store.positions()
+    assert xs.tolist() == [0.0, 2.0] and live_ids.tolist() == [ids[0], ids[2]]
+    # Новые id не переиспользуют удалённые
+    assert store.append(3.0, 0.0) > ids[2]
+
+
+def test_compaction_keeps_order_and_ids():
+    store = PointStore()
+    ids = store.extend(np.arange(200.0), np.zeros(200)).tolist()
+    for point_id in ids[::3] + ids[1::3]:
+        store.remove(point_id)
+    # Мёртвых стало больше половины - строки уплотнялись по дороге
+    assert store.size < len(ids)
+    assert store.count == len(ids[2::3])
+    xs, _, live_ids = store.positions()
+    assert live_ids.tolist() == ids[2::3]
+    assert xs.tolist() == [float(i) for i in range(2, 200, 3)]
+    assert all(store.position(point_id) == (float(ids.index(point_id)), 0.0) for point_id in ids[2::3])
+
+
+def test_within_matches_brute_force():
+    rng = np.random.default_rng(0)
+    store = PointStore()
+    xs, ys = rng.uniform(-100, 100, 5000), rng.uniform(-100, 100, 5000)
+    ids = store.extend(xs, ys)
+    for point_id in ids[::7].tolist():
+        store.remove(point_id)
+    store.fit_cell_size(2.0)
+    alive = np.ones(len(ids), dtype=bool)
+    alive[::7] = False
+    for x, y, radius in rng.uniform((-100, -100, 0), (100, 100, 5), (50, 3)):
+        found, fx, fy, distances = store.within(x, y, radius)
+        expected = ids[alive & ((xs - x) ** 2 + (ys - y) ** 2 < radius * radius)]
+        assert found.tolist() == expected.tolist()
+        np.testing.assert_allclose(distances, np.hypot(fx - x, fy - y))
+        assert store.any_within(x, y, radius) == bool(len(expected))
+
+
+def test_points_added_after_the_grid_was_built_are_found():
+    store = PointStore()
+    store.extend(np.arange(100.0), np.zeros(100))
+    assert store.within(50.0, 0.0, 0.5)[0].size == 1
+    new_id = store.append(50.2, 0.1)
+    assert new_id in store.within(50.0, 0.0, 0.5)[0].tolist()
+    # Огромный радиус минует сетку и проверяет всё
+    assert len(store.within(0.0, 0.0, 1e6)[0]) == 101
+
+
+def test_nearest_point():
+    store = PointStore()
+    assert store.nearest(0, 0) is None
+    ids = store.extend([1.0, -3.0, 4.0], [1.0, 0.0, 4.0])
+    point_id, distance = store.nearest(-2.5, 0.0)
+    assert point_id == ids[1] and distance == pytest.approx(0.5)
+
+
+def test_segments_owners_and_kinds():
+    store = SegmentStore()
+    store.extend([(0, 0, 1, 0), (1, 0, 1, 1)], owner=7, kind='polygon_point')
+    store.extend_many([(5, 5, 6, 6), (0, 2, 2, 2), (2, 2, 2, 0)], [8, 9], ['line_point', 'polygon_point'], [1, 2])
+    assert store.owner[:store.size].tolist() == [7, 7, 8, 9, 9]
+    assert [store.kinds[code] for code in store.kind[:store.size]] == [
+        'polygon_point', 'polygon_point', 'line_point', 'polygon_point', 'polygon_point']
+    assert store.remove_owner(9) == 2
+    assert store.remove_owner(9) == 0
+    assert len(store) == 3
+
+
+def test_closest_matches_brute_force():
+    rng = np.random.default_rng(1)
+    store = SegmentStore()
+    starts = rng.uniform(-50, 50, (3000, 2))
+    ends = starts + rng.normal(0, 3, (3000, 2))
+    # Несколько длинных отрезков через всю сцену ложатся на верхние уровни сетки
+    ends[:10] = starts[:10] + rng.uniform(-500, 500, (10, 2))
+    segments = np.hstack((starts, ends))
+    store.extend_many(segments, list(range(3000)), ['line_point'] * 3000, [1] * 3000)
+    for owner in range(0, 3000, 5):
+        store.remove_owner(owner)
+    store.fit_cell_size(1.0)
+    alive = np.arange(3000) % 5 != 0
+    for x, y in rng.uniform(-60, 60, (50, 2)):
+        cx, cy, distances, kinds = store.closest(x, y, 1.5)
+        expected = _brute_segment_distance(segments[alive].T, x, y)
+        expected = expected[expected < 1.5]
+        np.testing.assert_allclose(distances, expected)
+        assert kinds == ['line_point'] * len(expected)
+        np.testing.assert_allclose(np.hypot(cx - x, cy - y), distances)
+
+
+def test_grid_candidates_cover_all_touching_boxes():
+    rng = np.random.default_rng(2)
+    grid = CellGrid(cell_size=1.0)
+    lo = rng.uniform(-100, 100, (4000, 2))
+    boxes = np.hstack((lo, lo + rng.exponential(2, (4000, 2))))
+    boxes[:3] = (-np.inf, -np.inf, np.inf, np.inf)
+    ids = np.arange(len(boxes)) + 1
+    # Часть добавлений остаётся в хвосте без слияния
+    grid.add(ids[:3500], boxes[:3500])
+    grid.add(ids[3500:], boxes[3500:])
+    for x0, y0 in rng.uniform(-100, 100, (50, 2)):
+        x1, y1 = x0 + 3, y0 + 2
+        touching = ids[(boxes[:, 0] <= x1) & (boxes[:, 2] >= x0) & (boxes[:, 1] <= y1) & (boxes[:, 3] >= y0)]
+        assert set(touching.tolist()) <= set(grid.candidates(x0, y0, x1, y1).tolist())
+    # Прямоугольник крупнее max_cells_per_query ячеек - сетка отказывается
+    grid_small = CellGrid(cell_size=1.0, max_cells_per_query=4)
+    grid_small.add([1], [(0, 0, 0.5, 0.5)])
+    assert grid_small.candidates(0, 0, 100, 100) is None
+
+
+def test_box_store_touching_matches_brute_force():
+    rng = np.random.default_rng(3)
+    store = BoxStore()
+    lo = rng.uniform(-100, 100, (3000, 2))
+    boxes = np.hstack((lo, lo + rng.exponential(1, (3000, 2))))
+    # Бесконечные рамки - как у прямых
+    boxes[::500] = (-np.inf, -np.inf, np.inf, np.inf)
+    margins = rng.choice([2.0, 5.0], 3000)
+    ids = store.extend(boxes, margins)
+    for box_id in ids[1::9].tolist():
+        store.remove(box_id)
+    alive = np.ones(3000, dtype=bool)
+    alive[1::9] = False
+    assert store.max_margin == 5.0
+    store.fit_cell_size(20.0)
+
+    pixel, pad = 0.1, 1.0
+    for x0, y0 in rng.uniform(-100, 100, (30, 2)):
+        x1, y1 = x0 + 20, y0 + 15
+        grow = (margins + pad) * pixel
+        touching = (alive & (boxes[:, 0] - grow <= x1) & (boxes[:, 2] + grow >= x0)
+                    & (boxes[:, 1] - grow <= y1) & (boxes[:, 3] + grow >= y0))
+        assert store.touching(x0, y0, x1, y1, pixel, pad).tolist() == ids[touching].tolist()
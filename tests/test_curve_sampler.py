@@ -0,0 +1,82 @@
+"""M4-прореживание кривой по столбцам пикселей"""
+
+import numpy as np
+
+from curve_sampler import decimate_columns
+
+
+def _columns(screen_x, device_pixel_ratio=1.0):
+    return np.floor(screen_x * device_pixel_ratio).astype(np.int64)
+
+
+def _smooth_curve():
+    # Тысяча точек на столбец, кривая поворачивает редко - полос нет
+    screen_x = np.linspace(0, 50, 50001)
+    return screen_x, 100 * np.sin(screen_x / 10)
+
+
+def _noisy_curve():
+    # Справа - шум гуще пикселя, слева - гладкий участок
+    rng = np.random.default_rng(0)
+    screen_x = np.linspace(0, 60, 60000, endpoint=False)
+    screen_y = 50 + screen_x
+    noisy = screen_x >= 30
+    screen_y[noisy] += rng.normal(0, 20, noisy.sum())
+    return screen_x, screen_y
+
+
+def test_sparse_curve_is_returned_as_is():
+    screen_x = np.linspace(0, 100, 50)
+    pieces = decimate_columns(screen_x, np.sin(screen_x))
+    assert len(pieces) == 1
+    kind, indices = pieces[0]
+    assert kind == 'polyline'
+    assert indices.tolist() == list(range(50))
+
+
+def test_at_most_four_points_per_column():
+    screen_x, screen_y = _smooth_curve()
+    pieces = decimate_columns(screen_x, screen_y)
+    assert [kind for kind, *_ in pieces] == ['polyline']
+    _, counts = np.unique(_columns(screen_x[pieces[0][1]]), return_counts=True)
+    assert counts.max() <= 4
+
+
+def test_first_last_min_and_max_of_each_column_are_kept():
+    screen_x, screen_y = _smooth_curve()
+    picked = set(decimate_columns(screen_x, screen_y)[0][1].tolist())
+    columns = _columns(screen_x)
+    for column in np.unique(columns):
+        members = np.flatnonzero(columns == column)
+        ys = screen_y[members]
+        assert members[0] in picked
+        assert members[-1] in picked
+        assert members[np.argmin(ys)] in picked
+        assert members[np.argmax(ys)] in picked
+
+
+def test_high_dpi_columns_are_physical_pixels():
+    screen_x, screen_y = _smooth_curve()
+    pieces = decimate_columns(screen_x, screen_y, device_pixel_ratio=2.0)
+    _, counts = np.unique(_columns(screen_x[pieces[0][1]], 2.0), return_counts=True)
+    assert counts.max() <= 4
+    # Столбцов вдвое больше, чем логических пикселей
+    assert len(counts) == 101
+
+
+def test_bands_cover_the_polyline_extent():
+    screen_x, screen_y = _noisy_curve()
+    pieces = decimate_columns(screen_x, screen_y)
+    kinds = [kind for kind, *_ in pieces]
+    assert kinds == ['polyline', 'band']
+
+    _, band_x, highs, lows = pieces[1]
+    assert band_x[0] <= 30 and band_x[-1] >= screen_x[-1]
+    columns = _columns(screen_x)
+    for left, high, low in zip(band_x[::2], highs[::2], lows[::2]):
+        ys = screen_y[columns == int(left)]
+        assert low <= ys.min() and high >= ys.max()
+
+    # Ломаная доходит до полосы: её последняя точка - первая точка полосы
+    indices = pieces[0][1]
+    assert screen_x[indices[-1]] >= band_x[0]
@@ -0,0 +1,87 @@
+"""Кэш скомпилированных выражений: LRU в памяти и безопасный кэш на диске"""
+
+import json
+
+import numpy as np
+
+from expression_cache import CompiledExpressionCache
+from expression_compiler import CompiledExpression
+
+X = np.linspace(-3, 3, 13)
+
+
+def test_compiler_path_and_memory_hits():
+    cache = CompiledExpressionCache()
+    expr, func = cache.get('x^2 + 1')
+    assert isinstance(expr, CompiledExpression)
+    np.testing.assert_allclose(func(X), X ** 2 + 1)
+
+    # Пробелы по краям - тот же ключ
+    assert cache.get('  x^2 + 1 ') == (expr, func)
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'disk_hits': 0, 'sympy_compiles': 0, 'entries': 1}
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = CompiledExpressionCache(max_entries=2)
+    cache.get('x')
+    cache.get('2x')
+    cache.get('x')
+    cache.get('3x')
+    assert list(cache._entries) == ['x', '3x']
+
+
+def test_sympy_fallback_is_saved_for_the_compiler(tmp_path):
+    disk = tmp_path / 'cache' / 'expressions.json'
+    cache = CompiledExpressionCache(disk_path=disk)
+    _, func = cache.get('sin x')
+    np.testing.assert_allclose(func(X), np.sin(X))
+    assert cache.sympy_compiles == 1
+    # На диске - не код, а текст в грамматике компилятора
+    assert json.loads(disk.read_text(encoding='utf-8')) == {'sin x': 'sin(x)'}
+
+    reopened = CompiledExpressionCache(disk_path=disk)
+    expr, func = reopened.get('sin x')
+    assert isinstance(expr, CompiledExpression)
+    np.testing.assert_allclose(func(X), np.sin(X))
+    assert reopened.disk_hits == 1 and reopened.sympy_compiles == 0
+
+
+def test_outside_the_grammar_stays_off_disk(tmp_path):
+    disk = tmp_path / 'expressions.json'
+    cache = CompiledExpressionCache(disk_path=disk)
+    _, func = cache.get('sinh(x)')
+    np.testing.assert_allclose(func(X), np.sinh(X))
+    assert not disk.exists()
+
+
+def test_constant_sympy_expression_keeps_the_shape():
+    _, func = CompiledExpressionCache().get('exp(1)')
+    np.testing.assert_allclose(func(X), np.full(X.shape, np.e))
+
+
+def test_tampered_disk_file_is_never_executed(tmp_path):
+    disk = tmp_path / 'expressions.json'
+    marker = tmp_path / 'pwned'
+    payload = f'__import__("pathlib").Path({str(marker)!r}).touch() or sin(x)'
+    disk.write_text(json.dumps({'sin x': payload}), encoding='utf-8')
+    cache = CompiledExpressionCache(disk_path=disk)
+    _, func = cache.get('sin x')
+    # Запись не разобралась компилятором - выражение честно считается через sympy
+    np.testing.assert_allclose(func(X), np.sin(X))
+    assert cache.disk_hits == 0 and cache.sympy_compiles == 1
+    assert not marker.exists()
+
+
+def test_broken_disk_file_is_ignored(tmp_path):
+    disk = tmp_path / 'expressions.json'
+    for text in ('not json', '["sin(x)"]'):
+        disk.write_text(text, encoding='utf-8')
+        cache = CompiledExpressionCache(disk_path=disk)
+        _, func = cache.get('sin x')
+        np.testing.assert_allclose(func(X), np.sin(X))
+
+
+def test_preload_sympy_runs_in_background():
+    thread = CompiledExpressionCache().preload_sympy()
+    thread.join(timeout=30)
+    assert not thread.is_alive()
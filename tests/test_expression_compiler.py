@@ -0,0 +1,89 @@
+"""Лёгкий компилятор выражений: разбор, свёртка констант и сверка значений с sympy"""
+
+import numpy as np
+import pytest
+
+from expression_compiler import UnsupportedExpression, compile_expression, tokenize
+
+
+def test_tokenize_numbers_names_and_operators():
+    assert tokenize('2.5x^2') == [('number', 2.5), ('name', 'x'), ('op', '^'), ('number', 2.0)]
+    assert tokenize(' 1e-3 * .5 ') == [('number', 1e-3), ('op', '*'), ('number', 0.5)]
+
+
+def test_tokenize_double_star_is_power():
+    assert tokenize('x**3') == [('name', 'x'), ('op', '^'), ('number', 3.0)]
+
+
+def test_tokenize_rejects_unknown_symbol():
+    with pytest.raises(UnsupportedExpression):
+        tokenize('x % 2')
+
+
+@pytest.mark.parametrize('text', ['', '   ', '(x', 'x +', 'sin x', 'foo(x)', 'x )', '*x'])
+def test_parser_rejects_malformed_input(text):
+    with pytest.raises(UnsupportedExpression):
+        compile_expression(text)
+
+
+def test_constants_fold_into_single_value():
+    compiled = compile_expression('2 * pi + sqrt(16) - 3^2')
+    assert compiled.is_constant()
+    assert compiled.program == []
+    assert compiled(0.0) == pytest.approx(2 * np.pi + 4 - 9)
+
+
+def test_constant_broadcasts_to_input_shape():
+    result = compile_expression('-(1 + 1)')(np.zeros(5))
+    assert result.shape == (5,)
+    assert np.all(result == -2)
+
+
+@pytest.mark.parametrize('text', ['x * 1', '1 * x', 'x + 0', '0 + x', 'x - 0', 'x / 1', 'x ^ 1', '(x)'])
+def test_identities_reduce_to_x(text):
+    assert compile_expression(text).tree == ('x',)
+
+
+def test_common_subexpressions_are_computed_once():
+    compiled = compile_expression('sin(x) + sin(x) * sin(x)')
+    assert [op for op, _ in compiled.program] == ['sin', 'mul', 'add']
+
+
+def test_power_is_right_associative_and_takes_a_sign():
+    assert compile_expression('2^x^2')(np.array([2.0]))[0] == pytest.approx(16.0)
+    assert compile_expression('x^-1')(np.array([4.0]))[0] == pytest.approx(0.25)
+    assert compile_expression('-x^2')(np.array([3.0]))[0] == pytest.approx(-9.0)
+
+
+@pytest.mark.parametrize('text', [
+    'x^2 - 3x + 1',
+    '2(x + 1)^3',
+    'sin(x) / x',
+    'x sin(x)',
+    'sqrt(abs(x)) - cos(2x)',
+    'tan(x) + cot(x)',
+    'ctg(x / 2)',
+    '1 / (x^2 - 4)',
+    '-x^3 + pi x',
+    '2^x^2 / 100',
+    'sqrt(x - 1)',
+])
+def test_values_match_sympy(text):
+    sympy = pytest.importorskip('sympy')
+    from sympy.parsing.sympy_parser import (
+        parse_expr, standard_transformations, convert_xor, implicit_multiplication_application
+    )
+
+    x = sympy.symbols('x')
+    # Те же правила разбора, что у запасного пути в expression_cache.py
+    transformations = standard_transformations + (convert_xor, implicit_multiplication_application)
+    expected_func = sympy.lambdify(x, parse_expr(text, local_dict={'x': x, 'ctg': sympy.cot},
+                                                 transformations=transformations), 'numpy')
+
+    xs = np.linspace(-5, 5, 1001)
+    with np.errstate(all='ignore'):
+        expected = np.broadcast_to(np.asarray(expected_func(xs), dtype=complex), xs.shape)
+    # sympy отдаёт комплексные значения там, где numpy - nan
+    expected = np.where(np.abs(expected.imag) > 0, np.nan, expected.real)
+    actual = compile_expression(text)(xs)
+    np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-9, equal_nan=True)
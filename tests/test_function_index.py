@@ -0,0 +1,90 @@
+"""Индексы пересечений графиков и корней: смена знака и векторная бисекция"""
+
+import numpy as np
+import pytest
+
+from expression_compiler import compile_expression
+from function_index import AxisTable, IntersectionIndex, bisect_roots, find_roots, sign_changes
+
+
+def _functions(*texts, hidden=()):
+    return [{'func': compile_expression(text), 'visible': i not in hidden} for i, text in enumerate(texts)]
+
+
+def test_sign_changes_reports_zeros_and_brackets():
+    zeros, brackets = sign_changes(np.array([1.0, 0.0, -1.0, -2.0, 3.0, np.nan, -1.0]))
+    assert zeros.tolist() == [1]
+    # Через nan смену знака не засчитываем
+    assert brackets.tolist() == [3]
+
+
+def test_bisection_converges_to_machine_precision():
+    func = compile_expression('x^2 - 2')
+    roots, genuine = bisect_roots(func, np.array([1.0, -2.0]), np.array([2.0, -1.0]),
+                                  func(np.array([1.0, -2.0])), func(np.array([2.0, -1.0])))
+    assert genuine.all()
+    np.testing.assert_allclose(roots, [np.sqrt(2), -np.sqrt(2)], rtol=0, atol=1e-14)
+
+
+def test_sign_change_through_a_pole_is_not_a_root():
+    func = compile_expression('1 / x')
+    _, genuine = bisect_roots(func, np.array([-1.0]), np.array([1.0]), np.array([-1.0]), np.array([1.0]))
+    assert not genuine.any()
+
+
+def test_find_roots_of_sine():
+    roots = find_roots(compile_expression('sin(x)'), -10, 10, 257)
+    np.testing.assert_allclose(roots, np.arange(-3, 4) * np.pi, atol=1e-12)
+
+
+def test_intersections_of_two_graphs_are_exact():
+    index = IntersectionIndex()
+    index.update(_functions('x^2', 'x + 2'), revision=1, left=-5, right=5, scale=50)
+    order = np.argsort(index.xs)
+    np.testing.assert_allclose(index.xs[order], [-1, 2], atol=1e-12)
+    np.testing.assert_allclose(index.ys[order], [1, 4], atol=1e-12)
+
+
+def test_every_pair_is_intersected_and_hidden_functions_are_skipped():
+    index = IntersectionIndex()
+    index.update(_functions('x', '-x', 'x - 1', hidden={2}), revision=1, left=-5, right=5, scale=50)
+    np.testing.assert_allclose(index.xs, [0.0], atol=1e-12)
+
+    index.update(_functions('x', '-x', 'sin(x) + 3'), revision=2, left=-5, right=5, scale=50)
+    # x и -x пересекают sin(x) + 3 по разу, а друг друга - в нуле
+    assert len(index.xs) == 3
+    funcs = [compile_expression(text) for text in ('x', '-x', 'sin(x) + 3')]
+    for x, y in zip(index.xs, index.ys):
+        assert sum(abs(func(np.array([x]))[0] - y) < 1e-9 for func in funcs) == 2
+
+
+def test_near_returns_points_within_radius():
+    index = IntersectionIndex()
+    index.update(_functions('x^2', 'x + 2'), revision=1, left=-5, right=5, scale=50)
+    (x, y, distance), = index.near(2.05, 4.0, 0.1)
+    assert (x, y) == pytest.approx((2.0, 4.0))
+    assert distance == pytest.approx(0.05)
+    assert index.near(0.0, 0.0, 0.5) == []
+
+
+def test_window_is_reused_until_the_view_leaves_it():
+    index = IntersectionIndex()
+    functions = _functions('x', '-x')
+    index.update(functions, revision=1, left=-5, right=5, scale=50)
+    window = index._window
+    # Сдвиг в пределах окна и небольшой зум - без пересчёта
+    index.update(functions, revision=1, left=-4, right=6, scale=70)
+    assert index._window is window
+    # Новая ревизия набора функций или сильный зум - пересчёт
+    index.update(functions, revision=2, left=-4, right=6, scale=70)
+    assert index._window is not window
+    window = index._window
+    index.update(functions, revision=2, left=-4, right=6, scale=500)
+    assert index._window is not window
+
+
+def test_axis_table_has_roots_and_y_intercept():
+    table = AxisTable(compile_expression('x^2 - 4'))
+    table.update(-5, 5, 50)
+    points = sorted(zip(table.xs.tolist(), table.ys.tolist()))
+    assert points == [pytest.approx((-2, 0)), pytest.approx((0, -4)), pytest.approx((2, 0))]
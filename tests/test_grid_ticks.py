@@ -0,0 +1,42 @@
+"""Шаг сетки 1-2-5 и подписи делений"""
+
+import pytest
+
+from grid_ticks import MIN_GRID_PIXELS, grid_step, nice_step, tick_indices, tick_text
+
+
+@pytest.mark.parametrize('min_step, step', [
+    (1, 1), (1.01, 2), (2, 2), (2.5, 5), (5, 5), (5.01, 10), (7, 10),
+    (0.3, 0.5), (0.12, 0.2), (0.001, 0.001), (420, 500), (1e-7, 1e-7),
+])
+def test_nice_step_is_the_smallest_1_2_5_step(min_step, step):
+    assert nice_step(min_step) == pytest.approx(step)
+
+
+def test_nice_step_tolerates_rounding_noise():
+    # 0.1 * 3 = 0.30000000000000004 - шаг остаётся 0.5, а 0.2 * 5 не уводит в 2
+    assert nice_step(0.1 * 3) == pytest.approx(0.5)
+    assert nice_step(0.2 * 5) == pytest.approx(1)
+
+
+@pytest.mark.parametrize('grid_size', [0.01, 0.7, 3, 25, 49.9, 50, 333, 1e5])
+def test_grid_lines_are_at_least_min_pixels_apart(grid_size):
+    step = grid_step(grid_size)
+    assert step * grid_size >= MIN_GRID_PIXELS * (1 - 1e-9)
+    # Следующий шаг вниз по ряду 1-2-5 был бы уже слишком густым
+    assert step * grid_size < MIN_GRID_PIXELS * 2.5
+
+
+def test_tick_indices_cover_the_range():
+    indices = tick_indices(-1.3, 2.1, 0.5)
+    assert indices.tolist() == [-3, -2, -1, 0, 1, 2, 3, 4, 5]
+    assert indices[0] * 0.5 <= -1.3 and indices[-1] * 0.5 >= 2.1
+
+
+@pytest.mark.parametrize('index, step, text', [
+    (3, 1, '3'), (-4, 5, '-20'), (0, 0.1, '0'), (3, 0.1, '0.3'),
+    (7, 0.2, '1.4'), (10, 0.5, '5'), (3, 0.05, '0.15'), (1, 1e-4, '0.0001'),
+    (12, 1000, '12000'),
+])
+def test_tick_text_has_no_float_noise(index, step, text):
+    assert tick_text(index, step) == text
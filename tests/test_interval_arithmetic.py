@@ -0,0 +1,91 @@
+"""Интервальная арифметика и адаптивный семплер в интервальном режиме"""
+
+import numpy as np
+import pytest
+
+from curve_sampler import AdaptiveSampler
+from expression_compiler import compile_expression
+from interval_arithmetic import enclose, interval_function
+
+
+EXPRESSIONS = [
+    'x^2 - 3x + 1',
+    'x^3 - x',
+    'sin(x) + cos(2x)',
+    'x sin(x)',
+    'sqrt(abs(x)) - 1',
+    'abs(x - 1) * x',
+    '1 / (1 + x^2)',
+    '2^x',
+    'x^-2',
+    'tan(x)',
+    'cot(x)',
+    '1 / x',
+    'sqrt(x - 1)',
+]
+
+
+@pytest.mark.parametrize('text', EXPRESSIONS)
+def test_bounds_contain_every_value(text):
+    compiled = compile_expression(text)
+    rng = np.random.default_rng(0)
+    x0 = rng.uniform(-6, 6, 200)
+    x1 = x0 + rng.uniform(0, 2, 200)
+    bounds = enclose(compiled, x0, x1)
+
+    t = np.linspace(0, 1, 101)
+    xs = x0[:, None] + (x1 - x0)[:, None] * t
+    ys = compiled(xs)
+    finite = np.isfinite(ys)
+    slack = 1e-9 * (1 + np.abs(ys))
+    assert np.all(~finite | (ys >= bounds.lo[:, None] - slack))
+    assert np.all(~finite | (ys <= bounds.hi[:, None] + slack))
+    # Непрерывность обещана - значит, на отрезке нет ни полюсов, ни nan
+    assert np.all(finite[bounds.continuous])
+
+
+def test_pole_and_domain_edge_are_not_continuous():
+    bounds = enclose(compile_expression('1 / x'), [-1.0, 0.5], [1.0, 2.0])
+    assert bounds.continuous.tolist() == [False, True]
+    assert bounds.lo[0] == -np.inf and bounds.hi[0] == np.inf
+
+    bounds = enclose(compile_expression('sqrt(x)'), [-1.0, 1.0], [-0.5, 4.0])
+    assert bounds.continuous.tolist() == [False, True]
+    assert bounds.lo[1] == pytest.approx(1.0) and bounds.hi[1] == pytest.approx(2.0)
+
+
+def test_periodic_functions_reach_their_peaks():
+    bounds = enclose(compile_expression('sin(x)'), [0.0, 0.1], [np.pi, 0.2])
+    assert bounds.hi[0] == pytest.approx(1.0)
+    assert bounds.lo[0] == pytest.approx(0.0, abs=1e-12)
+    assert bounds.hi[1] == pytest.approx(np.sin(0.2))
+
+
+def test_interval_function_only_for_compiled_non_constants():
+    assert interval_function(compile_expression('x^2')) is not None
+    assert interval_function(compile_expression('2 + 3')) is None
+    assert interval_function(np.sin) is None
+
+
+def test_overestimated_expression_does_not_burn_the_budget():
+    # x*x - x*x тождественно 0, но интервальная оценка - [-h, h]
+    sampler = AdaptiveSampler()
+    xs, ys = sampler.sample(compile_expression('x*x - x*x'), -10, 10, 50, 1000)
+    assert len(xs) < sampler.sample_budget(1000) // 4
+    assert np.all(ys == 0)
+
+
+@pytest.mark.parametrize('center', [-7.31, -0.3137, 2.71, 5.5])
+def test_narrow_peak_between_grid_points_is_found(center):
+    # Пик шириной меньше пикселя: на начальную сетку он не попадает
+    func = compile_expression(f'1 / (1 + 10000 (x - {center})^2)')
+    xs, ys = AdaptiveSampler().sample(func, -10, 10, 50, 1000)
+    assert np.nanmax(ys) > 0.9
+
+
+def test_poles_are_cut_with_nan():
+    xs, ys = AdaptiveSampler().sample(compile_expression('tan(x)'), -4, 4, 50, 400)
+    # По разрыву на каждой асимптоте: -п/2 и п/2
+    for pole in (-np.pi / 2, np.pi / 2):
+        near = np.abs(xs - pole) < 0.05
+        assert np.isnan(ys[near]).any()
@@ -0,0 +1,112 @@
+"""Двоичный формат проекта .igp: сохранение и открытие туда и обратно"""
+
+import numpy as np
+import pytest
+
+import project_binary
+from project_binary import ProjectFormatError, load_project, save_project
+from scene_model import Angle, Circle, Line, Point, Polygon, Text
+
+
+META = {'version': '1.0', 'camera': {'zoom': 2.0, 'offset_x': 10.0, 'offset_y': -3.0},
+        'functions': {'0': {'text': 'x^2', 'visible': False}}}
+
+
+def _scene():
+    return [
+        Line((0, 0, 1, 1)),
+        Polygon([(0, 0), (2, 0), (1, 3)]),
+        Text((1, 2), 'подпись', 14),
+        Line((5, 5, -3, 2), infinite=True),
+        Polygon([]),
+        Circle((1, 1), 2.5),
+        Point((4, -4)),
+        Angle((0, 0), (1, 0), (0, 1), 90.0),
+        Polygon([(4, 4), (5, 5), (4, 6), (3, 5)]),
+    ]
+
+
+def test_round_trip_keeps_every_figure_in_order(tmp_path):
+    path = str(tmp_path / 'scene.igp')
+    objects = _scene()
+    save_project(path, META, objects, [1.5, -2.0], [3.0, 4.0])
+
+    meta, loaded, xs, ys = load_project(path)
+    assert meta == META
+    assert [obj.to_dict() for obj in loaded] == [obj.to_dict() for obj in objects]
+    assert [obj.bounds() for obj in loaded] == [obj.bounds() for obj in objects]
+    assert xs.tolist() == [1.5, -2.0] and ys.tolist() == [3.0, 4.0]
+    # Новые объекты - новые id
+    assert not {obj.id for obj in loaded} & {obj.id for obj in objects}
+
+
+def test_empty_scene(tmp_path):
+    path = str(tmp_path / 'empty.igp')
+    save_project(path, {}, [], [], [])
+    assert load_project(path)[1:2] == ([],)
+
+
+def test_vertices_stay_in_the_mapped_columns_until_asked(tmp_path):
+    path = str(tmp_path / 'lazy.igp')
+    save_project(path, {}, [Polygon([(0, 0), (1, 0), (1, 1)]), Line((0, 0, 2, 3))], [], [])
+    polygon, line = load_project(path)[1]
+    assert polygon._points is None and line._points is None
+    assert polygon.bounds() == (0.0, 0.0, 1.0, 1.0) and line.bounds() == (0.0, 0.0, 2.0, 3.0)
+    assert polygon._points is None and line._points is None
+    assert polygon.points == [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0)]
+    assert line.points == (0.0, 0.0, 2.0, 3.0)
+
+
+def test_batch_paths_mix_loaded_and_new_figures(tmp_path):
+    path = str(tmp_path / 'mixed.igp')
+    save_project(path, {}, _scene(), [], [])
+    loaded = load_project(path)[1]
+    for cls in (Line, Polygon):
+        group = [obj for obj in loaded if type(obj) is cls] + [obj for obj in _scene() if type(obj) is cls]
+        sides, counts = cls.snap_sides_batch(group)
+        expected = [np.asarray(obj.snap_sides(), dtype=float).reshape(-1, 4) for obj in group]
+        np.testing.assert_array_equal(sides, np.concatenate(expected))
+        assert list(counts) == [len(obj_sides) for obj_sides in expected]
+
+
+def test_save_over_the_file_it_was_opened_from(tmp_path):
+    path = str(tmp_path / 'same.igp')
+    save_project(path, META, _scene(), [1.0], [2.0])
+    meta, loaded, xs, ys = load_project(path)
+    expected = [obj.to_dict() for obj in loaded]
+
+    loaded.append(Polygon([(9, 9), (10, 9), (10, 10)]))
+    save_project(path, meta, loaded, xs, ys)
+    # Открытые фигуры перешли на копию вершин, отображение файла им не нужно
+    assert not any(isinstance(getattr(obj, '_columns', None), np.memmap) for obj in loaded)
+    assert [obj.to_dict() for obj in loaded[:-1]] == expected
+
+    reloaded = load_project(path)[1]
+    assert [obj.to_dict() for obj in reloaded] == [obj.to_dict() for obj in loaded]
+    assert not (tmp_path / 'same.igp.tmp').exists()
+
+
+def test_not_a_project(tmp_path):
+    path = tmp_path / 'text.igp'
+    path.write_text('{"objects": []}')
+    with pytest.raises(ProjectFormatError):
+        load_project(str(path))
+
+
+def test_truncated_file(tmp_path):
+    path = tmp_path / 'cut.igp'
+    save_project(str(path), {}, [Polygon([(0, 0), (1, 0), (1, 1)])] * 100, [], [])
+    data = path.read_bytes()
+    path.write_bytes(data[:len(data) - project_binary.ALIGNMENT - 800])
+    with pytest.raises(ProjectFormatError):
+        load_project(str(path))
+
+
+def test_pathlib_paths(tmp_path):
+    # Холст передаёт DATA_DIR / имя - pathlib.Path, а не строку
+    path = tmp_path / 'path.igp'
+    save_project(path, META, _scene(), [1.0], [2.0])
+    meta, loaded, xs, ys = load_project(path)
+    assert meta == META and len(loaded) == len(_scene())
+    save_project(path, meta, loaded, xs, ys)
+    assert [obj.to_dict() for obj in load_project(path)[1]] == [obj.to_dict() for obj in _scene()]
@@ -0,0 +1,108 @@
+"""Потоковый разбор JSON-проекта: те же значения, что у json.loads, при любом размере блока"""
+
+import codecs
+import io
+import json
+import time
+
+import pytest
+
+from project_loader import ProjectLoader, _iter_project, _JsonStream
+
+
+PROJECT = {
+    'version': '1.0',
+    'camera': {'zoom': 1.5, 'offset_x': -12.25, 'offset_y': 3e-7},
+    'objects': [
+        {'type': 'line', 'points': [0, 0, 1.0000000001, 123456789.125], 'infinite': False},
+        {'type': 'text', 'pos': [1, 2], 'text': 'Подпись «угол» ∠ 🙂 "в кавычках" \\ и \n перевод', 'size': 12},
+        {'type': 'polygon', 'points': [[0, 0], [2, 0], [1, 3]]},
+        {'type': 'circle', 'center': [-1e300, 2.5e-300], 'radius': 7},
+    ],
+    'points': [{'pos': [i * 0.1, -i]} for i in range(50)],
+    'functions': {'0': {'text': 'sin(x)', 'visible': True}, '1': {'text': 'x^2', 'visible': False}},
+    'empty': [],
+}
+
+
+def _events(data, block_size):
+    stream = _JsonStream(io.BytesIO(data), block_size)
+    return list(_iter_project(stream))
+
+
+def _expected_events(project):
+    events = []
+    for key, value in project.items():
+        if key in ('objects', 'points') and isinstance(value, list):
+            events += [(key, item) for item in value]
+        else:
+            events.append((key, value))
+    return events
+
+
+@pytest.mark.parametrize('block_size', [1, 2, 3, 5, 7, 16, 64, 1 << 20])
+@pytest.mark.parametrize('indent', [None, 2])
+def test_events_match_json_loads(block_size, indent):
+    text = json.dumps(PROJECT, ensure_ascii=False, indent=indent)
+    assert _events(text.encode('utf-8'), block_size) == _expected_events(json.loads(text))
+
+
+@pytest.mark.parametrize('block_size', [1, 4, 1 << 20])
+def test_byte_order_mark_is_skipped(block_size):
+    data = codecs.BOM_UTF8 + json.dumps(PROJECT, ensure_ascii=False).encode('utf-8')
+    assert _events(data, block_size) == _expected_events(PROJECT)
+
+
+def test_empty_project_and_empty_arrays():
+    assert _events(b'{}', 1) == []
+    assert _events(b' { "objects" : [ ] , "points":[] } ', 2) == []
+
+
+def test_streamed_key_with_a_non_list_value_comes_whole():
+    assert _events(b'{"objects": null, "points": {"a": 1}}', 3) == [('objects', None), ('points', {'a': 1})]
+
+
+@pytest.mark.parametrize('text', [
+    '',
+    '[]',
+    '{"objects": [1, 2',
+    '{"objects": [1 2]}',
+    '{"camera" {}}',
+    '{"camera": {}',
+    '{"camera": tru}',
+])
+def test_malformed_input_raises(text):
+    with pytest.raises(ValueError):
+        _events(text.encode('utf-8'), 2)
+
+
+def test_bytes_read_reaches_file_size():
+    data = json.dumps(PROJECT).encode('utf-8')
+    stream = _JsonStream(io.BytesIO(data), 100)
+    list(_iter_project(stream))
+    assert stream.bytes_read == len(data)
+
+
+def test_loader_delivers_meta_chunks_and_done(tmp_path):
+    QtCore = pytest.importorskip('PyQt5.QtCore')
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+    path = tmp_path / 'project.json'
+    path.write_text(json.dumps(PROJECT, ensure_ascii=False), encoding='utf-8')
+
+    loader = ProjectLoader(chunk_size=7)
+    meta, objects, points, finished = {}, [], [], []
+    loader.meta_loaded.connect(lambda key, value: meta.__setitem__(key, value))
+    loader.chunk_loaded.connect(lambda chunk, xs, ys, fraction: (objects.extend(chunk),
+                                                                 points.extend(zip(xs.tolist(), ys.tolist()))))
+    loader.done.connect(lambda: finished.append('done'))
+    loader.failed.connect(finished.append)
+    loader.start(str(path))
+    deadline = time.monotonic() + 10
+    while not finished and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.001)
+
+    assert finished == ['done'] and not loader.running
+    assert meta['camera'] == PROJECT['camera'] and meta['functions'] == PROJECT['functions']
+    assert [obj.to_dict()['type'] for obj in objects] == [obj['type'] for obj in PROJECT['objects']]
+    assert points == [tuple(point['pos']) for point in PROJECT['points']]
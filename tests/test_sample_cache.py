@@ -0,0 +1,91 @@
+"""Кэш выборок функций по тайлам: покрытие, переиспользование и вытеснение"""
+
+import numpy as np
+
+from curve_sampler import AdaptiveSampler
+from expression_compiler import compile_expression
+from sample_cache import SampleTileCache
+
+
+class CountingSampler(AdaptiveSampler):
+    """AdaptiveSampler, который считает посчитанные тайлы"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def sample(self, *args, **kwargs):
+        self.calls += 1
+        return super().sample(*args, **kwargs)
+
+
+def test_samples_cover_the_view_and_match_the_function():
+    cache = SampleTileCache(AdaptiveSampler())
+    func = compile_expression('sin(x)')
+    xs, ys = cache.samples('sin', func, -7.3, 11.9, scale=50)
+
+    # По одной точке за каждым краем, внутри - строго по возрастанию без
+    # повторов на стыках тайлов
+    assert xs[0] < -7.3 <= xs[1]
+    assert xs[-2] <= 11.9 < xs[-1]
+    assert (np.diff(xs) > 0).all()
+    np.testing.assert_allclose(ys, np.sin(xs), atol=1e-12)
+
+
+def test_panning_and_small_zoom_reuse_tiles():
+    sampler = CountingSampler()
+    cache = SampleTileCache(sampler)
+    func = compile_expression('x^2')
+
+    cache.samples('f', func, 0, 20, scale=40)
+    first = sampler.calls
+    assert first == len(cache) > 0
+
+    # Тот же вид - ни одного нового тайла
+    cache.samples('f', func, 0, 20, scale=40)
+    assert sampler.calls == first
+
+    # Сдвиг на тайл (256 пикселей уровня 5 - 8 единиц) досчитывает только край
+    cache.samples('f', func, 8, 28, scale=40)
+    assert 0 < sampler.calls - first < first
+
+    # Зум в пределах уровня (32..64) тайлы не трогает
+    calls = sampler.calls
+    cache.samples('f', func, 5, 15, scale=60)
+    assert sampler.calls == calls
+
+
+def test_levels_double_the_scale():
+    cache = SampleTileCache(AdaptiveSampler())
+    assert cache.level_for_scale(32) == cache.level_for_scale(63.9) == 5
+    assert cache.level_for_scale(64) == 6
+    # На экране с devicePixelRatio 2 уровень на единицу выше
+    func = compile_expression('x')
+    cache.samples('f', func, 0, 1, scale=40, device_pixel_ratio=2)
+    assert {level for _, level, _ in cache._tiles} == {6}
+
+
+def test_eviction_keeps_the_memory_budget():
+    cache = SampleTileCache(AdaptiveSampler(), max_bytes=4000)
+    func = compile_expression('sin(x)')
+    for start in range(0, 200, 10):
+        cache.samples('f', func, start, start + 10, scale=50)
+        assert cache.bytes_used <= cache.max_bytes or len(cache) == 1
+
+    # Самые старые тайлы ушли первыми
+    assert min(tile for _, _, tile in cache._tiles) > 0
+
+
+def test_invalidate_drops_one_function():
+    cache = SampleTileCache(AdaptiveSampler())
+    cache.samples('a', compile_expression('x'), 0, 10, scale=50)
+    cache.samples('b', compile_expression('-x'), 0, 10, scale=50)
+    tiles = len(cache)
+
+    cache.invalidate('a')
+    assert 0 < len(cache) < tiles
+    assert {key[0] for key in cache._tiles} == {'b'}
+    assert cache.bytes_used == sum(xs.nbytes + ys.nbytes for xs, ys in cache._tiles.values())
+
+    cache.clear()
+    assert len(cache) == 0 and cache.bytes_used == 0
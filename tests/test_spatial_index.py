@@ -0,0 +1,154 @@
+"""Сетка-хэш рамок, индекс прилипания и отсечение фигур по экрану"""
+
+import math
+
+import numpy as np
+import pytest
+
+from scene_model import Circle, Line, Polygon
+from spatial_index import CullIndex, SnapIndex, SpatialHash
+
+
+def _random_boxes(rng, count, extent=100, max_size=30):
+    corners = rng.uniform(-extent, extent, (count, 2))
+    sizes = rng.exponential(max_size / 4, (count, 2)).clip(0, max_size)
+    return np.hstack((corners, corners + sizes))
+
+
+def _touching(boxes, x0, y0, x1, y1):
+    return set(np.flatnonzero((boxes[:, 0] <= x1) & (boxes[:, 2] >= x0)
+                              & (boxes[:, 1] <= y1) & (boxes[:, 3] >= y0)).tolist())
+
+
+@pytest.mark.parametrize('bulk', [False, True])
+def test_query_returns_every_touching_box(bulk):
+    rng = np.random.default_rng(1)
+    boxes = _random_boxes(rng, 500)
+    index = SpatialHash(cell_size=2.0)
+    if bulk:
+        index.insert_many(range(len(boxes)), range(len(boxes)), boxes)
+    else:
+        for key, (x0, y0, x1, y1) in enumerate(boxes.tolist()):
+            # Углы в любом порядке
+            index.insert(key, key, x1, y1, x0, y0)
+    assert len(index) == len(boxes)
+
+    for x, y, radius in rng.uniform((-110, -110, 0.1), (110, 110, 20), (50, 3)).tolist():
+        expected = _touching(boxes, x - radius, y - radius, x + radius, y + radius)
+        assert expected <= set(index.query_radius(x, y, radius))
+
+
+def test_long_boxes_go_to_coarser_levels():
+    index = SpatialHash(cell_size=1.0, max_cells_per_item=16, level_factor=8)
+    index.insert('dot', 'dot', 0.5, 0.5, 0.5, 0.5)
+    index.insert('long', 'long', -1000, 0, 1000, 1)
+    # Отрезок длиной 2000 клеток лежит в паре ячеек крупного уровня, а не в тысячах мелких
+    assert len(index._cells) < 10
+    assert set(index.query(999, 0, 1000, 1)) == {'long'}
+    assert set(index.query(0, 0, 1, 1)) == {'dot', 'long'}
+
+
+def test_infinite_boxes_are_always_returned():
+    index = SpatialHash()
+    index.insert('line', 'line', -math.inf, -math.inf, math.inf, math.inf)
+    index.insert_many(['nan'], ['nan'], [(math.nan, 0, 1, 1)])
+    index.insert('dot', 'dot', 0, 0, 0, 0)
+    assert set(index.query(50, 50, 51, 51)) == {'line', 'nan'}
+
+    index.remove('line')
+    assert set(index.query(50, 50, 51, 51)) == {'nan'}
+
+
+def test_remove_and_reinsert():
+    index = SpatialHash()
+    index.insert('a', 1, 0, 0, 1, 1)
+    index.insert('a', 2, 10, 10, 11, 11)
+    assert index.query(0, 0, 1, 1) == []
+    assert index.query(10, 10, 11, 11) == [2]
+
+    index.remove('a')
+    index.remove('a')
+    assert len(index) == 0
+    assert index._cells == {} and index._levels == {}
+
+
+def test_fit_cell_size_rebuilds_only_on_a_big_change():
+    rng = np.random.default_rng(2)
+    boxes = _random_boxes(rng, 200)
+    index = SpatialHash(cell_size=1.0)
+    index.insert_many(range(len(boxes)), range(len(boxes)), boxes)
+
+    index.fit_cell_size(3.0)
+    assert index.cell_size == 1.0
+    index.fit_cell_size(50.0)
+    assert index.cell_size == 50.0
+    index.fit_cell_size(math.inf)
+    index.fit_cell_size(0)
+    assert index.cell_size == 50.0
+
+    assert _touching(boxes, -5, -5, 5, 5) <= set(index.query(-5, -5, 5, 5))
+
+
+def test_snap_index_finds_centers_and_sides():
+    circle = Circle((3, 4), 2)
+    line = Line((0, 0, 10, 0))
+    square = Polygon([(20, 20), (22, 20), (22, 22), (20, 22)])
+    index = SnapIndex()
+    index.load([circle, line, square])
+
+    assert index.centers_near(3.1, 4.1, 0.5) == [(3, 4)]
+    assert index.centers_near(30, 30, 0.5) == []
+
+    xs, ys, distances, kinds = index.sides.closest(5, 0.2, 0.5)
+    assert kinds == ['line_point']
+    np.testing.assert_allclose([xs[0], ys[0], distances[0]], [5, 0, 0.2])
+
+    index.remove_object(circle)
+    index.remove_object(line)
+    assert index.centers_near(3, 4, 0.5) == []
+    assert len(index.sides.closest(5, 0.2, 0.5)[0]) == 0
+    assert len(index.sides.closest(22.1, 21, 0.5)[0]) == 1
+
+
+def test_cull_index_keeps_drawing_order_and_infinite_lines():
+    circles = [Circle((x, 0), 1) for x in range(0, 100, 5)]
+    infinite = Line((0, 50, 1, 50), infinite=True)
+    objects = circles[:4] + [infinite] + circles[4:]
+    index = CullIndex()
+    index.load(objects)
+    assert len(index) == len(objects)
+
+    # Окружности радиуса 1 с центрами 15..30 задевают полосу x от 12 до 31, прямая - всегда
+    visible = index.visible(12, -1, 31, 1, pixel=0.01)
+    assert visible == [circles[3], infinite, circles[4], circles[5], circles[6]]
+
+
+def test_cull_index_grows_the_query_by_pixel_margins():
+    circle = Circle((0, 0), 1)
+    index = CullIndex()
+    index.add_object(circle)
+    assert index.max_margin == circle.pixel_margin()
+
+    # Рамка кончается на x = 1, а перо и центр рисуются ещё на 4 пикселя правее
+    assert index.visible(1.03, -1, 2, 1, pixel=0.01) == [circle]
+    assert index.visible(1.05, -1, 2, 1, pixel=0.01) == []
+    assert index.visible(1.05, -1, 2, 1, pixel=0.01, pad=2) == [circle]
+
+
+def test_cull_index_removal_and_refit():
+    rng = np.random.default_rng(3)
+    circles = [Circle(center, radius) for center, radius in
+               zip(rng.uniform(-100, 100, (300, 2)).tolist(), rng.uniform(0.1, 5, 300).tolist())]
+    index = CullIndex()
+    index.add_objects(circles)
+    for circle in circles[::2]:
+        index.remove_object(circle)
+    index.remove_object(circles[0])
+    index.fit_cell_size(40)
+
+    boxes = np.array([circle.bounds() for circle in circles[1::2]])
+    expected = [circles[1::2][i] for i in sorted(_touching(boxes, -20, -20, 20, 20))]
+    assert index.visible(-20, -20, 20, 20, pixel=1e-9) == expected
+
+    index.clear()
+    assert len(index) == 0 and index.max_margin == 0
@@ -0,0 +1,103 @@
+"""Отсечение по прямоугольнику экрана: Лианг - Барски, ломаные и дуги окружностей"""
+
+import math
+
+import numpy as np
+import pytest
+
+from viewport_clip import _liang_barsky, circle_arcs, clip_polyline, clip_segments
+
+
+RECT = (0.0, 0.0, 10.0, 5.0)
+
+
+def _inside(xs, ys, rect=RECT, eps=1e-9):
+    x0, y0, x1, y1 = rect
+    return np.all((xs >= x0 - eps) & (xs <= x1 + eps) & (ys >= y0 - eps) & (ys <= y1 + eps))
+
+
+def test_liang_barsky_parameters():
+    # Внутри целиком, насквозь, снаружи, вдоль стороны, вырожденный внутри и nan
+    x1 = np.array([1.0, -5.0, -5.0, 0.5, 3.0, np.nan])
+    y1 = np.array([1.0, 2.5, 7.0, -1.0, 3.0, 1.0])
+    x2 = np.array([9.0, 15.0, 15.0, 0.5, 3.0, 2.0])
+    y2 = np.array([4.0, 2.5, 7.0, 6.0, 3.0, 1.0])
+    t0, t1, keep = _liang_barsky(x1, y1, x2, y2, RECT)
+    assert keep.tolist() == [True, True, False, True, True, False]
+    assert (t0[0], t1[0]) == (0.0, 1.0)
+    assert (t0[1], t1[1]) == pytest.approx((0.25, 0.75))
+    assert (t0[3], t1[3]) == pytest.approx((1 / 7, 6 / 7))
+
+
+def test_clip_segments_matches_dense_sampling():
+    rng = np.random.default_rng(0)
+    x1, y1, x2, y2 = rng.uniform(-20, 30, (4, 500))
+    cx1, cy1, cx2, cy2 = clip_segments(x1, y1, x2, y2, RECT)
+    assert _inside(cx1, cy1) and _inside(cx2, cy2)
+
+    # Видимая доля каждого отрезка - как у плотной выборки точек на нём
+    t = np.linspace(0, 1, 20001)
+    px = x1[:, None] + (x2 - x1)[:, None] * t
+    py = y1[:, None] + (y2 - y1)[:, None] * t
+    visible = ((px >= 0) & (px <= 10) & (py >= 0) & (py <= 5)).mean(axis=1) * np.hypot(x2 - x1, y2 - y1)
+    assert len(cx1) == np.count_nonzero(visible > 0)
+    np.testing.assert_allclose(np.hypot(cx2 - cx1, cy2 - cy1), visible[visible > 0], atol=1e-2)
+
+
+def test_polyline_inside_is_returned_whole():
+    xs, ys = np.array([1.0, 2.0, 3.0]), np.array([1.0, 4.0, 2.0])
+    (px, py), = clip_polyline(xs, ys, RECT)
+    assert px is xs and py is ys
+
+
+def test_polyline_leaving_and_returning_splits_into_pieces():
+    xs = np.array([1.0, 5.0, 5.0, 9.0])
+    ys = np.array([1.0, 1.0, 9.0, 1.0])
+    pieces = clip_polyline(xs, ys, RECT)
+    assert len(pieces) == 2
+    (ax, ay), (bx, by) = pieces
+    np.testing.assert_allclose(ax, [1, 5, 5])
+    np.testing.assert_allclose(ay, [1, 1, 5])
+    np.testing.assert_allclose(by[0], 5.0)
+    np.testing.assert_allclose([bx[-1], by[-1]], [9, 1])
+
+
+def test_polyline_with_nan_gap_and_fully_outside():
+    xs = np.array([1.0, 2.0, np.nan, 3.0, 4.0])
+    ys = np.array([1.0, 2.0, np.nan, 3.0, 4.0])
+    assert len(clip_polyline(xs, ys, RECT)) == 2
+    assert clip_polyline(np.array([20.0, 30.0]), np.array([1.0, 1.0]), RECT) == []
+    assert clip_polyline(np.array([1.0]), np.array([1.0]), RECT) == []
+
+
+def test_circle_fully_inside_and_fully_outside():
+    arcs = circle_arcs(5.0, 2.5, 1.0, RECT, 0.01)
+    assert len(arcs) == 1
+    xs, ys = arcs[0]
+    np.testing.assert_allclose(np.hypot(xs - 5, ys - 2.5), 1.0)
+    assert (xs[0], ys[0]) == pytest.approx((xs[-1], ys[-1]))
+    assert circle_arcs(50.0, 50.0, 1.0, RECT, 0.01) == []
+    # Прямоугольник целиком внутри окружности - рисовать нечего
+    assert circle_arcs(5.0, 2.5, 100.0, RECT, 0.01) == []
+
+
+@pytest.mark.parametrize('cx, cy, radius', [(0.0, 0.0, 3.0), (5.0, -99.0, 100.0), (10.0, 2.5, 4.0), (5.0, 2.5, 5.5)])
+def test_arcs_stay_inside_and_on_the_circle(cx, cy, radius):
+    tolerance = 0.01
+    arcs = circle_arcs(cx, cy, radius, RECT, tolerance)
+    assert arcs
+    for xs, ys in arcs:
+        assert _inside(xs, ys, eps=1e-7)
+        np.testing.assert_allclose(np.hypot(xs - cx, ys - cy), radius, rtol=1e-12)
+        # Хорды отходят от дуги не дальше tolerance
+        step = np.hypot(np.diff(xs), np.diff(ys))
+        sagitta = radius - np.sqrt(radius * radius - (step / 2) ** 2)
+        assert np.all(sagitta <= tolerance * (1 + 1e-9))
+
+
+def test_arc_count_for_a_circle_crossing_a_corner():
+    # Окружность с центром в углу: видна одна четверть
+    (xs, ys), = circle_arcs(0.0, 0.0, 3.0, RECT, 0.001)
+    angles = np.arctan2(ys, xs)
+    assert angles.min() == pytest.approx(0.0, abs=1e-9)
+    assert angles.max() == pytest.approx(math.pi / 2, abs=1e-9)
@@ -0,0 +1,137 @@
+"""
+Отсечение геометрии по прямоугольнику экрана перед рисованием
+При сильном зуме концы отрезков и огромные окружности уходят на миллионы
+пикселей за край, у полюса tan(x) то же делают точки графика, и Qt тратит
+время на невидимое. Здесь всё это заранее обрезается по прямоугольнику
+(с запасом на толщину пера): отрезки и ломаные - векторно, алгоритмом
+Лианга - Барски (параметры входа и выхода t сразу для всех отрезков),
+окружности - до дуг, попадающих в прямоугольник.
+Прямоугольник - (x0, y0, x1, y1) в координатах рисования, x0 < x1, y0 < y1
+"""
+
+import math
+
+import numpy as np
+
+
+def _liang_barsky(x1, y1, x2, y2, rect):
+    """
+    Для отрезков (x1, y1) - (x2, y2): параметры t0 <= t1 видимой части
+    и маска отрезков, у которых она есть. Нечисловые концы отбрасываются
+    """
+    x0, y0, x1_rect, y1_rect = rect
+    dx, dy = x2 - x1, y2 - y1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Параметры t пересечения с вертикальными и горизонтальными сторонами;
+        # у отрезка вдоль стороны это ±inf, что и нужно. NaN (нечисловой конец)
+        # протекает через minimum/maximum, и такой отрезок отбрасывается
+        tx_a, tx_b = (x0 - x1) / dx, (x1_rect - x1) / dx
+        ty_a, ty_b = (y0 - y1) / dy, (y1_rect - y1) / dy
+        t0 = np.maximum(np.maximum(np.minimum(tx_a, tx_b), np.minimum(ty_a, ty_b)), 0.0)
+        t1 = np.minimum(np.minimum(np.maximum(tx_a, tx_b), np.maximum(ty_a, ty_b)), 1.0)
+        keep = t0 <= t1
+    return t0, t1, keep
+
+
+def clip_segments(x1, y1, x2, y2, rect):
+    """Видимые части отрезков: (x1, y1, x2, y2) без тех, что целиком снаружи"""
+    t0, t1, keep = _liang_barsky(x1, y1, x2, y2, rect)
+    dx, dy = (x2 - x1)[keep], (y2 - y1)[keep]
+    x1, y1, t0, t1 = x1[keep], y1[keep], t0[keep], t1[keep]
+    return x1 + t0 * dx, y1 + t0 * dy, x1 + t1 * dx, y1 + t1 * dy
+
+
+def clip_polyline(xs, ys, rect):
+    """
+    Ломаная, обрезанная по прямоугольнику: список кусков (xs, ys).
+    Там, где ломаная выходит за край, кусок заканчивается точкой на границе,
+    а следующий начинается там, где она возвращается
+    """
+    if len(xs) < 2:
+        return []
+    # Частый случай - ломаная целиком внутри, резать нечего
+    # (NaN в сравнениях даёт False и уходит в общий путь)
+    x0, y0, x1_rect, y1_rect = rect
+    if xs.min() >= x0 and xs.max() <= x1_rect and ys.min() >= y0 and ys.max() <= y1_rect:
+        return [(xs, ys)]
+    x1, y1, x2, y2 = xs[:-1], ys[:-1], xs[1:], ys[1:]
+    t0, t1, keep = _liang_barsky(x1, y1, x2, y2, rect)
+    kept = np.flatnonzero(keep)
+    if not len(kept):
+        return []
+
+    # Отрезок продолжает кусок, если предыдущий виден до конца, а этот - с начала
+    continues = np.zeros(len(keep), dtype=bool)
+    continues[1:] = keep[:-1] & keep[1:] & (t1[:-1] >= 1) & (t0[1:] <= 0)
+    starts_piece = ~continues[kept]
+
+    dx, dy = (x2 - x1)[kept], (y2 - y1)[kept]
+    # Начало и конец каждого видимого отрезка подряд; начало нужно только у первого в куске
+    px = np.empty(2 * len(kept))
+    py = np.empty(2 * len(kept))
+    px[0::2] = x1[kept] + t0[kept] * dx
+    px[1::2] = x1[kept] + t1[kept] * dx
+    py[0::2] = y1[kept] + t0[kept] * dy
+    py[1::2] = y1[kept] + t1[kept] * dy
+    used = np.ones(2 * len(kept), dtype=bool)
+    used[0::2] = starts_piece
+
+    # Номер первой точки каждого куска в сжатых массивах
+    piece_starts = (np.cumsum(used) - 1)[0::2][starts_piece]
+    px, py = px[used], py[used]
+    return list(zip(np.split(px, piece_starts[1:]), np.split(py, piece_starts[1:])))
+
+
+def circle_arcs(cx, cy, radius, rect, tolerance):
+    """
+    Части окружности внутри прямоугольника ломаными (xs, ys), хорды отходят
+    от дуги не дальше tolerance. Пустой список - окружность целиком снаружи
+    (или прямоугольник целиком внутри неё)
+    """
+    x0, y0, x1, y1 = rect
+    # Углы, на которых окружность пересекает стороны прямоугольника
+    angles = []
+    for value, center, use_cos in ((x0, cx, True), (x1, cx, True), (y0, cy, False), (y1, cy, False)):
+        ratio = (value - center) / radius
+        if abs(ratio) > 1:
+            continue
+        if use_cos:
+            base = math.acos(ratio)
+            angles += [base, -base]
+        else:
+            base = math.asin(ratio)
+            angles += [base, math.pi - base]
+    if not angles:
+        # Пересечений нет: окружность либо вся внутри, либо вся снаружи
+        inside = x0 <= cx - radius and cx + radius <= x1 and y0 <= cy - radius and cy + radius <= y1
+        return [_arc(cx, cy, radius, 0.0, 2 * math.pi, tolerance)] if inside else []
+    angles = sorted(angle % (2 * math.pi) for angle in angles)
+
+    # Промежутки между соседними пересечениями целиком внутри или снаружи -
+    # проверяем середину каждого. Последний промежуток переходит через 2п
+    bounds = angles + [angles[0] + 2 * math.pi]
+    spans = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if end - start < 1e-12:
+            continue
+        middle = (start + end) / 2
+        mx, my = cx + radius * math.cos(middle), cy + radius * math.sin(middle)
+        if not (x0 <= mx <= x1 and y0 <= my <= y1):
+            continue
+        # Соседние видимые промежутки склеиваем в одну дугу
+        if spans and abs(spans[-1][1] - start) < 1e-12:
+            spans[-1][1] = end
+        else:
+            spans.append([start, end])
+    # ...и дугу, переходящую через угол angles[0] + 2п
+    if len(spans) > 1 and spans[0][0] == angles[0] and spans[-1][1] == bounds[-1]:
+        spans[-1][1] = spans.pop(0)[1] + 2 * math.pi
+    return [_arc(cx, cy, radius, start, end, tolerance) for start, end in spans]
+
+
+def _arc(cx, cy, radius, start, end, tolerance):
+    # Хорда с углом step отходит от дуги на r * (1 - cos(step / 2))
+    step = 2 * math.acos(max(-1.0, 1 - tolerance / radius))
+    count = max(2, math.ceil((end - start) / max(step, 1e-9)) + 1)
+    angles = np.linspace(start, end, count)
+    return cx + radius * np.cos(angles), cy + radius * np.sin(angles)